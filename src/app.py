@@ -1,20 +1,315 @@
 from __future__ import annotations
 
-import csv
-import tkinter as tk
-from tkinter import messagebox, ttk, filedialog
-from typing import Dict, Optional
-
-from db import add_raw_type, authenticate, get_coeffs, get_raw_types, init_db, update_coeffs
-from model_core import sweep_CB
+import time
 
-try:
-    from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
-    from matplotlib.figure import Figure
+_T0 = time.perf_counter()
 
-    HAS_MPL = True
-except Exception:
-    HAS_MPL = False
+import importlib.util
+import math
+import os
+import queue
+import sqlite3
+import sys
+import threading
+import tkinter as tk
+from contextlib import nullcontext
+from pathlib import Path
+from tkinter import messagebox, ttk, filedialog
+from typing import TYPE_CHECKING, Dict, List, Optional
+
+import instrument
+from db import (
+    add_raw_type, add_run, authenticate, delete_run, export_catalog, get_coeffs, get_raw_types, get_run,
+    get_run_data, import_catalog, init_db, list_runs, read_catalog_file, update_coeffs, write_catalog_file,
+)
+
+if TYPE_CHECKING:
+    from model_core import SweepResult
+
+# numpy/model_core, the report writers and matplotlib are imported on
+# first use (or by the warm-up thread after login), not before the login
+# window appears
+HAS_MPL = importlib.util.find_spec("matplotlib") is not None
+
+# REACTOR_STARTUP_TIMING=1 or --startup-timing: print time to first window
+# and to first finished calculation
+STARTUP_TIMING = "--startup-timing" in sys.argv or os.environ.get("REACTOR_STARTUP_TIMING") == "1"
+
+# cProfile stats and span traces of runs started with "Профилировать расчёт"
+PROFILE_DIR = Path(__file__).resolve().parent / "profiles"
+
+# interactive mode: recompute this long after the last parameter edit
+LIVE_DEBOUNCE_MS = 120
+
+
+def _startup_mark(event: str) -> None:
+    if STARTUP_TIMING:
+        print(f"[startup] {event}: {time.perf_counter() - _T0:.3f} s", file=sys.stderr, flush=True)
+
+
+def _warm_up() -> None:
+    """Import the compute stack and load the native library in the background."""
+    import model_core
+    import report  # noqa: F401
+    import sweep_cache  # noqa: F401
+
+    native = model_core.native_selection()  # loads the library
+    # without a native library the NumPy/Python engines are used
+    _startup_mark(f"compute stack ready (native: {native['variant'] or 'none'})")
+
+
+class VirtualTable(tk.Frame):
+    """Table over a SweepResult that only renders the visible rows.
+
+    The Treeview holds one item per visible line; scrolling re-fills those
+    items from the result columns, so population time does not depend on
+    the number of points. Sorting and lookup work on the arrays.
+    """
+
+    COLUMNS = (("Q", "{:.3f}"), ("CA_in", "{:.3f}"), ("CB", "{:.6f}"))
+
+    def __init__(self, master, **kwargs) -> None:
+        super().__init__(master, **kwargs)
+        names = [name for name, _ in self.COLUMNS]
+        self.tree = ttk.Treeview(self, columns=names, show="headings", height=18, selectmode="browse")
+        for name in names:
+            self.tree.heading(name, text=name, command=lambda c=name: self.sort_by(c))
+            self.tree.column(name, width=120, anchor="center")
+        self.scroll = ttk.Scrollbar(self, orient="vertical", command=self._on_scroll)
+        self.scroll.pack(side="right", fill="y")
+        self.tree.pack(side="left", fill="both", expand=True)
+
+        self.tree.bind("<Configure>", self._on_resize)
+        self.tree.bind("<MouseWheel>", lambda e: self.scroll_rows(-3 if e.delta > 0 else 3))
+        self.tree.bind("<Button-4>", lambda e: self.scroll_rows(-3))
+        self.tree.bind("<Button-5>", lambda e: self.scroll_rows(3))
+        self.tree.bind("<Prior>", lambda e: self.scroll_rows(-self.page))
+        self.tree.bind("<Next>", lambda e: self.scroll_rows(self.page))
+
+        self.result: Optional[SweepResult] = None
+        self.order = None      # display position -> flat index, None = grid order
+        self.inverse = None    # flat index -> display position
+        self.sort_column: Optional[str] = None
+        self.sort_desc = False
+        self.top = 0
+        self.page = 18
+        self.marked: Optional[int] = None
+
+    def set_result(self, result: Optional[SweepResult], keep_view: bool = False) -> None:
+        """Show ``result``; with keep_view a refined grid of the same sweep
+        keeps the sort order and the grid point at the top of the view."""
+        old, column, desc = self.result, self.sort_column, self.sort_desc
+        anchor = None
+        if keep_view and old is not None and len(old) and result is not None and len(result):
+            # the top row is remembered by value: flat indices differ between grids
+            top = min(self.top, len(old) - 1)
+            point = old[int(self.order[top]) if self.order is not None else top]
+            anchor = (point["Q"], point["CA_in"])
+        self.result = result
+        self.order = self.inverse = None
+        self.sort_column = None
+        self.top = 0
+        self.marked = None
+        if anchor is None:
+            for name, _ in self.COLUMNS:
+                self.tree.heading(name, text=name)
+            self._render()
+            return
+        if column is not None:
+            self.sort_column, self.sort_desc = column, not desc
+            self.sort_by(column)
+        idx = result.nearest_index(*anchor)
+        self.top = int(self.inverse[idx]) if self.inverse is not None else idx
+        self._render()
+
+    def _count(self) -> int:
+        return len(self.result) if self.result is not None else 0
+
+    def scroll_rows(self, delta: int) -> None:
+        self.top += delta
+        self._render()
+
+    def _on_scroll(self, *args) -> None:
+        n = self._count()
+        if args[0] == "moveto":
+            self.top = int(float(args[1]) * n)
+        elif args[0] == "scroll":
+            step = self.page if args[2] == "pages" else 1
+            self.top += int(args[1]) * step
+        self._render()
+
+    def _on_resize(self, event) -> None:
+        rowheight = int(ttk.Style().lookup("Treeview", "rowheight") or 20)
+        page = max(1, (event.height - rowheight) // rowheight)
+        if page != self.page:
+            self.page = page
+            self._render()
+
+    def sort_by(self, column: str) -> None:
+        if self.result is None:
+            return
+        self.sort_desc = column == self.sort_column and not self.sort_desc
+        self.sort_column = column
+        values = getattr(self.result, column)
+        from model_core import HAS_NUMPY
+
+        if HAS_NUMPY:
+            import numpy as np
+
+            order = np.argsort(values, kind="stable")
+            if self.sort_desc:
+                order = order[::-1]
+            inverse = np.empty_like(order)
+            inverse[order] = np.arange(len(order))
+        else:
+            order = sorted(range(len(values)), key=values.__getitem__, reverse=self.sort_desc)
+            inverse = [0] * len(order)
+            for pos, idx in enumerate(order):
+                inverse[idx] = pos
+        self.order, self.inverse = order, inverse
+        for name, _ in self.COLUMNS:
+            arrow = (" ▼" if self.sort_desc else " ▲") if name == column else ""
+            self.tree.heading(name, text=name + arrow)
+        self.top = 0
+        self._render()
+
+    def jump_to(self, Q: float, CA_in: float) -> None:
+        """Scroll to and select the grid point nearest to (Q, CA_in)."""
+        if not self._count():
+            return
+        idx = self.result.nearest_index(Q, CA_in)
+        pos = int(self.inverse[idx]) if self.inverse is not None else idx
+        self.marked = idx
+        self.top = pos - self.page // 2
+        self._render()
+
+    def _render(self) -> None:
+        n = self._count()
+        self.top = max(0, min(self.top, n - self.page))
+        rows = min(self.page, n)
+
+        items = self.tree.get_children()
+        if len(items) > rows:
+            self.tree.delete(*items[rows:])
+        for k in range(len(items), rows):
+            self.tree.insert("", "end", iid=str(k))
+
+        if rows:
+            if self.order is None:
+                idx = list(range(self.top, self.top + rows))
+            else:
+                idx = [int(i) for i in self.order[self.top:self.top + rows]]
+            for k, i in enumerate(idx):
+                point = self.result[i]
+                self.tree.item(str(k), values=[fmt.format(point[name]) for name, fmt in self.COLUMNS])
+            if self.marked in idx:
+                self.tree.selection_set(str(idx.index(self.marked)))
+            else:
+                self.tree.selection_set(())
+            self.scroll.set(self.top / n, (self.top + rows) / n)
+        else:
+            self.scroll.set(0.0, 1.0)
+
+
+def _format_time(ts: float) -> str:
+    return time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(ts))
+
+
+class HistoryWindow:
+    """Stored runs, newest first, loaded page by page without their grids.
+
+    One selected run can be shown, two can be overlaid or diffed (the
+    newer minus the older).
+    """
+
+    COLUMNS = (
+        ("id", "№", 50), ("created", "Время", 140), ("raw_type", "Сырьё", 110),
+        ("username", "Пользователь", 100), ("points", "Точек", 90), ("engine", "Движок", 70),
+        ("wall_s", "Расчёт, с", 80), ("size", "Сетка", 90),
+    )
+    PAGE = 200
+
+    def __init__(self, app: "App") -> None:
+        self.app = app
+        self.window = tk.Toplevel(app)
+        self.window.title("История расчётов")
+
+        top = tk.Frame(self.window)
+        top.pack(fill="x", padx=8, pady=(8, 4))
+        self.only_raw_var = tk.BooleanVar(value=False)
+        ttk.Checkbutton(top, text=f"Только «{app.raw_type_var.get()}»", variable=self.only_raw_var,
+                        command=self.reload).pack(side="left")
+
+        body = tk.Frame(self.window)
+        body.pack(fill="both", expand=True, padx=8)
+        names = [name for name, _, _ in self.COLUMNS]
+        self.tree = ttk.Treeview(body, columns=names, show="headings", height=15, selectmode="extended")
+        for name, title, width in self.COLUMNS:
+            self.tree.heading(name, text=title)
+            self.tree.column(name, width=width, anchor="center")
+        scroll = ttk.Scrollbar(body, orient="vertical", command=self.tree.yview)
+        self.tree.configure(yscrollcommand=scroll.set)
+        scroll.pack(side="right", fill="y")
+        self.tree.pack(side="left", fill="both", expand=True)
+
+        buttons = tk.Frame(self.window)
+        buttons.pack(fill="x", padx=8, pady=8)
+        ttk.Button(buttons, text="Показать", command=self.show).pack(side="left")
+        ttk.Button(buttons, text="Наложить", command=self.overlay).pack(side="left", padx=4)
+        ttk.Button(buttons, text="Разность", command=self.diff).pack(side="left")
+        ttk.Button(buttons, text="Удалить", command=self.delete).pack(side="left", padx=4)
+        ttk.Button(buttons, text="Ещё…", command=self.load_more).pack(side="right")
+
+        self.oldest: Optional[float] = None
+        self.reload()
+
+    def reload(self) -> None:
+        self.tree.delete(*self.tree.get_children())
+        self.oldest = None
+        self.load_more()
+
+    def load_more(self) -> None:
+        raw_id = self.app.raw_type_id_by_name.get(self.app.raw_type_var.get()) if self.only_raw_var.get() else None
+        rows = list_runs(raw_id, before=self.oldest, limit=self.PAGE)
+        for row in rows:
+            self.tree.insert("", "end", iid=str(row["id"]), values=[
+                row["id"], _format_time(row["created"]), row["raw_type"], row["username"],
+                row["points"], row["engine"], f"{row['wall_s']:.3f}",
+                f"{row['size'] / 2**20:.2f} МБ" if row["size"] else "пересчёт",
+            ])
+        if rows:
+            self.oldest = rows[-1]["created"]
+
+    def _selected(self, count: int) -> Optional[List[int]]:
+        """Selected run ids, oldest first, if exactly ``count`` are selected."""
+        ids = sorted(int(iid) for iid in self.tree.selection())
+        if len(ids) != count:
+            messagebox.showinfo("История", f"Выберите расчётов: {count}", parent=self.window)
+            return None
+        return ids
+
+    def show(self) -> None:
+        ids = self._selected(1)
+        if ids:
+            self.app.show_stored_run(ids[0])
+
+    def overlay(self) -> None:
+        ids = self._selected(2)
+        if ids:
+            self.app.show_stored_run(ids[1], overlay_id=ids[0])
+
+    def diff(self) -> None:
+        ids = self._selected(2)
+        if ids:
+            self.app.show_run_diff(ids[0], ids[1])
+
+    def delete(self) -> None:
+        ids = sorted(int(iid) for iid in self.tree.selection())
+        if not ids or not messagebox.askyesno("История", f"Удалить расчёты: {len(ids)}?", parent=self.window):
+            return
+        for run_id in ids:
+            delete_run(run_id)
+        self.tree.delete(*[str(run_id) for run_id in ids])
 
 
 class App(tk.Tk):
@@ -27,15 +322,35 @@ class App(tk.Tk):
         init_db()
 
         self.current_user_role: Optional[str] = None
+        self.current_username = ""
         self.login_frame: Optional[tk.Frame] = None
         self.main_frame: Optional[tk.Frame] = None
 
         # для отчёта
-        self.last_results: list[dict] = []
+        self.last_results: Optional[SweepResult] = None
         self.last_params: Dict[str, float] = {}
+        # подпись сохранённого расчёта или разности, если в таблице не last_results
+        self.stored_view: Optional[str] = None
         self.save_report_button: Optional[ttk.Button] = None
 
+        # фоновый расчёт
+        self.calc_button: Optional[ttk.Button] = None
+        self.cancel_button: Optional[ttk.Button] = None
+        self.progress: Optional[ttk.Progressbar] = None
+        self.calc_worker: Optional[threading.Thread] = None
+        self.calc_cancel = threading.Event()
+        self.calc_queue: "queue.Queue[tuple]" = queue.Queue()
+        self.calc_run_id = 0
+        self.warmup: Optional[threading.Thread] = None
+        self.first_calculation_done = False
+        self.profile_var = tk.BooleanVar(value=False)
+        self.live_var = tk.BooleanVar(value=False)
+        self.live_after: Optional[str] = None
+        self.status_var = tk.StringVar()
+
+        instrument.enable()
         self.show_login()
+        self.after_idle(_startup_mark, "first window")
 
     # ---------- auth ----------
     def show_login(self) -> None:
@@ -67,6 +382,10 @@ class App(tk.Tk):
             return
 
         self.current_user_role = user["role"]
+        self.current_username = user["username"]
+        if self.warmup is None:
+            self.warmup = threading.Thread(target=_warm_up, daemon=True)
+            self.warmup.start()
         self.show_main()
 
     # ---------- main UI ----------
@@ -96,12 +415,21 @@ class App(tk.Tk):
         self.main_frame = frame
 
     def logout(self) -> None:
+        self.calc_cancel.set()
+        self.calc_run_id += 1
+        if self.live_after is not None:
+            self.after_cancel(self.live_after)
+            self.live_after = None
+        self.live_var.set(False)
         if self.main_frame:
             self.main_frame.destroy()
         self.current_user_role = None
-        self.last_results = []
+        self.current_username = ""
+        self.last_results = None
         self.last_params = {}
+        self.stored_view = None
         self.save_report_button = None
+        self.calc_button = self.cancel_button = self.progress = None
         self.show_login()
 
     # ---------- research tab ----------
@@ -131,18 +459,22 @@ class App(tk.Tk):
             ("Q_min", 4), ("Q_max", 5), ("dQ", 6),
             ("CAin_min", 7), ("CAin_max", 8), ("dCAin", 9),
         ]
+        self.param_spins: Dict[str, ttk.Spinbox] = {}
         for name, row in params:
             tk.Label(left, text=f"{name}:").grid(row=row, column=0, sticky="e")
             var = tk.StringVar()
-            tk.Entry(left, textvariable=var, width=10).grid(row=row, column=1, padx=5, pady=2, sticky="w")
+            spin = ttk.Spinbox(left, textvariable=var, width=10, from_=-1e12, to=1e12, increment=1.0,
+                               command=lambda v=var: self._tidy_spin_value(v))
+            spin.grid(row=row, column=1, padx=5, pady=2, sticky="w")
+            var.trace_add("write", self._on_param_edit)
             self.param_vars[name] = var
+            self.param_spins[name] = spin
 
         ttk.Button(left, text="Загрузить из БД", command=self.load_params_from_db).grid(
             row=10, column=0, columnspan=2, pady=(8, 4), sticky="ew"
         )
-        ttk.Button(left, text="Рассчитать", command=self.run_calculation).grid(
-            row=11, column=0, columnspan=2, pady=4, sticky="ew"
-        )
+        self.calc_button = ttk.Button(left, text="Рассчитать", command=self.run_calculation)
+        self.calc_button.grid(row=11, column=0, columnspan=2, pady=4, sticky="ew")
 
         # кнопка отчёта
         self.save_report_button = ttk.Button(
@@ -153,18 +485,59 @@ class App(tk.Tk):
         )
         self.save_report_button.grid(row=12, column=0, columnspan=2, pady=4, sticky="ew")
 
-        columns = ("Q", "CA_in", "CB")
-        self.tree = ttk.Treeview(right, columns=columns, show="headings", height=18)
-        for col in columns:
-            self.tree.heading(col, text=col)
-            self.tree.column(col, width=120, anchor="center")
-        self.tree.pack(fill="both", expand=True)
+        self.progress = ttk.Progressbar(left, mode="determinate", maximum=100)
+        self.progress.grid(row=13, column=0, columnspan=2, pady=(12, 4), sticky="ew")
+        self.cancel_button = ttk.Button(left, text="Отмена", command=self.cancel_calculation, state="disabled")
+        self.cancel_button.grid(row=14, column=0, columnspan=2, pady=4, sticky="ew")
+        ttk.Checkbutton(left, text="Профилировать расчёт", variable=self.profile_var).grid(
+            row=15, column=0, columnspan=2, pady=4, sticky="w"
+        )
+        ttk.Button(left, text="Оптимум CB", command=self.find_optimum).grid(
+            row=16, column=0, columnspan=2, pady=4, sticky="ew"
+        )
+        ttk.Button(left, text="Переходный процесс", command=self.show_transient).grid(
+            row=20, column=0, columnspan=2, pady=4, sticky="ew"
+        )
+        # пересчёт при каждом изменении параметров: сначала грубая сетка, затем уточнение
+        ttk.Checkbutton(left, text="Интерактивный режим", variable=self.live_var, command=self._on_param_edit).grid(
+            row=21, column=0, columnspan=2, pady=4, sticky="w"
+        )
+        ttk.Button(left, text="История расчётов…", command=lambda: HistoryWindow(self)).grid(
+            row=22, column=0, columnspan=2, pady=4, sticky="ew"
+        )
 
-        if HAS_MPL:
-            self.fig = Figure(figsize=(6, 3))
-            self.ax = self.fig.add_subplot(111)
-            self.canvas = FigureCanvasTkAgg(self.fig, master=right)
-            self.canvas.get_tk_widget().pack(fill="x", pady=10)
+        # Монте-Карло по разбросу k1, k2 вокруг значений из БД
+        self.mc_sd_var = tk.StringVar(value="10")
+        self.mc_samples_var = tk.StringVar(value="100000")
+        tk.Label(left, text="Разброс k, %:").grid(row=17, column=0, sticky="e", pady=(12, 2))
+        tk.Entry(left, textvariable=self.mc_sd_var, width=10).grid(row=17, column=1, padx=5, pady=(12, 2), sticky="w")
+        tk.Label(left, text="Выборок:").grid(row=18, column=0, sticky="e")
+        tk.Entry(left, textvariable=self.mc_samples_var, width=10).grid(row=18, column=1, padx=5, pady=2, sticky="w")
+        ttk.Button(left, text="Неопределённость (Монте-Карло)", command=self.run_uncertainty).grid(
+            row=19, column=0, columnspan=2, pady=4, sticky="ew"
+        )
+
+        find = tk.Frame(right)
+        find.pack(fill="x", pady=(0, 4))
+        self.find_q_var = tk.StringVar()
+        self.find_ca_var = tk.StringVar()
+        tk.Label(find, text="Q:").pack(side="left")
+        tk.Entry(find, textvariable=self.find_q_var, width=8).pack(side="left", padx=(2, 8))
+        tk.Label(find, text="CA_in:").pack(side="left")
+        tk.Entry(find, textvariable=self.find_ca_var, width=8).pack(side="left", padx=(2, 8))
+        ttk.Button(find, text="Найти", command=self.find_in_table).pack(side="left")
+
+        # строка состояния: время по этапам последнего расчёта
+        self.status_var.set("")
+        tk.Label(right, textvariable=self.status_var, anchor="w", justify="left").pack(side="bottom", fill="x")
+
+        self.table = VirtualTable(right)
+        self.table.pack(fill="both", expand=True)
+
+        # the plot (and matplotlib) is created with the first results
+        self.plot_frame = tk.Frame(right)
+        self.plot_frame.pack(fill="x")
+        self.plot = None
 
         self.load_params_from_db()
 
@@ -181,6 +554,17 @@ class App(tk.Tk):
 
         for key in self.param_vars:
             self.param_vars[key].set(str(coeffs[key]))
+            # шаг стрелок спинбокса — десятая часть порядка величины
+            value = abs(float(coeffs[key]))
+            step = 10.0 ** (math.floor(math.log10(value)) - 1) if value > 0 else 0.1
+            self.param_spins[key].config(increment=step)
+
+    def _tidy_spin_value(self, var: tk.StringVar) -> None:
+        # стрелки спинбокса дают 0.30000000000000004 вместо 0.3
+        try:
+            var.set(f"{float(var.get()):.10g}")
+        except ValueError:
+            pass
 
     def _read_float(self, key: str) -> float:
         try:
@@ -188,102 +572,514 @@ class App(tk.Tk):
         except ValueError as e:
             raise ValueError(f"Некорректное значение {key}") from e
 
+    def _read_params(self) -> Dict[str, float]:
+        params = {key: self._read_float(key) for key in self.param_vars}
+        if params["dQ"] <= 0 or params["dCAin"] <= 0:
+            raise ValueError("Шаги dQ и dCAin должны быть > 0")
+        return params
+
     def run_calculation(self) -> None:
         try:
-            k1 = self._read_float("k1")
-            k2 = self._read_float("k2")
-            Vr = self._read_float("Vr")
-            Q_min = self._read_float("Q_min")
-            Q_max = self._read_float("Q_max")
-            dQ = self._read_float("dQ")
-            CAin_min = self._read_float("CAin_min")
-            CAin_max = self._read_float("CAin_max")
-            dCAin = self._read_float("dCAin")
+            params = self._read_params()
         except ValueError as e:
             messagebox.showerror("Ошибка", str(e))
             return
 
-        if dQ <= 0 or dCAin <= 0:
-            messagebox.showerror("Ошибка", "Шаги dQ и dCAin должны быть > 0")
+        if self.calc_worker is not None and self.calc_worker.is_alive():
             return
 
-        results = sweep_CB(k1, k2, Vr, Q_min, Q_max, dQ, CAin_min, CAin_max, dCAin)
+        raw_id = self.raw_type_id_by_name.get(self.raw_type_var.get())
+        profile_path = None
+        if self.profile_var.get():
+            profile_path = PROFILE_DIR / time.strftime("run-%Y%m%d-%H%M%S.prof")
+        instrument.start_run(trace=profile_path is not None)
+        self.calc_cancel = threading.Event()
+        self.calc_queue = queue.Queue()
+        self.calc_run_id += 1
+        self.calc_worker = threading.Thread(
+            target=self._calculation_worker,
+            args=(params, raw_id, self.last_results, self.calc_cancel, self.calc_queue, profile_path, (),
+                  {"raw_type_id": raw_id, "raw_type": self.raw_type_var.get(), "username": self.current_username}),
+            daemon=True,
+        )
+        self._set_calculating(True)
+        self.calc_worker.start()
+        self.after(50, self._poll_calculation, self.calc_run_id, {"raw_type": self.raw_type_var.get(), **params},
+                   profile_path)
 
+    def _on_param_edit(self, *_) -> None:
+        if not self.live_var.get():
+            return
+        # правка за правкой (стрелки, ввод с клавиатуры) — считаем после паузы
+        if self.live_after is not None:
+            self.after_cancel(self.live_after)
+        self.live_after = self.after(LIVE_DEBOUNCE_MS, self._live_recompute)
+
+    def _live_recompute(self) -> None:
+        self.live_after = None
+        if not self.live_var.get() or self.main_frame is None:
+            return
+        # один расчёт за раз: устаревший прерываем, дожидаемся его выхода
+        # и считаем по тем значениям полей, что будут к тому времени
+        if self.calc_worker is not None and self.calc_worker.is_alive():
+            if not self.calc_cancel.is_set():
+                self.calc_cancel.set()
+                self.calc_run_id += 1  # его сообщения больше не нужны
+            self.live_after = self.after(LIVE_DEBOUNCE_MS, self._live_recompute)
+            return
+        try:
+            params = self._read_params()
+        except ValueError as e:
+            self.status_var.set(str(e))
+            return
+        shown = {"raw_type": self.raw_type_var.get(), **params}
+        if shown == self.last_params:
+            self._set_calculating(False)
+            return
+
+        from model_core import refinement_levels
+
+        instrument.start_run()
+        raw_id = self.raw_type_id_by_name.get(self.raw_type_var.get())
+        # грубые сетки, от самой грубой, — тоже в фоне: поток интерфейса не считает
+        levels = refinement_levels(params)
+        self.calc_cancel = threading.Event()
+        self.calc_queue = queue.Queue()
+        self.calc_run_id += 1
+        self.calc_worker = threading.Thread(
+            target=self._calculation_worker,
+            args=(params, raw_id, self.last_results, self.calc_cancel, self.calc_queue, None, levels[:-1]),
+            daemon=True,
+        )
+        self._set_calculating(True)
+        self.calc_worker.start()
+        self.after(20, self._poll_calculation, self.calc_run_id, shown, None, True)
+
+    @staticmethod
+    def _plot_data(results):
+        if not HAS_MPL:
+            return None
+        from plotting import prepare_plot
+
+        with instrument.span("prepare_plot"):
+            return prepare_plot(results)
+
+    @staticmethod
+    def _calculation_worker(params, raw_id, previous, cancel, out, profile_path=None, preview_levels=(),
+                            history=None) -> None:
+        # выполняется в фоновом потоке: никаких обращений к Tk
+        def progress(done: int, total: int) -> None:
+            out.put(("progress", done, total))
+
+        try:
+            with instrument.profile_to(profile_path) if profile_path else nullcontext():
+                from model_core import SweepCancelled, SweepStream
+                from sweep_cache import cached_sweep_CB
+
+                try:
+                    # промежуточные сетки интерактивного режима, от грубой к точной
+                    for level in preview_levels:
+                        preview = SweepStream(level).collect(cancel=cancel)
+                        out.put(("preview", preview, App._plot_data(preview)))
+                    t0 = time.perf_counter()
+                    results = cached_sweep_CB(params, raw_id, previous=previous, progress=progress, cancel=cancel)
+                    wall = time.perf_counter() - t0
+                except SweepCancelled:
+                    out.put(("cancelled",))
+                    return
+                plot = App._plot_data(results)
+            out.put(("done", results, plot))
+        except Exception as e:
+            out.put(("error", str(e)))
+            return
+
+        if history is not None:
+            # в историю — уже после показа результата: сжатие большой сетки не быстрое
+            try:
+                with instrument.span("history"):
+                    add_run(results.params, results.cb_bytes(), results.engine, wall, **history)
+            except sqlite3.Error:
+                pass
+
+    def run_uncertainty(self) -> None:
+        if not self.last_results:
+            messagebox.showwarning("Монте-Карло", "Сначала выполните расчёт: полосы строятся на его сетке.")
+            return
+        from model_core import HAS_NUMPY
+
+        if not HAS_NUMPY:
+            messagebox.showerror("Ошибка", "Для расчёта Монте-Карло нужен NumPy")
+            return
+        if self.stored_view is not None:
+            messagebox.showwarning("Монте-Карло", f"Показан {self.stored_view}: полосы строятся на сетке "
+                                                  "последнего расчёта, выполните его снова.")
+            return
+        try:
+            rel_sd = float(self.mc_sd_var.get()) / 100.0
+            n_samples = int(self.mc_samples_var.get())
+        except ValueError:
+            messagebox.showerror("Ошибка", "Некорректный разброс или число выборок")
+            return
+        if rel_sd < 0 or n_samples < 1:
+            messagebox.showerror("Ошибка", "Разброс должен быть >= 0, число выборок > 0")
+            return
+        if self.calc_worker is not None and self.calc_worker.is_alive():
+            return
+
+        instrument.start_run()
+        self.calc_cancel = threading.Event()
+        self.calc_queue = queue.Queue()
+        self.calc_run_id += 1
+        self.calc_worker = threading.Thread(
+            target=self._uncertainty_worker,
+            args=(self.last_results.params, rel_sd, n_samples, self.calc_cancel, self.calc_queue),
+            daemon=True,
+        )
+        self._set_calculating(True)
+        self.calc_worker.start()
+        self.after(50, self._poll_calculation, self.calc_run_id, self.last_params)
+
+    @staticmethod
+    def _uncertainty_worker(params, rel_sd, n_samples, cancel, out) -> None:
+        # выполняется в фоновом потоке: никаких обращений к Tk
+        from model_core import SweepCancelled
+        from uncertainty import monte_carlo_CB
+
+        def progress(done: int, total: int) -> None:
+            out.put(("progress", done, total))
+
+        try:
+            with instrument.span("monte_carlo"):
+                bands = monte_carlo_CB(params, n_samples, rel_sd, rel_sd, progress=progress, cancel=cancel)
+            out.put(("bands", bands))
+        except SweepCancelled:
+            out.put(("cancelled",))
+        except Exception as e:
+            out.put(("error", str(e)))
+
+    def _set_calculating(self, running: bool) -> None:
+        if self.calc_button:
+            self.calc_button.config(state="disabled" if running else "normal")
+        if self.cancel_button:
+            self.cancel_button.config(state="normal" if running else "disabled")
+        if self.save_report_button:
+            enabled = not running and bool(self.last_results)
+            self.save_report_button.config(state="normal" if enabled else "disabled")
+        if self.progress and running:
+            self.progress["value"] = 0
+
+    def cancel_calculation(self) -> None:
+        self.calc_cancel.set()
+
+    def _poll_calculation(self, run_id: int, params: Dict[str, float], profile_path=None, live: bool = False) -> None:
+        if run_id != self.calc_run_id:
+            return  # выход из учётной записи или новый запуск
+
+        while True:
+            try:
+                msg = self.calc_queue.get_nowait()
+            except queue.Empty:
+                self.after(20 if live else 50, self._poll_calculation, run_id, params, profile_path, live)
+                return
+
+            kind = msg[0]
+            if kind == "progress":
+                if self.progress:
+                    self.progress["value"] = 100.0 * msg[1] / max(msg[2], 1)
+                continue
+            if kind == "preview":
+                self._show_preview(msg[1], msg[2])
+                continue
+
+            summary = ""
+            if kind == "done":
+                self._show_results(msg[1], msg[2], params)
+            elif kind == "bands":
+                self._show_bands(msg[1])
+            elif kind == "view":
+                summary = self._show_stored(*msg[1:])
+            self._show_timings(profile_path)
+            self._set_calculating(False)
+            if live:
+                # без всплывающих окон: итог — в строке состояния
+                if kind == "cancelled":
+                    self.status_var.set("Расчёт прерван")
+                elif kind == "error":
+                    self.status_var.set(f"Не удалось выполнить расчёт: {msg[1]}")
+            elif kind == "cancelled":
+                messagebox.showinfo("Отмена", "Расчёт прерван")
+            elif kind == "error":
+                messagebox.showerror("Ошибка", msg[2] if len(msg) > 2 else f"Не удалось выполнить расчёт:\n{msg[1]}")
+            elif kind == "view":
+                self.status_var.set(summary)
+            elif kind == "bands":
+                messagebox.showinfo("Готово", f"Монте-Карло выполнен, выборок: {msg[1].n_samples}")
+            else:
+                messagebox.showinfo("Готово", f"Расчёт выполнен, точек: {len(msg[1])}")
+            return
+
+    def _show_results(self, results: SweepResult, plot, params: Dict[str, float]) -> None:
         # запоминаем для отчёта
         self.last_results = results
-        self.last_params = {
-            "raw_type": self.raw_type_var.get(),
-            "k1": k1, "k2": k2, "Vr": Vr,
-            "Q_min": Q_min, "Q_max": Q_max, "dQ": dQ,
-            "CAin_min": CAin_min, "CAin_max": CAin_max, "dCAin": dCAin,
-        }
-        if self.save_report_button:
-            self.save_report_button.config(state="normal")
+        self.last_params = params
+        self.stored_view = None
+        if self.progress:
+            self.progress["value"] = 100
+        self._show_preview(results, plot)
+
+        if not self.first_calculation_done:
+            self.first_calculation_done = True
+            _startup_mark("first calculation")
+
+    def _show_preview(self, results: SweepResult, plot) -> None:
+        # таблица и график обновляются на месте: та же позиция и срез CA_in
+        with instrument.span("table"):
+            self.table.set_result(results, keep_view=self.live_var.get())
+
+        if plot is not None and HAS_MPL:
+            with instrument.span("plot"):
+                if self.plot is None:
+                    self._create_plot()
+                if self.plot is not None:
+                    self.plot.set_data(plot)
+
+    def _create_plot(self) -> None:
+        global HAS_MPL
+        try:
+            from plotting import ResultPlot
 
-        self.tree.delete(*self.tree.get_children())
-        for r in results:
-            self.tree.insert(
-                "", "end",
-                values=(
-                    f"{r['Q']:.3f}",
-                    f"{r['CA_in']:.3f}",
-                    f"{r['CB']:.6f}",
-                ),
+            self.plot = ResultPlot(self.plot_frame)
+        except Exception as e:
+            # matplotlib есть, но Tk-бэкенд не работает: дальше без графика
+            HAS_MPL = False
+            for widget in self.plot_frame.winfo_children():
+                widget.destroy()
+            print(f"График недоступен: {e}", file=sys.stderr)
+
+    def _show_bands(self, bands) -> None:
+        if self.progress:
+            self.progress["value"] = 100
+        if self.plot is not None and self.stored_view is None and bands.params == self.last_results.params:
+            with instrument.span("plot"):
+                self.plot.set_bands(bands)
+
+    def find_optimum(self) -> None:
+        """Q and CA_in giving the largest CB within the entered ranges, without a sweep."""
+        try:
+            values = {k: self._read_float(k) for k in ("k1", "k2", "Vr", "Q_min", "Q_max", "CAin_min", "CAin_max")}
+        except ValueError as e:
+            messagebox.showerror("Ошибка", str(e))
+            return
+
+        from model_core import optimum_Q
+
+        # CB линейна по CA_in, поэтому оптимум лежит на одной из границ диапазона CA_in
+        best = None
+        try:
+            for ca in (values["CAin_min"], values["CAin_max"]):
+                opt = optimum_Q(values["k1"], values["k2"], values["Vr"], ca, values["Q_min"], values["Q_max"])
+                if best is None or opt.CB > best[0].CB:
+                    best = (opt, ca)
+        except (ValueError, ZeroDivisionError) as e:
+            messagebox.showerror("Ошибка", f"Не удалось найти оптимум:\n{e}")
+            return
+
+        opt, ca = best
+        method = "аналитически" if opt.method == "closed_form" else f"поиском, вычислений: {opt.evaluations}"
+        self.find_q_var.set(f"{opt.Q:.6g}")
+        self.find_ca_var.set(f"{ca:.6g}")
+        if self.table.result:
+            self.table.jump_to(opt.Q, ca)
+        self.status_var.set(f"Оптимум: Q = {opt.Q:.6g}, CA_in = {ca:.6g}, CB = {opt.CB:.6g} ({method})")
+
+    def show_transient(self) -> None:
+        """Start-up of an empty reactor at several Q across the range, CA_in = CAin_max."""
+        try:
+            values = {k: self._read_float(k) for k in ("k1", "k2", "Vr", "Q_min", "Q_max", "CAin_max")}
+        except ValueError as e:
+            messagebox.showerror("Ошибка", str(e))
+            return
+        if min(values["k1"], values["k2"], values["Vr"], values["Q_min"]) <= 0 or values["Q_max"] < values["Q_min"]:
+            messagebox.showerror("Ошибка", "Для переходного процесса k1, k2, Vr и Q должны быть > 0")
+            return
+        if not HAS_MPL:
+            messagebox.showerror("Ошибка", "Для графика нужен matplotlib")
+            return
+
+        from model_core import simulate_CSTR, steady_state
+        from plotting import TransientPlot
+
+        k1, k2, Vr, ca_in = values["k1"], values["k2"], values["Vr"], values["CAin_max"]
+        q_values = [values["Q_min"] + (values["Q_max"] - values["Q_min"]) * i / 5 for i in range(6)]
+        if values["Q_max"] == values["Q_min"]:
+            q_values = q_values[:1]
+        # восемь постоянных времени самого медленного режима
+        t_end = 8.0 / (min(q_values) / Vr + min(k1, k2))
+        instrument.start_run()
+        try:
+            result = simulate_CSTR(
+                {"Q": q_values, "CA_in": ca_in, "k1": k1, "k2": k2, "Vr": Vr},
+                t_end, t_end / 500, method="adaptive",
+            )
+        except Exception as e:
+            messagebox.showerror("Ошибка", f"Не удалось выполнить расчёт:\n{e}")
+            return
+        with instrument.span("plot"):
+            TransientPlot(
+                self, result, [f"Q={q:g}" for q in q_values],
+                [steady_state(q, ca_in, k1, k2, Vr)[1] for q in q_values],
+                title=f"Пуск реактора, CA_in={ca_in:g}",
             )
+        self._show_timings()
+
+    # ---------- run history ----------
+    @staticmethod
+    def _load_run(run_id: int, progress=None, cancel=None) -> tuple:
+        from model_core import PARAM_NAMES, SweepResult, SweepStream, buffer_from_bytes
+
+        row = get_run(run_id)
+        if row is None:
+            raise ValueError(f"Расчёт №{run_id} не найден")
+        params = {k: row[k] for k in PARAM_NAMES}
+        data = get_run_data(run_id) if row["size"] else None
+        if data is None:
+            # сетка была слишком большой для истории: хранятся только параметры
+            return SweepStream(params).collect(progress, cancel), row
+        return SweepResult.from_params(params, buffer_from_bytes(data), row["engine"]), row
+
+    def _history_busy(self) -> bool:
+        if self.calc_worker is not None and self.calc_worker.is_alive():
+            messagebox.showinfo("История", "Дождитесь окончания расчёта")
+            return True
+        return False
+
+    def show_stored_run(self, run_id: int, overlay_id: Optional[int] = None) -> None:
+        """Show a stored run (optionally with another one overlaid); only runs
+        stored without their grid are recomputed."""
+        if not self._history_busy():
+            self._start_history_job("run", run_id, overlay_id)
+
+    def show_run_diff(self, base_id: int, other_id: int) -> None:
+        """CB of run ``other_id`` minus run ``base_id`` in the table and plot."""
+        if not self._history_busy():
+            self._start_history_job("diff", base_id, other_id)
+
+    def _start_history_job(self, mode: str, first_id: int, second_id: Optional[int]) -> None:
+        # распаковка больших сеток и пересчёт — в фоне, как обычный расчёт
+        instrument.start_run()
+        self.calc_cancel = threading.Event()
+        self.calc_queue = queue.Queue()
+        self.calc_run_id += 1
+        self.calc_worker = threading.Thread(
+            target=self._history_worker,
+            args=(mode, first_id, second_id, self.calc_cancel, self.calc_queue),
+            daemon=True,
+        )
+        self._set_calculating(True)
+        self.calc_worker.start()
+        self.after(50, self._poll_calculation, self.calc_run_id, self.last_params)
+
+    @staticmethod
+    def _history_worker(mode, first_id, second_id, cancel, out) -> None:
+        # выполняется в фоновом потоке: никаких обращений к Tk
+        from model_core import SweepCancelled, diff_results
 
-        if HAS_MPL and results:
-            self.ax.clear()
-            ca0 = results[0]["CA_in"]
-            xs = [r["Q"] for r in results if abs(r["CA_in"] - ca0) < 1e-9]
-            ys = [r["CB"] for r in results if abs(r["CA_in"] - ca0) < 1e-9]
-            self.ax.plot(xs, ys)
-            self.ax.set_xlabel("Q, л/мин")
-            self.ax.set_ylabel("CB, моль/л")
-            self.ax.set_title(f"CB(Q) при CA_in={ca0:g}")
-            self.canvas.draw()
+        def progress(done: int, total: int) -> None:
+            out.put(("progress", done, total))
 
-        messagebox.showinfo("Готово", f"Расчёт выполнен, точек: {len(results)}")
+        try:
+            with instrument.span("history"):
+                results, row = App._load_run(first_id, progress, cancel)
+                other = App._load_run(second_id, progress, cancel)[0] if second_id is not None else None
+            if mode == "diff":
+                try:
+                    diff = diff_results(results, other)
+                except ValueError as e:
+                    out.put(("error", str(e), f"Разность не построить:\n{e}"))
+                    return
+                out.put(("view", diff, App._plot_data(diff), f"разность №{second_id} − №{first_id}",
+                         f"Разность CB: №{second_id} − №{first_id}, общих точек: {len(diff)}", None, None))
+                return
+            text = f"Расчёт №{first_id}: {row['raw_type']}, {_format_time(row['created'])}, {row['username']}"
+            out.put(("view", results, App._plot_data(results), f"расчёт №{first_id}", text,
+                     other, f"№{second_id}"))
+        except SweepCancelled:
+            out.put(("cancelled",))
+        except ValueError as e:
+            out.put(("error", str(e), str(e)))
+        except Exception as e:
+            out.put(("error", str(e)))
+
+    def _show_stored(self, results: SweepResult, plot, label: str, text: str, overlay, overlay_name) -> str:
+        # только просмотр: last_results остаётся последним расчётом, из которого
+        # берутся повторно используемые точки, отчёт и Монте-Карло
+        if self.progress:
+            self.progress["value"] = 100
+        self._show_preview(results, plot)
+        self.stored_view = label
+        if overlay is not None:
+            if self.plot is None:
+                messagebox.showerror("Ошибка", "Для наложения нужен matplotlib")
+            else:
+                self.plot.set_overlay(overlay, overlay_name)
+                text += f"; пунктир — {overlay_name}"
+        return text
+
+    def _show_timings(self, profile_path: Optional[Path] = None) -> None:
+        rec = instrument.current()
+        text = f"Время: всего {rec.snapshot()['wall'] * 1e3:.0f} мс · {rec.summary()}"
+        if profile_path is not None:
+            try:
+                rec.write_trace(profile_path.with_suffix(".trace.json"))
+                text += f"\nПрофиль: {profile_path}"
+            except OSError as e:
+                text += f"\nПрофиль не сохранён: {e}"
+        self.status_var.set(text)
+
+    def find_in_table(self) -> None:
+        shown = self.table.result
+        if not shown:
+            return
+        try:
+            q = float(self.find_q_var.get() or shown.q_axis[0])
+            ca = float(self.find_ca_var.get() or shown.ca_axis[0])
+        except ValueError:
+            messagebox.showerror("Ошибка", "Некорректное значение Q или CA_in")
+            return
+        self.table.jump_to(q, ca)
 
     def save_report(self) -> None:
         if not self.last_results:
             messagebox.showwarning("Отчёт", "Нет данных для отчёта. Сначала выполните расчёт.")
             return
+        if self.stored_view is not None:
+            messagebox.showwarning("Отчёт", f"Показан {self.stored_view}: отчёт сохраняется для последнего "
+                                            "расчёта, выполните его снова.")
+            return
 
+        from report import HAS_PARQUET, export_result
+
+        filetypes = [
+            ("CSV файлы", "*.csv"),
+            ("NumPy массив", "*.npy"),
+            ("NumPy архив", "*.npz"),
+            ("Двоичный float64 с заголовком", "*.f64"),
+        ]
+        if HAS_PARQUET:
+            filetypes.append(("Parquet", "*.parquet"))
         filename = filedialog.asksaveasfilename(
             defaultextension=".csv",
-            filetypes=[("CSV файлы", "*.csv"), ("Все файлы", "*.*")],
+            filetypes=filetypes + [("Все файлы", "*.*")],
             title="Сохранить отчёт",
         )
         if not filename:
             return
 
         try:
-            with open(filename, "w", newline="", encoding="utf-8-sig") as f:
-                writer = csv.writer(f, delimiter=";")
-                p = self.last_params
-
-                writer.writerow(["Отчёт по расчёту реактора (вариант 8)"])
-                writer.writerow([])
-                writer.writerow(["Тип сырья", p.get("raw_type", "")])
-                writer.writerow(["Vr, л", p["Vr"]])
-                writer.writerow(["k1, 1/мин", p["k1"]])
-                writer.writerow(["k2, 1/мин", p["k2"]])
-                writer.writerow(["Q_min, л/мин", p["Q_min"]])
-                writer.writerow(["Q_max, л/мин", p["Q_max"]])
-                writer.writerow(["dQ, л/мин", p["dQ"]])
-                writer.writerow(["CAin_min, моль/л", p["CAin_min"]])
-                writer.writerow(["CAin_max, моль/л", p["CAin_max"]])
-                writer.writerow(["dCAin, моль/л", p["dCAin"]])
-                writer.writerow([])
-                writer.writerow(["Q, л/мин", "CA_in, моль/л", "CB, моль/л"])
-
-                for r in self.last_results:
-                    writer.writerow([
-                        f"{r['Q']:.2f}",
-                        f"{r['CA_in']:.3f}",
-                        f"{r['CB']:.4f}",
-                    ])
-
+            instrument.start_run()
+            with instrument.span("report"):
+                export_result(filename, self.last_params, self.last_results)
+            self._show_timings()
             messagebox.showinfo("Отчёт", f"Отчёт сохранён:\n{filename}")
         except Exception as e:
             messagebox.showerror("Ошибка", f"Не удалось сохранить отчёт:\n{e}")
@@ -303,6 +1099,8 @@ class App(tk.Tk):
 
         ttk.Button(left, text="Обновить список", command=self.reload_raw_list).pack(fill="x", pady=(8, 4))
         ttk.Button(left, text="Добавить тип", command=self.add_raw_type_dialog).pack(fill="x")
+        ttk.Button(left, text="Импорт каталога…", command=self.import_catalog_dialog).pack(fill="x", pady=(8, 4))
+        ttk.Button(left, text="Экспорт каталога…", command=self.export_catalog_dialog).pack(fill="x")
 
         self.admin_param_vars: Dict[str, tk.StringVar] = {}
         params = [
@@ -361,6 +1159,48 @@ class App(tk.Tk):
         update_coeffs(raw_id, coeffs)
         messagebox.showinfo("Готово", "Параметры обновлены")
 
+    def import_catalog_dialog(self) -> None:
+        filename = filedialog.askopenfilename(
+            filetypes=[("CSV/JSON файлы", "*.csv *.json"), ("Все файлы", "*.*")],
+            title="Импорт каталога сырья",
+        )
+        if not filename:
+            return
+
+        try:
+            report = import_catalog(read_catalog_file(filename))
+        except Exception as e:
+            messagebox.showerror("Ошибка", f"Не удалось импортировать каталог:\n{e}")
+            return
+
+        self.reload_raw_list()
+        text = f"Загружено записей: {report.imported}"
+        if report.errors:
+            lines = [f"запись {num}: {msg}" for num, msg in report.errors[:20]]
+            if len(report.errors) > 20:
+                lines.append(f"… и ещё {len(report.errors) - 20}")
+            text += f"\nОшибок: {len(report.errors)}\n\n" + "\n".join(lines)
+            messagebox.showwarning("Импорт", text)
+        else:
+            messagebox.showinfo("Импорт", text)
+
+    def export_catalog_dialog(self) -> None:
+        filename = filedialog.asksaveasfilename(
+            defaultextension=".csv",
+            filetypes=[("CSV файлы", "*.csv"), ("JSON файлы", "*.json"), ("Все файлы", "*.*")],
+            title="Экспорт каталога сырья",
+        )
+        if not filename:
+            return
+
+        try:
+            records = export_catalog()
+            write_catalog_file(filename, records)
+        except Exception as e:
+            messagebox.showerror("Ошибка", f"Не удалось экспортировать каталог:\n{e}")
+            return
+        messagebox.showinfo("Экспорт", f"Сохранено записей: {len(records)}\n{filename}")
+
     def add_raw_type_dialog(self) -> None:
         win = tk.Toplevel(self)
         win.title("Добавить тип сырья")
@@ -0,0 +1,251 @@
+"""Headless batch runner: sweeps raw types from the catalogue without Tk.
+
+Run from the ``src`` directory::
+
+    python -m batch --all --format npz --out results
+    python -m batch --raw-type "Сырьё A" --dQ 0.01 --format csv
+    python -m batch --job nightly.json --json
+    python -m batch --all --timings --profile batch.prof
+
+Only db, model_core and report are imported, never a GUI module.
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import re
+import sys
+import time
+from contextlib import nullcontext
+from pathlib import Path
+from typing import Any, Dict, Iterable, Iterator, List, Optional
+
+import db
+import instrument
+from db import get_coeffs, get_raw_types
+from model_core import PARAM_NAMES, SweepResult, iter_sweep_CB, native_selection, run_sweeps, sweep_CB
+from report import export_result
+
+try:
+    import resource
+    HAS_RESOURCE = True
+except ImportError:  # Windows
+    HAS_RESOURCE = False
+
+
+def _peak_rss_mb() -> Optional[float]:
+    """Peak resident set size of the process so far, in MiB (None if unknown)."""
+    if not HAS_RESOURCE:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # kilobytes on Linux, bytes on macOS
+    return peak / 2**20 if sys.platform == "darwin" else peak / 2**10
+
+
+def load_sweep_params(raw_type_ids: Optional[Iterable[int]] = None) -> Dict[str, Dict[str, float]]:
+    """Sweep parameters by raw type name, for the given ids or all types.
+
+    Raw types without coefficients are skipped.
+    """
+    wanted = None if raw_type_ids is None else set(raw_type_ids)
+    params: Dict[str, Dict[str, float]] = {}
+    for rt in get_raw_types():
+        if wanted is not None and rt["id"] not in wanted:
+            continue
+        coeffs = get_coeffs(rt["id"])
+        if coeffs:
+            params[rt["name"]] = {k: float(coeffs[k]) for k in PARAM_NAMES}
+    return params
+
+
+def sweep_raw_types(
+    raw_type_ids: Optional[Iterable[int]] = None,
+    workers: Optional[int] = None,
+    chunk_points: Optional[int] = None,
+    engine: Optional[str] = None,
+    executor: str = "thread",
+    overrides: Optional[Dict[str, float]] = None,
+) -> Dict[str, SweepResult]:
+    """Sweep several raw types (all by default) as one concurrent job.
+
+    The Q bands of every raw type share a single worker pool; results are
+    keyed by raw type name in catalogue order. ``overrides`` replaces
+    parameters of every raw type (e.g. a finer dQ).
+    """
+    params = load_sweep_params(raw_type_ids)
+    if overrides:
+        params = {name: {**p, **overrides} for name, p in params.items()}
+    results = run_sweeps(list(params.values()), workers, chunk_points, engine, executor)
+    return dict(zip(params, results))
+
+
+# ---------- command line ----------
+
+FORMATS = ("csv", "npy", "npz", "f64", "parquet")
+
+
+def _parse_args(argv: Optional[List[str]]) -> argparse.Namespace:
+    ap = argparse.ArgumentParser(prog="python -m batch", description="Пакетный расчёт CB без GUI")
+    ap.add_argument("--job", help="JSON-файл задания (ключи совпадают с параметрами командной строки)")
+    ap.add_argument("--raw-type", action="append", dest="raw_types", metavar="NAME",
+                    help="тип сырья (можно указать несколько раз)")
+    ap.add_argument("--all", action="store_true", help="все типы сырья из каталога")
+    for name in PARAM_NAMES:
+        ap.add_argument(f"--{name}", type=float, help=f"переопределить {name}")
+    ap.add_argument("--format", choices=FORMATS, help="формат результата (по умолчанию npz)")
+    ap.add_argument("--out", help="каталог для результатов (по умолчанию текущий)")
+    ap.add_argument("--db", help="путь к reactor.db")
+    ap.add_argument("--engine", help="движок расчёта: native, numpy, python")
+    ap.add_argument("--workers", type=int,
+                    help="число потоков/процессов на все типы сырья сразу (1 = потоковый расчёт)")
+    ap.add_argument("--executor", choices=("thread", "process"))
+    ap.add_argument("--chunk-points", type=int, dest="chunk_points")
+    ap.add_argument("--json", action="store_true", help="вывести сводку в JSON")
+    ap.add_argument("--timings", action="store_true", help="время по этапам и счётчики для каждого расчёта")
+    ap.add_argument("--profile", help="записать профиль cProfile всего задания в файл")
+    args = ap.parse_args(argv)
+
+    # the job file fills in whatever was not given on the command line
+    if args.job:
+        with open(args.job, encoding="utf-8") as f:
+            job = json.load(f)
+        overrides = job.pop("overrides", {})
+        for key, value in {**job, **overrides}.items():
+            key = key.replace("-", "_")
+            if not hasattr(args, key):
+                ap.error(f"неизвестный ключ задания: {key}")
+            if getattr(args, key) in (None, False):
+                setattr(args, key, value)
+    return args
+
+
+def _overrides(args: argparse.Namespace) -> Dict[str, float]:
+    return {k: float(getattr(args, k)) for k in PARAM_NAMES if getattr(args, k) is not None}
+
+
+def _job_raw_type_ids(args: argparse.Namespace) -> Optional[List[int]]:
+    """Catalogue ids picked by --raw-type; None means all (--all)."""
+    if args.all:
+        return None
+    ids = {rt["name"]: rt["id"] for rt in get_raw_types()}
+    missing = [name for name in args.raw_types if name not in ids]
+    if missing:
+        raise SystemExit(f"неизвестный тип сырья: {', '.join(missing)}")
+    return [ids[name] for name in args.raw_types]
+
+
+def _job_params(args: argparse.Namespace) -> Dict[str, Dict[str, float]]:
+    overrides = _overrides(args)
+
+    if args.all or args.raw_types:
+        params = load_sweep_params(_job_raw_type_ids(args))
+    elif len(overrides) == len(PARAM_NAMES):
+        return {"custom": overrides}
+    else:
+        raise SystemExit("укажите --raw-type, --all или все девять параметров")
+
+    return {name: {**p, **overrides} for name, p in params.items()}
+
+
+def _format_mem(mb: Optional[float]) -> str:
+    return f"пик памяти процесса {mb:.1f} МБ" if mb is not None else "пик памяти н/д"
+
+
+def _safe_name(name: str) -> str:
+    return re.sub(r"[^\w.-]+", "_", name).strip("_") or "sweep"
+
+
+def run_job(name: str, params: Dict[str, float], args: argparse.Namespace) -> Dict[str, Any]:
+    """Sweep one parameter set, export it and return the run statistics."""
+    args_9 = [params[k] for k in PARAM_NAMES]
+
+    instrument.start_run()
+    t0 = time.perf_counter()
+    if args.workers and args.workers != 1:
+        source: Any = sweep_CB(*args_9, engine=args.engine, workers=args.workers,
+                               chunk_points=args.chunk_points, executor=args.executor or "thread")
+    else:
+        kwargs = {"chunk_points": args.chunk_points} if args.chunk_points else {}
+        source = iter_sweep_CB(*args_9, engine=args.engine, **kwargs)
+    return _export_job(name, params, source, args, t0)
+
+
+def run_pooled(args: argparse.Namespace) -> Iterator[Dict[str, Any]]:
+    """Sweep the selected raw types in one worker pool, then export each.
+
+    Yields the run statistics per raw type; ``wall_s`` is the time from the
+    start of the shared sweep until that raw type's file was written.
+    """
+    instrument.start_run()
+    t0 = time.perf_counter()
+    results = sweep_raw_types(_job_raw_type_ids(args), args.workers, args.chunk_points, args.engine,
+                              args.executor or "thread", overrides=_overrides(args))
+    for name, result in results.items():
+        yield _export_job(name, result.params, result, args, t0)
+
+
+def _export_job(name: str, params: Dict[str, float], source: Any, args: argparse.Namespace,
+                t0: float) -> Dict[str, Any]:
+    out_dir = Path(args.out or ".")
+    out_dir.mkdir(parents=True, exist_ok=True)
+    path = out_dir / f"{_safe_name(name)}.{args.format or 'npz'}"
+    with instrument.span("report"):
+        points = export_result(path, {"raw_type": name, **params}, source)
+    wall = time.perf_counter() - t0
+
+    run = {
+        "raw_type": name,
+        "output": str(path),
+        "points": points,
+        "wall_s": wall,
+        "points_per_s": points / wall if wall > 0 else 0.0,
+        # high-water mark of the whole process so far, not of this job alone:
+        # later jobs report at least the peak of the largest earlier one
+        "process_peak_mem_mb": _peak_rss_mb(),
+    }
+    if instrument.ENABLED:
+        run["timings"] = instrument.current().snapshot()
+    return run
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    args = _parse_args(argv)
+    if args.timings:
+        instrument.enable()
+    if args.db:
+        db.DB_PATH = Path(args.db)
+    db.init_db()
+
+    if not args.json:
+        native = native_selection()
+        if native["variant"]:
+            print(f"native: {native['variant']}, потоков: {native['threads']} ({native['reason']})", file=sys.stderr)
+            if not native["batched"]:
+                print("native: в библиотеке нет пакетных функций, считает numpy/python", file=sys.stderr)
+        else:
+            print(f"native: нет ({native.get('error')})", file=sys.stderr)
+
+    stats = []
+    with instrument.profile_to(args.profile) if args.profile else nullcontext():
+        if args.workers and args.workers != 1 and (args.all or args.raw_types):
+            # one pool for all raw types rather than one sweep after another
+            runs: Iterable[Dict[str, Any]] = run_pooled(args)
+        else:
+            runs = (run_job(name, params, args) for name, params in _job_params(args).items())
+        for run in runs:
+            stats.append(run)
+            if not args.json:
+                print(f"{run['raw_type']}: {run['points']} точек, {run['wall_s']:.3f} с, "
+                      f"{run['points_per_s']:.0f} точек/с, {_format_mem(run['process_peak_mem_mb'])} "
+                      f"-> {run['output']}")
+                if "timings" in run:
+                    print(f"  {instrument.current().summary()}")
+
+    if args.json:
+        json.dump(stats, sys.stdout, ensure_ascii=False, indent=1)
+        print()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,313 @@
+"""Benchmarks for the compute, storage, table and export hot paths.
+
+Run from the ``src`` directory::
+
+    python -m bench --out bench.json
+    python -m bench --baseline bench.json --threshold 0.25
+
+Results are written as JSON. With ``--baseline`` every benchmark is
+compared with the stored value and the exit code is 1 if any of them got
+slower by more than its threshold, so a release build can be gated on it.
+No display is needed: the results table is driven through a widget stub.
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import platform
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional
+
+import db
+import model_core
+from model_core import PARAM_NAMES, available_engines, sweep_CB
+
+
+def _best(func: Callable[[], Any], repeat: int) -> float:
+    """Best wall time of ``repeat`` runs, in seconds."""
+    best = float("inf")
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - t0)
+    return best
+
+
+def _grid(points: int) -> tuple:
+    """Sweep arguments for a roughly ``points``-point grid (100 CA_in columns)."""
+    n_Q = max(1, points // 100)
+    return (0.1, 0.2, 10.0, 1.0, 1.0 + (n_Q - 1) * 0.01, 0.01, 0.1, 0.1 + 99 * 0.001, 0.001)
+
+
+class Bench:
+    def __init__(self, repeat: int, quick: bool) -> None:
+        self.repeat = repeat
+        self.quick = quick
+        self.results: Dict[str, Dict[str, Any]] = {}
+        self.skipped: Dict[str, str] = {}
+
+    def record(self, name: str, value: float, unit: str, better: str = "lower") -> None:
+        self.results[name] = {"value": value, "unit": unit, "better": better}
+        print(f"  {name:<40} {value:>14.6g} {unit}", flush=True)
+
+    # ---------- compute ----------
+    def compute_scalar(self) -> None:
+        if "native" not in available_engines():
+            self.skipped["compute.scalar_ffi"] = "native library not available"
+            return
+        n = 20_000 if self.quick else 200_000
+        f = model_core.compute_CB
+
+        def run() -> None:
+            for i in range(n):
+                f(1.0 + i, 0.5, 0.1, 0.2, 10.0)
+
+        self.record("compute.scalar_ffi", _best(run, self.repeat) / n * 1e9, "ns/call")
+
+    def compute_sweep(self) -> None:
+        sizes = [10_000, 100_000] if self.quick else [10_000, 100_000, 1_000_000, 4_000_000]
+        for engine in available_engines():
+            for size in sizes:
+                if engine == "python" and size > 100_000:
+                    continue
+                args = _grid(size)
+                points = len(sweep_CB(*args, engine=engine))
+                t = _best(lambda: sweep_CB(*args, engine=engine), self.repeat)
+                self.record(f"sweep.{engine}.{size}", points / t, "points/s", "higher")
+
+    def compute_transient(self) -> None:
+        n = 200 if self.quick else 2000
+        reactors = {"Q": [0.5 + 9.5 * i / n for i in range(n)], "CA_in": 1.0, "k1": 0.1, "k2": 0.2, "Vr": 10.0}
+        for engine in available_engines():
+            if engine == "python":
+                continue
+            for method in ("rk4", "adaptive"):
+                t = _best(lambda: model_core.simulate_CSTR(reactors, 60.0, 0.1, method=method, engine=engine),
+                          self.repeat)
+                self.record(f"transient.{engine}.{method}", n / t, "reactors/s", "higher")
+
+    # ---------- storage ----------
+    def storage(self, tmp: Path) -> None:
+        saved = db.DB_PATH
+        db.DB_PATH = tmp / "bench.db"
+        try:
+            db.init_db()
+            raw_id = db.get_raw_types()[0]["id"]
+            coeffs = {k: float(db.get_coeffs(raw_id)[k]) for k in PARAM_NAMES}
+            n = 200 if self.quick else 2000
+
+            def cold() -> None:
+                for _ in range(n):
+                    db.invalidate_read_cache()
+                    db.get_coeffs(raw_id)
+
+            def warm() -> None:
+                for _ in range(n):
+                    db.get_coeffs(raw_id)
+
+            def update() -> None:
+                for i in range(n // 10):
+                    db.update_coeffs(raw_id, {**coeffs, "k1": 0.1 + i * 1e-6})
+
+            self.record("db.get_coeffs.uncached", _best(cold, self.repeat) / n * 1e6, "us/call")
+            self.record("db.get_coeffs.cached", _best(warm, self.repeat) / n * 1e6, "us/call")
+            self.record("db.update_coeffs", _best(update, self.repeat) / (n // 10) * 1e6, "us/call")
+        finally:
+            db.close_connection()
+            db.DB_PATH = saved
+
+    # ---------- results table ----------
+    def table(self) -> None:
+        try:
+            from app import VirtualTable
+        except Exception as e:  # tkinter itself missing
+            self.skipped["table"] = f"app not importable: {e}"
+            return
+
+        result = sweep_CB(*_grid(100_000 if self.quick else 1_000_000))
+        table = _stub_table(VirtualTable)
+        pages = 200 if self.quick else 2000
+
+        self.record("table.set_result", _best(lambda: table.set_result(result), self.repeat) * 1e3, "ms")
+
+        def scroll() -> None:
+            table.set_result(result)
+            for _ in range(pages):
+                table.scroll_rows(table.page)
+
+        self.record("table.page_render", _best(scroll, self.repeat) / pages * 1e6, "us/page")
+        self.record("table.sort_CB", _best(lambda: table.sort_by("CB"), self.repeat) * 1e3, "ms")
+
+    # ---------- export ----------
+    def export(self, tmp: Path) -> None:
+        from report import export_result
+
+        result = sweep_CB(*_grid(100_000 if self.quick else 1_000_000))
+        params = {"raw_type": "bench", **result.params}
+        for ext in (".csv", ".npy", ".npz", ".f64"):
+            path = tmp / f"export{ext}"
+            t = _best(lambda: export_result(path, params, result), self.repeat)
+            self.record(f"export{ext}", len(result) / t, "points/s", "higher")
+
+
+class _StubTree:
+    """Just enough of ttk.Treeview/Scrollbar for VirtualTable, without a display."""
+
+    def __init__(self) -> None:
+        self.items: Dict[str, Any] = {}
+
+    def get_children(self) -> tuple:
+        return tuple(self.items)
+
+    def insert(self, parent: str, index: str, iid: str, **kw) -> str:
+        self.items[iid] = ()
+        return iid
+
+    def delete(self, *iids: str) -> None:
+        for iid in iids:
+            del self.items[iid]
+
+    def item(self, iid: str, values: Any = None) -> None:
+        self.items[iid] = values
+
+    def selection_set(self, items: Any) -> None:
+        pass
+
+    def heading(self, *args, **kw) -> None:
+        pass
+
+    def set(self, first: float, last: float) -> None:
+        pass
+
+
+def _stub_table(cls: type) -> Any:
+    # VirtualTable without Tk: skip the widget constructor, give it stubs
+    table = cls.__new__(cls)
+    table.tree = _StubTree()
+    table.scroll = _StubTree()
+    table.result = None
+    table.order = table.inverse = None
+    table.sort_column = None
+    table.sort_desc = False
+    table.top = 0
+    table.page = 18
+    table.marked = None
+    return table
+
+
+# benchmark name prefixes of each --only group
+GROUPS = {
+    "compute": ("compute.", "sweep.", "transient."),
+    "storage": ("db.",),
+    "table": ("table.",),
+    "export": ("export.",),
+}
+
+
+def compare(results: Dict[str, Any], baseline: Dict[str, Any], threshold: float,
+            overrides: Dict[str, float], groups: Optional[set] = None,
+            skipped: Optional[Dict[str, str]] = None) -> List[str]:
+    """Names of benchmarks slower than baseline by more than their threshold.
+
+    A baseline benchmark of a group that was run but that is missing from
+    ``results`` (removed, crashed or skipped) counts as a failure too.
+    """
+    prefixes = tuple(p for g in (groups or GROUPS) for p in GROUPS[g])
+    skipped = skipped or {}
+    regressions = []
+    for name, base in baseline.get("results", {}).items():
+        cur = results.get(name)
+        if cur is None:
+            if name.startswith(prefixes):
+                why = skipped.get(name) or skipped.get(name.split(".", 1)[0]) or "not run"
+                print(f"  {name:<40} MISSING ({why})")
+                regressions.append(name)
+            continue
+        if not base["value"]:
+            continue
+        thr = overrides.get(name, threshold)
+        if base["better"] == "higher":
+            slowdown = base["value"] / cur["value"] if cur["value"] else float("inf")
+        else:
+            slowdown = cur["value"] / base["value"]
+        status = "REGRESSION" if slowdown > 1 + thr else "ok"
+        print(f"  {name:<40} x{slowdown:6.2f} (limit x{1 + thr:.2f}) {status}")
+        if status != "ok":
+            regressions.append(name)
+    return regressions
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    ap = argparse.ArgumentParser(prog="python -m bench", description=__doc__.splitlines()[0])
+    ap.add_argument("--out", help="куда записать результаты (JSON)")
+    ap.add_argument("--baseline", help="JSON с эталонными результатами для сравнения")
+    ap.add_argument("--threshold", type=float, default=0.25,
+                    help="допустимое замедление, доля (по умолчанию 0.25 = 25%%)")
+    ap.add_argument("--limit", action="append", default=[], metavar="NAME=THRESHOLD",
+                    help="порог для отдельного бенчмарка")
+    ap.add_argument("--only", action="append", default=[], choices=list(GROUPS),
+                    help="группы: compute, storage, table, export")
+    ap.add_argument("--repeat", type=int, default=5)
+    ap.add_argument("--quick", action="store_true", help="меньшие размеры задач")
+    args = ap.parse_args(argv)
+
+    overrides = {}
+    for item in args.limit:
+        name, _, value = item.partition("=")
+        overrides[name] = float(value)
+
+    groups = set(args.only) or {"compute", "storage", "table", "export"}
+    # a fast but wrong engine must not pass the gate
+    try:
+        deviations = model_core.check_engines()
+    except RuntimeError as e:
+        print(f"engine check failed: {e}", file=sys.stderr)
+        return 1
+    bench = Bench(args.repeat, args.quick)
+    with tempfile.TemporaryDirectory() as tmp:
+        if "compute" in groups:
+            bench.compute_scalar()
+            bench.compute_sweep()
+            bench.compute_transient()
+        if "storage" in groups:
+            bench.storage(Path(tmp))
+        if "table" in groups:
+            bench.table()
+        if "export" in groups:
+            bench.export(Path(tmp))
+
+    report = {
+        "meta": {
+            "time": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "python": sys.version.split()[0],
+            "platform": platform.platform(),
+            "engines": available_engines(),
+            "native": model_core.native_selection(),
+            "engine_check": deviations,
+            "model_version": model_core.MODEL_VERSION,
+            "quick": args.quick,
+            "repeat": args.repeat,
+        },
+        "results": bench.results,
+        "skipped": bench.skipped,
+    }
+    for name, why in bench.skipped.items():
+        print(f"  {name:<40} skipped: {why}")
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=1)
+
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as f:
+            baseline = json.load(f)
+        print("compare with", args.baseline)
+        if compare(bench.results, baseline, args.threshold, overrides, groups, bench.skipped):
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
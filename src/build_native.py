@@ -0,0 +1,89 @@
+"""Build the native model (reactor_model.c) for Linux and macOS.
+
+Run from the ``src`` directory::
+
+    python build_native.py                  # every variant this compiler/CPU family supports
+    python build_native.py scalar openmp    # only some of them
+    CC=clang python build_native.py
+
+Each variant is a separate library next to this file
+(``libreactor_model_<variant>.so``, the scalar one also as
+``libreactor_model.so``); model_core picks the best one at load time.
+All variants compile with -ffp-contract=off, so they return the same
+numbers as each other.
+"""
+from __future__ import annotations
+
+import argparse
+import os
+import platform
+import shutil
+import subprocess
+import sys
+from pathlib import Path
+from typing import Dict, List, Optional
+
+BASE_DIR = Path(__file__).resolve().parent
+SOURCE = BASE_DIR / "reactor_model.c"
+
+_X86 = platform.machine().lower() in ("x86_64", "amd64", "i686", "i386")
+
+# variant -> extra compiler flags; the order is also the preference order
+# model_core uses when the CPU supports several (best first)
+VARIANTS: Dict[str, List[str]] = {
+    "avx512_openmp": ["-O3", "-mavx512f", "-mavx512dq", "-mavx2", "-fopenmp"],
+    "avx2_openmp": ["-O3", "-mavx2", "-fopenmp"],
+    "openmp": ["-O3", "-fopenmp"],
+    "avx512": ["-O3", "-mavx512f", "-mavx512dq", "-mavx2"],
+    "avx2": ["-O3", "-mavx2"],
+    "scalar": ["-O2", "-fno-tree-vectorize"],
+}
+COMMON_FLAGS = ["-shared", "-fPIC", "-ffp-contract=off", "-Wall"]
+
+
+def library_name(variant: Optional[str] = None) -> str:
+    if sys.platform == "darwin":
+        prefix, ext = "lib", ".dylib"
+    elif sys.platform.startswith("win"):
+        prefix, ext = "", ".dll"
+    else:
+        prefix, ext = "lib", ".so"
+    return f"{prefix}reactor_model{'_' + variant if variant else ''}{ext}"
+
+
+def build(variant: str, cc: str) -> Path:
+    out = BASE_DIR / library_name(variant)
+    cmd = [cc, *VARIANTS[variant], *COMMON_FLAGS, f'-DREACTOR_VARIANT="{variant}"',
+           "-o", str(out), str(SOURCE), "-lm"]
+    subprocess.run(cmd, check=True)
+    return out
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    ap = argparse.ArgumentParser(description="Сборка reactor_model для Linux/macOS")
+    ap.add_argument("variants", nargs="*", metavar="VARIANT",
+                    help=f"варианты сборки: {', '.join(VARIANTS)} (по умолчанию все)")
+    ap.add_argument("--cc", default=os.environ.get("CC", "cc"), help="компилятор C (по умолчанию $CC или cc)")
+    args = ap.parse_args(argv)
+    unknown = [v for v in args.variants if v not in VARIANTS]
+    if unknown:
+        ap.error(f"неизвестный вариант: {', '.join(unknown)}")
+
+    variants = args.variants or [v for v in VARIANTS if _X86 or not v.startswith("avx")]
+    failed = []
+    for variant in variants:
+        try:
+            path = build(variant, args.cc)
+        except (OSError, subprocess.CalledProcessError) as e:
+            # e.g. no OpenMP runtime or an old compiler without AVX-512
+            print(f"{variant}: не собран ({e})", file=sys.stderr)
+            failed.append(variant)
+            continue
+        print(f"{variant}: {path.name}")
+        if variant == "scalar":
+            shutil.copyfile(path, BASE_DIR / library_name())
+    return 1 if failed and len(failed) == len(variants) else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
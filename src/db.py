@@ -1,26 +1,116 @@
 from __future__ import annotations
 
+import csv
+import json
+import math
 import sqlite3
-from contextlib import contextmanager
+import threading
+import time
+import zlib
+from contextlib import contextmanager, nullcontext
 from pathlib import Path
-from typing import Dict, List, Optional
+from typing import Any, Callable, Dict, Iterable, List, NamedTuple, Optional, Tuple
+
+import instrument
 
 DB_PATH = Path(__file__).resolve().parent / "reactor.db"
 
+# one long-lived connection per thread; WAL lets background readers run
+# while another thread writes
+_local = threading.local()
+
+_PRAGMAS = (
+    "PRAGMA journal_mode=WAL",
+    "PRAGMA synchronous=NORMAL",
+    "PRAGMA temp_store=MEMORY",
+    "PRAGMA cache_size=-16000",
+    "PRAGMA busy_timeout=5000",
+)
+
+
+def _thread_connection() -> sqlite3.Connection:
+    conn = getattr(_local, "conn", None)
+    if conn is not None and _local.path == DB_PATH:
+        return conn
+    if conn is not None:
+        conn.close()
+
+    conn = sqlite3.connect(DB_PATH, timeout=5.0, cached_statements=256)
+    conn.row_factory = sqlite3.Row
+    for pragma in _PRAGMAS:
+        conn.execute(pragma)
+    _local.conn = conn
+    _local.path = DB_PATH
+    _local.depth = 0
+    return conn
+
 
 @contextmanager
 def get_connection():
-    conn = sqlite3.connect(DB_PATH)
-    conn.row_factory = sqlite3.Row
+    """This thread's connection; the outermost block commits or rolls back."""
+    conn = _thread_connection()
+    _local.depth += 1
+    instrument.count("db_queries")
+    timer = instrument.span("db") if _local.depth == 1 else nullcontext()
     try:
-        yield conn
-        conn.commit()
+        with timer:
+            yield conn
+            if _local.depth == 1:
+                conn.commit()
+    except BaseException:
+        if _local.depth == 1:
+            conn.rollback()
+        raise
     finally:
+        _local.depth -= 1
+
+
+def close_connection() -> None:
+    """Close this thread's connection (it is reopened on next use)."""
+    conn = getattr(_local, "conn", None)
+    if conn is not None:
         conn.close()
+        _local.conn = None
+
+
+# read-through cache for the catalogue; writers below invalidate it
+_cache_lock = threading.Lock()
+_raw_types_cache: Optional[List[sqlite3.Row]] = None
+_coeffs_cache: Dict[int, Optional[sqlite3.Row]] = {}
+# bumped by every invalidation; a reader stores what it fetched only if
+# no write was invalidated while it was reading
+_cache_generation = 0
+# DB_PATH the cache was filled from (bench/batch --db repoint DB_PATH)
+_cache_path: Optional[Path] = None
+
+
+def _check_cache_path() -> None:
+    """Drop the cache if DB_PATH changed since it was filled; call under _cache_lock."""
+    global _raw_types_cache, _cache_generation, _cache_path
+    if _cache_path != DB_PATH:
+        _raw_types_cache = None
+        _coeffs_cache.clear()
+        _cache_generation += 1
+        _cache_path = DB_PATH
+
+
+def invalidate_read_cache() -> None:
+    global _raw_types_cache, _cache_generation
+    with _cache_lock:
+        _raw_types_cache = None
+        _coeffs_cache.clear()
+        _cache_generation += 1
+
+
+# bump together with any change to the DDL or seed data in init_db
+SCHEMA_VERSION = 2
 
 
 def init_db() -> None:
     with get_connection() as conn:
+        if conn.execute("PRAGMA user_version").fetchone()[0] >= SCHEMA_VERSION:
+            return
+
         cur = conn.cursor()
 
         cur.execute(
@@ -61,6 +151,69 @@ def init_db() -> None:
             )
             """
         )
+        # one coefficient set per raw type; older databases were not
+        # constrained, keep the row get_coeffs used to return
+        cur.execute(
+            """
+            DELETE FROM kinetic_coeffs WHERE id NOT IN (
+                SELECT MIN(id) FROM kinetic_coeffs GROUP BY raw_type_id
+            )
+            """
+        )
+        cur.execute(
+            "CREATE UNIQUE INDEX IF NOT EXISTS idx_kinetic_coeffs_raw_type ON kinetic_coeffs(raw_type_id)"
+        )
+
+        cur.execute(
+            """
+            CREATE TABLE IF NOT EXISTS sweep_cache (
+                key TEXT PRIMARY KEY,
+                raw_type_id INTEGER,
+                engine TEXT NOT NULL,
+                size INTEGER NOT NULL,
+                last_used REAL NOT NULL,
+                data BLOB NOT NULL
+            )
+            """
+        )
+        cur.execute("CREATE INDEX IF NOT EXISTS idx_sweep_cache_raw_type ON sweep_cache(raw_type_id)")
+
+        # run history: metadata in runs, the CB grid in run_data, so that
+        # listing runs never reads the blobs
+        cur.execute(
+            """
+            CREATE TABLE IF NOT EXISTS runs (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                raw_type_id INTEGER,
+                raw_type TEXT NOT NULL,
+                username TEXT NOT NULL,
+                created REAL NOT NULL,
+                engine TEXT NOT NULL,
+                wall_s REAL NOT NULL,
+                points INTEGER NOT NULL,
+                size INTEGER NOT NULL,
+                k1 REAL NOT NULL,
+                k2 REAL NOT NULL,
+                Vr REAL NOT NULL,
+                Q_min REAL NOT NULL,
+                Q_max REAL NOT NULL,
+                dQ REAL NOT NULL,
+                CAin_min REAL NOT NULL,
+                CAin_max REAL NOT NULL,
+                dCAin REAL NOT NULL
+            )
+            """
+        )
+        cur.execute(
+            """
+            CREATE TABLE IF NOT EXISTS run_data (
+                run_id INTEGER PRIMARY KEY REFERENCES runs(id),
+                data BLOB NOT NULL
+            )
+            """
+        )
+        cur.execute("CREATE INDEX IF NOT EXISTS idx_runs_raw_type ON runs(raw_type_id, created)")
+        cur.execute("CREATE INDEX IF NOT EXISTS idx_runs_created ON runs(created)")
 
         cur.execute("SELECT COUNT(*) FROM users")
         if cur.fetchone()[0] == 0:
@@ -81,6 +234,8 @@ def init_db() -> None:
                 raw_id = add_raw_type(name)
                 update_coeffs(raw_id, coeffs)
 
+        cur.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
+
 
 def authenticate(username: str, password: str) -> Optional[sqlite3.Row]:
     with get_connection() as conn:
@@ -91,55 +246,351 @@ def authenticate(username: str, password: str) -> Optional[sqlite3.Row]:
 
 
 def get_raw_types() -> List[sqlite3.Row]:
+    global _raw_types_cache
+    with _cache_lock:
+        _check_cache_path()
+        if _raw_types_cache is not None:
+            return list(_raw_types_cache)
+        generation = _cache_generation
     with get_connection() as conn:
-        return conn.execute("SELECT * FROM raw_types ORDER BY name").fetchall()
+        rows = conn.execute("SELECT * FROM raw_types ORDER BY name").fetchall()
+    with _cache_lock:
+        _check_cache_path()
+        if generation == _cache_generation:
+            _raw_types_cache = rows
+    return list(rows)
 
 
 def get_coeffs(raw_type_id: int) -> Optional[sqlite3.Row]:
+    with _cache_lock:
+        _check_cache_path()
+        if raw_type_id in _coeffs_cache:
+            return _coeffs_cache[raw_type_id]
+        generation = _cache_generation
     with get_connection() as conn:
-        return conn.execute(
+        row = conn.execute(
             "SELECT * FROM kinetic_coeffs WHERE raw_type_id=?",
             (raw_type_id,),
         ).fetchone()
+    with _cache_lock:
+        _check_cache_path()
+        if generation == _cache_generation:
+            _coeffs_cache[raw_type_id] = row
+    return row
+
+
+# called with raw_type_id after its coefficients change
+_coeffs_listeners: List[Callable[[int], None]] = []
+
+
+def add_coeffs_listener(callback: Callable[[int], None]) -> None:
+    _coeffs_listeners.append(callback)
 
 
 _COEFF_ORDER = ["k1", "k2", "Vr", "Q_min", "Q_max", "dQ", "CAin_min", "CAin_max", "dCAin"]
 
 
+_UPSERT_COEFFS = """
+    INSERT INTO kinetic_coeffs (
+        raw_type_id, k1, k2, Vr,
+        Q_min, Q_max, dQ,
+        CAin_min, CAin_max, dCAin
+    ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+    ON CONFLICT(raw_type_id) DO UPDATE SET
+        k1=excluded.k1, k2=excluded.k2, Vr=excluded.Vr,
+        Q_min=excluded.Q_min, Q_max=excluded.Q_max, dQ=excluded.dQ,
+        CAin_min=excluded.CAin_min, CAin_max=excluded.CAin_max, dCAin=excluded.dCAin
+"""
+
+
+def _coeffs_changed(raw_type_ids: Iterable[int]) -> None:
+    global _cache_generation
+    ids = list(raw_type_ids)
+    with _cache_lock:
+        for raw_type_id in ids:
+            _coeffs_cache.pop(raw_type_id, None)
+        _cache_generation += 1
+    for raw_type_id in ids:
+        for callback in _coeffs_listeners:
+            callback(raw_type_id)
+
+
 def update_coeffs(raw_type_id: int, coeffs: Dict[str, float]) -> None:
     values = [float(coeffs[k]) for k in _COEFF_ORDER]
 
     with get_connection() as conn:
-        exists = conn.execute(
-            "SELECT 1 FROM kinetic_coeffs WHERE raw_type_id=?",
-            (raw_type_id,),
-        ).fetchone()
+        conn.execute(_UPSERT_COEFFS, (raw_type_id, *values))
+        conn.execute("DELETE FROM sweep_cache WHERE raw_type_id=?", (raw_type_id,))
 
-        if exists:
-            conn.execute(
-                """
-                UPDATE kinetic_coeffs SET
-                    k1=?, k2=?, Vr=?,
-                    Q_min=?, Q_max=?, dQ=?,
-                    CAin_min=?, CAin_max=?, dCAin=?
-                WHERE raw_type_id=?
-                """,
-                (*values, raw_type_id),
-            )
-        else:
-            conn.execute(
-                """
-                INSERT INTO kinetic_coeffs (
-                    raw_type_id, k1, k2, Vr,
-                    Q_min, Q_max, dQ,
-                    CAin_min, CAin_max, dCAin
-                ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-                """,
-                (raw_type_id, *values),
-            )
+    _coeffs_changed([raw_type_id])
 
 
 def add_raw_type(name: str) -> int:
     with get_connection() as conn:
         cur = conn.execute("INSERT INTO raw_types (name) VALUES (?)", (name,))
-        return int(cur.lastrowid)
+    invalidate_read_cache()
+    return int(cur.lastrowid)
+
+
+# ---------- bulk import / export ----------
+
+CATALOG_FIELDS = ["name", *_COEFF_ORDER]
+
+
+class ImportReport(NamedTuple):
+    imported: int
+    errors: List[Tuple[int, str]]   # (record number, message)
+
+
+def _validate_record(record: Dict[str, Any]) -> Tuple[str, Optional[List[float]]]:
+    """Name and coefficient values of one catalogue record (None = name only)."""
+    name = str(record.get("name") or "").strip()
+    if not name:
+        raise ValueError("не указано название")
+
+    raw = [record.get(k) for k in _COEFF_ORDER]
+    if all(v is None or str(v).strip() == "" for v in raw):
+        return name, None
+
+    values = []
+    for key, v in zip(_COEFF_ORDER, raw):
+        try:
+            values.append(float(str(v).replace(",", ".")))
+        except (TypeError, ValueError):
+            raise ValueError(f"некорректное значение {key}: {v!r}") from None
+        # NaN не проходит ни одно сравнение ниже, поэтому проверяем явно
+        if not math.isfinite(values[-1]):
+            raise ValueError(f"{key} должен быть конечным числом, а не {v!r}")
+    c = dict(zip(_COEFF_ORDER, values))
+    if c["Vr"] <= 0:
+        raise ValueError("Vr должен быть > 0")
+    if c["dQ"] <= 0 or c["dCAin"] <= 0:
+        raise ValueError("шаги dQ и dCAin должны быть > 0")
+    if c["Q_min"] > c["Q_max"] or c["CAin_min"] > c["CAin_max"]:
+        raise ValueError("минимум диапазона больше максимума")
+    return name, values
+
+
+def import_catalog(records: Iterable[Dict[str, Any]]) -> ImportReport:
+    """Upsert raw types and their coefficients in a single transaction.
+
+    Invalid records are skipped and reported by 1-based record number;
+    everything else is written with executemany. A name repeated in the
+    input is reported as an error after its first occurrence.
+    """
+    names: List[Tuple[str]] = []
+    coeffs: Dict[str, List[float]] = {}
+    seen = set()
+    errors: List[Tuple[int, str]] = []
+
+    for num, record in enumerate(records, start=1):
+        try:
+            name, values = _validate_record(record)
+        except ValueError as e:
+            errors.append((num, str(e)))
+            continue
+        if name in seen:
+            errors.append((num, f"повтор названия {name!r}"))
+            continue
+        seen.add(name)
+        names.append((name,))
+        if values is not None:
+            coeffs[name] = values
+
+    with get_connection() as conn:
+        conn.executemany("INSERT INTO raw_types (name) VALUES (?) ON CONFLICT(name) DO NOTHING", names)
+        ids = {row["name"]: row["id"] for row in conn.execute("SELECT id, name FROM raw_types")}
+        changed = [ids[name] for name in coeffs]
+        conn.executemany(_UPSERT_COEFFS, [(ids[name], *values) for name, values in coeffs.items()])
+        conn.executemany("DELETE FROM sweep_cache WHERE raw_type_id=?", [(i,) for i in changed])
+
+    invalidate_read_cache()
+    _coeffs_changed(changed)
+    return ImportReport(len(names), errors)
+
+
+def export_catalog() -> List[Dict[str, Any]]:
+    """All raw types with their coefficients (None where none are set)."""
+    cols = ", ".join(f"c.{k}" for k in _COEFF_ORDER)
+    with get_connection() as conn:
+        rows = conn.execute(
+            f"""
+            SELECT r.name, {cols}
+            FROM raw_types r LEFT JOIN kinetic_coeffs c ON c.raw_type_id = r.id
+            ORDER BY r.name
+            """
+        ).fetchall()
+    return [dict(row) for row in rows]
+
+
+def read_catalog_file(path: Any) -> List[Dict[str, Any]]:
+    """Records from a JSON list of objects or a CSV file with a header row."""
+    path = Path(path)
+    if path.suffix.lower() == ".json":
+        with open(path, encoding="utf-8-sig") as f:
+            data = json.load(f)
+        if not isinstance(data, list):
+            raise ValueError("ожидался JSON-массив записей")
+        return [r if isinstance(r, dict) else {} for r in data]
+
+    with open(path, newline="", encoding="utf-8-sig") as f:
+        header = f.readline()
+        f.seek(0)
+        delimiter = ";" if header.count(";") >= header.count(",") else ","
+        return list(csv.DictReader(f, delimiter=delimiter))
+
+
+def write_catalog_file(path: Any, records: List[Dict[str, Any]]) -> None:
+    path = Path(path)
+    if path.suffix.lower() == ".json":
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(records, f, ensure_ascii=False, indent=1)
+        return
+
+    with open(path, "w", newline="", encoding="utf-8-sig") as f:
+        writer = csv.DictWriter(f, fieldnames=CATALOG_FIELDS, delimiter=";")
+        writer.writeheader()
+        writer.writerows(records)
+
+
+# ---------- sweep cache ----------
+
+def get_cached_sweep(key: str) -> Optional[sqlite3.Row]:
+    with get_connection() as conn:
+        row = conn.execute("SELECT * FROM sweep_cache WHERE key=?", (key,)).fetchone()
+        if row:
+            conn.execute("UPDATE sweep_cache SET last_used=? WHERE key=?", (time.time(), key))
+        return row
+
+
+def put_cached_sweep(key: str, raw_type_id: Optional[int], engine: str, data: bytes,
+                     max_bytes: int) -> None:
+    """Store a cache blob, then evict least recently used ones above max_bytes."""
+    with get_connection() as conn:
+        conn.execute(
+            """
+            INSERT OR REPLACE INTO sweep_cache (key, raw_type_id, engine, size, last_used, data)
+            VALUES (?, ?, ?, ?, ?, ?)
+            """,
+            (key, raw_type_id, engine, len(data), time.time(), data),
+        )
+
+        total = 0
+        stale = []
+        for row in conn.execute("SELECT key, size FROM sweep_cache ORDER BY last_used DESC"):
+            total += row["size"]
+            if total > max_bytes:
+                stale.append((row["key"],))
+        conn.executemany("DELETE FROM sweep_cache WHERE key=?", stale)
+
+
+def clear_sweep_cache(raw_type_id: Optional[int] = None) -> None:
+    with get_connection() as conn:
+        if raw_type_id is None:
+            conn.execute("DELETE FROM sweep_cache")
+        else:
+            conn.execute("DELETE FROM sweep_cache WHERE raw_type_id=?", (raw_type_id,))
+
+
+# ---------- run history ----------
+# The CB column is stored byte-shuffled (all first bytes of the float64
+# values, then all second bytes, ...) and zlib-compressed: neighbouring
+# grid values share their high bytes, which makes the blob about a third
+# smaller than compressing the raw doubles.
+
+# grids larger than this (raw float64 bytes) are not stored: such runs keep
+# their parameters only and are recomputed when viewed
+RUN_MAX_BYTES = 16 << 20
+# total compressed size of stored grids; the oldest runs are pruned beyond it
+RUN_HISTORY_MAX_BYTES = 256 << 20
+
+RUN_FIELDS = ("id", "raw_type_id", "raw_type", "username", "created", "engine", "wall_s", "points", "size",
+              *_COEFF_ORDER)
+
+
+def _shuffle(data: bytes, width: int = 8) -> bytes:
+    return b"".join(data[i::width] for i in range(width))
+
+
+def _unshuffle(data: bytes, width: int = 8) -> bytes:
+    n = len(data) // width
+    out = bytearray(len(data))
+    for i in range(width):
+        out[i::width] = data[i * n:(i + 1) * n]
+    return bytes(out)
+
+
+def add_run(params: Dict[str, float], cb: bytes, engine: str, wall_s: float,
+            raw_type_id: Optional[int] = None, raw_type: str = "", username: str = "",
+            max_run_bytes: Optional[int] = None, max_total_bytes: Optional[int] = None) -> int:
+    """Record a finished sweep; ``cb`` is its CB column as float64 bytes.
+
+    A grid over ``max_run_bytes`` (default RUN_MAX_BYTES) is not stored
+    (size 0, get_run_data returns None). Afterwards the oldest runs are
+    deleted while stored grids exceed ``max_total_bytes``
+    (default RUN_HISTORY_MAX_BYTES).
+    """
+    max_run_bytes = RUN_MAX_BYTES if max_run_bytes is None else max_run_bytes
+    max_total_bytes = RUN_HISTORY_MAX_BYTES if max_total_bytes is None else max_total_bytes
+    data = zlib.compress(_shuffle(cb), 6) if len(cb) <= max_run_bytes else b""
+    with get_connection() as conn:
+        cur = conn.execute(
+            f"""
+            INSERT INTO runs (raw_type_id, raw_type, username, created, engine, wall_s, points, size,
+                              {", ".join(_COEFF_ORDER)})
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, {", ".join("?" * len(_COEFF_ORDER))})
+            """,
+            (raw_type_id, raw_type, username, time.time(), engine, wall_s, len(cb) // 8, len(data),
+             *(float(params[k]) for k in _COEFF_ORDER)),
+        )
+        if data:
+            conn.execute("INSERT INTO run_data (run_id, data) VALUES (?, ?)", (cur.lastrowid, data))
+
+        total = 0
+        stale = []
+        for row in conn.execute("SELECT id, size FROM runs ORDER BY created DESC"):
+            total += row["size"]
+            if total > max_total_bytes:
+                stale.append((row["id"],))
+        conn.executemany("DELETE FROM run_data WHERE run_id=?", stale)
+        conn.executemany("DELETE FROM runs WHERE id=?", stale)
+        return cur.lastrowid
+
+
+def list_runs(raw_type_id: Optional[int] = None, before: Optional[float] = None,
+              limit: int = 100) -> List[sqlite3.Row]:
+    """Newest runs first, metadata only.
+
+    ``before`` (a ``created`` value) pages through older runs; both
+    filters use the indexes on runs.
+    """
+    where, args = [], []
+    if raw_type_id is not None:
+        where.append("raw_type_id=?")
+        args.append(raw_type_id)
+    if before is not None:
+        where.append("created<?")
+        args.append(before)
+    sql = f"SELECT {', '.join(RUN_FIELDS)} FROM runs"
+    if where:
+        sql += " WHERE " + " AND ".join(where)
+    with get_connection() as conn:
+        return conn.execute(sql + " ORDER BY created DESC LIMIT ?", (*args, limit)).fetchall()
+
+
+def get_run(run_id: int) -> Optional[sqlite3.Row]:
+    with get_connection() as conn:
+        return conn.execute(f"SELECT {', '.join(RUN_FIELDS)} FROM runs WHERE id=?", (run_id,)).fetchone()
+
+
+def get_run_data(run_id: int) -> Optional[bytes]:
+    """CB column of a stored run as float64 bytes (decoded only here)."""
+    with get_connection() as conn:
+        row = conn.execute("SELECT data FROM run_data WHERE run_id=?", (run_id,)).fetchone()
+    return _unshuffle(zlib.decompress(row["data"])) if row else None
+
+
+def delete_run(run_id: int) -> None:
+    with get_connection() as conn:
+        conn.execute("DELETE FROM run_data WHERE run_id=?", (run_id,))
+        conn.execute("DELETE FROM runs WHERE id=?", (run_id,))
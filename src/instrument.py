@@ -0,0 +1,152 @@
+"""Timing spans and counters for finding where a run spends its time.
+
+Disabled by default: span() then returns a shared no-op context manager
+and count() returns after one flag check, so the hooks can stay in the
+compute, database and GUI code. The GUI enables recording and shows the
+breakdown of every calculation; REACTOR_INSTRUMENT=1 enables it elsewhere.
+"""
+from __future__ import annotations
+
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager, nullcontext
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional
+
+ENABLED = os.environ.get("REACTOR_INSTRUMENT") == "1"
+
+_NULL = nullcontext()
+
+# names shown in the status bar, in this order; anything else follows
+_LABELS = {
+    "dll_load": "DLL",
+    "sweep": "расчёт",
+    "monte_carlo": "Монте-Карло",
+    "transient": "переходный процесс",
+    "cache": "кэш",
+    "db": "SQLite",
+    "prepare_plot": "подготовка графика",
+    "table": "таблица",
+    "plot": "график",
+    "report": "отчёт",
+    "history": "история",
+}
+
+
+class Recorder:
+    """Accumulated spans (total seconds, calls) and counters of one run."""
+
+    def __init__(self, trace: bool = False) -> None:
+        self.started = time.perf_counter()
+        self.spans: Dict[str, List[float]] = {}
+        self.counters: Dict[str, int] = {}
+        # with trace=True every span is also kept as an event for write_trace
+        self.events: Optional[List[tuple]] = [] if trace else None
+        self._lock = threading.Lock()
+
+    def add_span(self, name: str, t0: float, t1: float) -> None:
+        with self._lock:
+            entry = self.spans.setdefault(name, [0.0, 0])
+            entry[0] += t1 - t0
+            entry[1] += 1
+            if self.events is not None:
+                self.events.append((name, t0, t1 - t0, threading.get_ident()))
+
+    def add(self, name: str, n: int = 1) -> None:
+        with self._lock:
+            self.counters[name] = self.counters.get(name, 0) + n
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "wall": time.perf_counter() - self.started,
+                "spans": {k: {"seconds": v[0], "calls": v[1]} for k, v in self.spans.items()},
+                "counters": dict(self.counters),
+            }
+
+    def summary(self) -> str:
+        """One line for the status bar: spans in ms, then counters."""
+        with self._lock:
+            names = [k for k in _LABELS if k in self.spans]
+            names += sorted(k for k in self.spans if k not in _LABELS)
+            parts = [f"{_LABELS.get(k, k)} {self.spans[k][0] * 1e3:.0f} мс" for k in names]
+            parts += [f"{k} {v:,}".replace(",", " ") for k, v in sorted(self.counters.items())]
+        return " · ".join(parts) if parts else "нет данных"
+
+    def write_trace(self, path: Any) -> None:
+        """Write spans as Chrome trace events (chrome://tracing, Perfetto)."""
+        with self._lock:
+            events = list(self.events or ())
+        data = [
+            {"name": name, "ph": "X", "pid": os.getpid(), "tid": tid,
+             "ts": (t0 - self.started) * 1e6, "dur": dur * 1e6}
+            for name, t0, dur, tid in events
+        ]
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump({"traceEvents": data, "otherData": self.snapshot()}, f)
+
+
+_current = Recorder()
+
+
+def enable(flag: bool = True) -> None:
+    global ENABLED
+    ENABLED = flag
+
+
+def current() -> Recorder:
+    return _current
+
+
+def start_run(trace: bool = False) -> Recorder:
+    """Start recording into a fresh Recorder and return it."""
+    global _current
+    _current = Recorder(trace)
+    return _current
+
+
+class _Span:
+    __slots__ = ("name", "t0")
+
+    def __init__(self, name: str) -> None:
+        self.name = name
+
+    def __enter__(self) -> "_Span":
+        self.t0 = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc) -> None:
+        _current.add_span(self.name, self.t0, time.perf_counter())
+
+
+def span(name: str):
+    """``with span("sweep"): ...`` adds the block's wall time to ``name``."""
+    if not ENABLED:
+        return _NULL
+    return _Span(name)
+
+
+def count(name: str, n: int = 1) -> None:
+    if ENABLED:
+        _current.add(name, n)
+
+
+@contextmanager
+def profile_to(path: Any) -> Iterator[Any]:
+    """cProfile the calling thread for the duration of the block.
+
+    The stats are written to ``path`` (open with pstats or snakeviz).
+    """
+    import cProfile
+
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    prof = cProfile.Profile()
+    prof.enable()
+    try:
+        yield prof
+    finally:
+        prof.disable()
+        prof.dump_stats(str(path))
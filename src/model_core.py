@@ -1,43 +1,182 @@
 from __future__ import annotations
 
+import itertools
+import math
+import os
 import sys
-from ctypes import CDLL, c_double
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from array import array
+from ctypes import CDLL, POINTER, c_char_p, c_double, c_int, c_size_t
 from pathlib import Path
-from typing import Dict, List, Optional
+from typing import Any, Callable, Dict, Iterator, List, NamedTuple, Optional, Sequence
 
+try:
+    import numpy as np
+
+    HAS_NUMPY = True
+except ImportError:
+    np = None
+    HAS_NUMPY = False
+
+import instrument
 
 _BASE_DIR = Path(__file__).resolve().parent
 _LIB: Optional[CDLL] = None
 
+_EPS = 1e-9
+# bump whenever the closed form or grid construction changes; persisted
+# results (sweep cache) are keyed by it
+MODEL_VERSION = 1
+_DOUBLE_P = POINTER(c_double)
+
+
+# builds of reactor_model.c by build_native.py, best first; "default" is
+# the plain library (reactor_model.dll, libreactor_model.so)
+NATIVE_VARIANTS = ("avx512_openmp", "avx2_openmp", "openmp", "avx512", "avx2", "scalar", "default")
+
+# REACTOR_NATIVE_VARIANT=<variant> loads only that build
+NATIVE_VARIANT_ENV = "REACTOR_NATIVE_VARIANT"
+
+# kernels the native engine needs; a stale build exporting only compute_CB
+# would loop over points in Python, far slower than the numpy engine
+_BATCHED_EXPORTS = ("compute_CB_grid", "compute_CB_outer", "compute_CB_batch")
+
+# what load_library picked and why; see native_selection()
+_SELECTION: Dict[str, Any] = {}
+
 
-def _candidate_library_names() -> List[str]:
+def _library_name(variant: str = "default") -> str:
+    suffix = "" if variant == "default" else f"_{variant}"
     if sys.platform.startswith("win"):
-        return ["reactor_model.dll"]
+        return f"reactor_model{suffix}.dll"
     if sys.platform == "darwin":
-        return ["libreactor_model.dylib"]
-    return ["libreactor_model.so", "reactor_model.so"]
+        return f"libreactor_model{suffix}.dylib"
+    return f"libreactor_model{suffix}.so"
+
+
+def _cpu_flags() -> set:
+    """Instruction set flags of this CPU (Linux; empty where unknown)."""
+    try:
+        with open("/proc/cpuinfo", encoding="ascii", errors="replace") as f:
+            for line in f:
+                if line.startswith("flags"):
+                    return set(line.split(":", 1)[1].split())
+    except OSError:
+        pass
+    return set()
+
+
+def _variant_usable(variant: str, flags: set, cpus: int) -> bool:
+    if "avx512" in variant and not {"avx512f", "avx512dq", "avx2"} <= flags:
+        return False
+    if "avx2" in variant and "avx2" not in flags:
+        return False
+    # threads only pay off with more than one core
+    return "openmp" not in variant or cpus > 1
+
+
+def _candidate_library_names() -> List[tuple]:
+    """(variant, file name) pairs to try, best first, with the reason for the order."""
+    override = os.environ.get(NATIVE_VARIANT_ENV)
+    if override:
+        if override not in NATIVE_VARIANTS:
+            raise ValueError(f"{NATIVE_VARIANT_ENV}={override!r}; expected one of {', '.join(NATIVE_VARIANTS)}")
+        _SELECTION["reason"] = f"{NATIVE_VARIANT_ENV}={override}"
+        return [(override, _library_name(override))]
+
+    flags = _cpu_flags()
+    cpus = os.cpu_count() or 1
+    found = sorted(f for f in ("avx2", "avx512f") if f in flags)
+    _SELECTION["reason"] = f"CPU: {', '.join(found) or 'no AVX2/AVX-512 detected'}; cores: {cpus}"
+    names = [(v, _library_name(v)) for v in NATIVE_VARIANTS if v == "default" or _variant_usable(v, flags, cpus)]
+    if not sys.platform.startswith(("win", "darwin")):
+        names.append(("default", "reactor_model.so"))
+    return names
+
+
+def native_selection() -> Dict[str, Any]:
+    """Which native build is in use: variant, path, threads and the reason.
+
+    Loads the library if needed; ``variant`` is None when none could be loaded.
+    """
+    try:
+        load_library()
+    except (OSError, ValueError) as e:
+        return {"variant": None, "error": str(e), **_SELECTION}
+    return dict(_SELECTION)
 
 
 def load_library() -> CDLL:
-    """Load reactor_model dynamic library from the app directory."""
+    """Load the best reactor_model build for this CPU from the app directory."""
     global _LIB
     if _LIB is not None:
         return _LIB
 
-    for name in _candidate_library_names():
+    skipped = []
+    for variant, name in _candidate_library_names():
         path = _BASE_DIR / name
         if not path.exists():
             continue
 
-        lib = CDLL(str(path))
+        try:
+            with instrument.span("dll_load"):
+                lib = CDLL(str(path))
+        except OSError as e:
+            # e.g. an OpenMP build on a machine without the OpenMP runtime
+            skipped.append(f"{name}: {e}")
+            continue
         lib.compute_CB.argtypes = [c_double, c_double, c_double, c_double, c_double]
         lib.compute_CB.restype = c_double
 
+        # batched kernels are missing from libraries built before they existed
+        if hasattr(lib, "compute_CB_batch"):
+            lib.compute_CB_batch.argtypes = [
+                _DOUBLE_P, _DOUBLE_P, c_size_t, c_double, c_double, c_double, _DOUBLE_P,
+            ]
+            lib.compute_CB_batch.restype = None
+        if hasattr(lib, "compute_CB_grid"):
+            lib.compute_CB_grid.argtypes = [
+                c_double, c_double, c_size_t,
+                c_double, c_double, c_size_t,
+                c_double, c_double, c_double, _DOUBLE_P,
+            ]
+            lib.compute_CB_grid.restype = None
+        if hasattr(lib, "compute_CB_outer"):
+            lib.compute_CB_outer.argtypes = [
+                _DOUBLE_P, c_size_t, _DOUBLE_P, c_size_t,
+                c_double, c_double, c_double, _DOUBLE_P,
+            ]
+            lib.compute_CB_outer.restype = None
+        if hasattr(lib, "reactor_model_variant"):
+            lib.reactor_model_variant.restype = c_char_p
+            lib.reactor_model_threads.restype = c_int
+        reactor_args = [c_size_t] + [_DOUBLE_P] * 5
+        if hasattr(lib, "simulate_CSTR_rk4"):
+            lib.simulate_CSTR_rk4.argtypes = reactor_args + [
+                _DOUBLE_P, _DOUBLE_P, c_double, c_size_t, c_size_t, _DOUBLE_P, _DOUBLE_P,
+            ]
+            lib.simulate_CSTR_rk4.restype = None
+        if hasattr(lib, "simulate_CSTR_adaptive"):
+            lib.simulate_CSTR_adaptive.argtypes = reactor_args + [
+                _DOUBLE_P, _DOUBLE_P, _DOUBLE_P, c_double, c_size_t, c_double, c_double,
+                _DOUBLE_P, _DOUBLE_P,
+            ]
+            lib.simulate_CSTR_adaptive.restype = c_size_t
+
+        _SELECTION.update(
+            variant=variant,
+            batched=all(hasattr(lib, name) for name in _BATCHED_EXPORTS),
+            path=str(path),
+            build=lib.reactor_model_variant().decode() if hasattr(lib, "reactor_model_variant") else None,
+            threads=lib.reactor_model_threads() if hasattr(lib, "reactor_model_threads") else 1,
+            skipped=skipped,
+        )
         _LIB = lib
         return lib
 
     raise FileNotFoundError(
-        "reactor_model library not found. Place reactor_model.dll next to app.exe."
+        "reactor_model library not found. Place reactor_model.dll next to app.exe"
+        " (on Linux/macOS run build_native.py)." + "".join(f"\n{s}" for s in skipped)
     )
 
 
@@ -47,24 +186,1271 @@ def compute_CB(Q: float, CA_in: float, k1: float, k2: float, Vr: float) -> float
     return float(lib.compute_CB(Q, CA_in, k1, k2, Vr))
 
 
+def _double_ptr(buf: Any):
+    """Pointer to the first element of a contiguous float64 buffer.
+
+    Accepts NumPy arrays and writable buffers such as ``array.array('d')``.
+    """
+    if hasattr(buf, "ctypes"):
+        return buf.ctypes.data_as(_DOUBLE_P)
+    return (c_double * len(buf)).from_buffer(buf)
+
+
+def _new_buffer(n: int) -> Any:
+    """Zeroed float64 buffer: a NumPy array when available, else array('d')."""
+    if HAS_NUMPY:
+        return np.zeros(n)
+    return array("d", bytes(8 * n))
+
+
+def buffer_from_bytes(data: bytes) -> Any:
+    """Writable float64 buffer (as _new_buffer would return) holding ``data``."""
+    if HAS_NUMPY:
+        return np.frombuffer(bytearray(data), dtype=np.float64)
+    buf = array("d")
+    buf.frombytes(data)
+    return buf
+
+
+def _as_doubles(values: Sequence[float]) -> Any:
+    """Contiguous float64 buffer holding ``values``, copied only if needed.
+
+    The kernels read raw memory, so integer or strided arrays must be
+    converted here rather than passed through.
+    """
+    if HAS_NUMPY:
+        return np.ascontiguousarray(values, dtype=np.float64)
+    if isinstance(values, array) and values.typecode == "d":
+        return values
+    return array("d", values)
+
+
+def grid_count(lo: float, hi: float, step: float) -> int:
+    """Number of points lo, lo + step, ... not exceeding hi (with tolerance)."""
+    if step <= 0:
+        raise ValueError("step must be positive")
+    if hi + _EPS < lo:
+        return 0
+    return int(math.floor((hi - lo + _EPS) / step)) + 1
+
+
+# ---------- engines ----------
+# Every engine implements the same closed form and writes into a caller
+# buffer: grid(k1, k2, Vr, Q_min, dQ, n_Q, CAin_min, dCAin, n_CA, out),
+# outer(Q, CA_in, k1, k2, Vr, out) and batch(Q, CA_in, k1, k2, Vr, out).
+
+def _grid_native(k1, k2, Vr, Q_min, dQ, n_Q, CAin_min, dCAin, n_CA, out):
+    load_library().compute_CB_grid(Q_min, dQ, n_Q, CAin_min, dCAin, n_CA, k1, k2, Vr, _double_ptr(out))
+
+
+def _outer_native(Q, CA_in, k1, k2, Vr, out):
+    load_library().compute_CB_outer(
+        _double_ptr(Q), len(Q), _double_ptr(CA_in), len(CA_in), k1, k2, Vr, _double_ptr(out),
+    )
+
+
+def _batch_native(Q, CA_in, k1, k2, Vr, out):
+    load_library().compute_CB_batch(_double_ptr(Q), _double_ptr(CA_in), len(out), k1, k2, Vr, _double_ptr(out))
+
+
+def _grid_numpy(k1, k2, Vr, Q_min, dQ, n_Q, CAin_min, dCAin, n_CA, out):
+    q = Q_min + np.arange(n_Q, dtype=np.float64) * dQ
+    ca = CAin_min + np.arange(n_CA, dtype=np.float64) * dCAin
+    a = (2.0 * k1 * Vr * q) / ((q + k1 * Vr) * (q + k2 * Vr))
+    np.multiply(a[:, None], ca[None, :], out=np.frombuffer(out, dtype=np.float64).reshape(n_Q, n_CA))
+
+
+def _outer_numpy(Q, CA_in, k1, k2, Vr, out):
+    q = np.frombuffer(Q, dtype=np.float64)
+    ca = np.frombuffer(CA_in, dtype=np.float64)
+    a = (2.0 * k1 * Vr * q) / ((q + k1 * Vr) * (q + k2 * Vr))
+    np.multiply(a[:, None], ca[None, :], out=np.frombuffer(out, dtype=np.float64).reshape(len(q), len(ca)))
+
+
+def _batch_numpy(Q, CA_in, k1, k2, Vr, out):
+    q = np.frombuffer(Q, dtype=np.float64)
+    ca = np.frombuffer(CA_in, dtype=np.float64)
+    np.divide(
+        2.0 * k1 * Vr * q * ca,
+        (q + k1 * Vr) * (q + k2 * Vr),
+        out=np.frombuffer(out, dtype=np.float64),
+    )
+
+
+def _grid_python(k1, k2, Vr, Q_min, dQ, n_Q, CAin_min, dCAin, n_CA, out):
+    ca_values = [CAin_min + j * dCAin for j in range(n_CA)]
+    for i in range(n_Q):
+        q = Q_min + i * dQ
+        a = (2.0 * k1 * Vr * q) / ((q + k1 * Vr) * (q + k2 * Vr))
+        base = i * n_CA
+        for j, ca in enumerate(ca_values):
+            out[base + j] = a * ca
+
+
+def _outer_python(Q, CA_in, k1, k2, Vr, out):
+    n_CA = len(CA_in)
+    ca_values = list(CA_in)
+    for i, q in enumerate(Q):
+        a = (2.0 * k1 * Vr * q) / ((q + k1 * Vr) * (q + k2 * Vr))
+        base = i * n_CA
+        for j, ca in enumerate(ca_values):
+            out[base + j] = a * ca
+
+
+def _batch_python(Q, CA_in, k1, k2, Vr, out):
+    for i in range(len(out)):
+        q = Q[i]
+        out[i] = (2.0 * k1 * Vr * q * CA_in[i]) / ((q + k1 * Vr) * (q + k2 * Vr))
+
+
+# Transient kernels integrate the CSTR balances
+#   dCA/dt = Q/Vr*(CA_in - CA) - k1*CA,  dCB/dt = -Q/Vr*CB + 2*k1*CA - k2*CB
+# (steady state: the closed form above) for n reactors at once:
+# transient(method, reactors, CA, CB, h, dt_out, n_out, substeps, rtol, atol, out_CA, out_CB)
+# with reactors = (Q, CA_in, k1, k2, Vr) buffers. CA, CB and the adaptive step h
+# are advanced in place; out_*[i * n_out + r] is reactor i at (r + 1) * dt_out.
+# The step functions below use plain arithmetic, so they serve both floats
+# (python engine) and NumPy arrays (numpy engine).
+
+def _cstr_rhs(d, ca_in, k1, k2, ca, cb):
+    return d * (ca_in - ca) - k1 * ca, -d * cb + 2.0 * k1 * ca - k2 * cb
+
+
+def _rk4_step(p, h, ca, cb):
+    a1, b1 = _cstr_rhs(*p, ca, cb)
+    a2, b2 = _cstr_rhs(*p, ca + 0.5 * h * a1, cb + 0.5 * h * b1)
+    a3, b3 = _cstr_rhs(*p, ca + 0.5 * h * a2, cb + 0.5 * h * b2)
+    a4, b4 = _cstr_rhs(*p, ca + h * a3, cb + h * b3)
+    return ca + h / 6.0 * (a1 + 2.0 * a2 + 2.0 * a3 + a4), cb + h / 6.0 * (b1 + 2.0 * b2 + 2.0 * b3 + b4)
+
+
+# Dormand-Prince 5(4): stage coefficients, 5th order weights, error weights
+_DP_A = (
+    (),
+    (1 / 5,),
+    (3 / 40, 9 / 40),
+    (44 / 45, -56 / 15, 32 / 9),
+    (19372 / 6561, -25360 / 2187, 64448 / 6561, -212 / 729),
+    (9017 / 3168, -355 / 33, 46732 / 5247, 49 / 176, -5103 / 18656),
+)
+_DP_B = (35 / 384, 0.0, 500 / 1113, 125 / 192, -2187 / 6784, 11 / 84)
+_DP_E = (71 / 57600, 0.0, -71 / 16695, 71 / 1920, -17253 / 339200, 22 / 525, -1 / 40)
+
+
+def _dp45_step(p, h, ca, cb, rtol, atol):
+    """One Dormand-Prince step: (CA, CB, scaled error norm); the step is accepted if norm <= 1."""
+    ka, kb = [], []
+    for row in _DP_A:
+        sa = ca + h * sum(c * k for c, k in zip(row, ka))
+        sb = cb + h * sum(c * k for c, k in zip(row, kb))
+        da, db = _cstr_rhs(*p, sa, sb)
+        ka.append(da)
+        kb.append(db)
+    ca5 = ca + h * sum(c * k for c, k in zip(_DP_B, ka))
+    cb5 = cb + h * sum(c * k for c, k in zip(_DP_B, kb))
+    da, db = _cstr_rhs(*p, ca5, cb5)
+    ka.append(da)
+    kb.append(db)
+    ea = h * sum(c * k for c, k in zip(_DP_E, ka))
+    eb = h * sum(c * k for c, k in zip(_DP_E, kb))
+    # max(|x|, |y|) written arithmetically so it works on arrays too
+    sa = atol + rtol * (abs(ca) + abs(ca5) + abs(abs(ca) - abs(ca5))) / 2
+    sb = atol + rtol * (abs(cb) + abs(cb5) + abs(abs(cb) - abs(cb5))) / 2
+    return ca5, cb5, (0.5 * ((ea / sa) ** 2 + (eb / sb) ** 2)) ** 0.5
+
+
+def _reactor_params(reactors, i=None):
+    Q, CA_in, k1, k2, Vr = reactors
+    if i is None:
+        Q, CA_in, k1, k2, Vr = (np.asarray(v) for v in reactors)
+        return Q / Vr, CA_in, k1, k2
+    return Q[i] / Vr[i], CA_in[i], k1[i], k2[i]
+
+
+def _transient_numpy(method, reactors, CA, CB, h, dt_out, n_out, substeps, rtol, atol, out_CA, out_CB):
+    p = _reactor_params(reactors)
+    ca, cb = np.array(CA), np.array(CB)
+    n = len(ca)
+    res_CA = np.frombuffer(out_CA, dtype=np.float64).reshape(n, n_out)
+    res_CB = np.frombuffer(out_CB, dtype=np.float64).reshape(n, n_out)
+    step = np.where(np.asarray(h) > 0, h, dt_out)
+    steps = 0
+    m = max(substeps, 1)
+    for r in range(n_out):
+        if method == "rk4":
+            for _ in range(m):
+                ca, cb = _rk4_step(p, dt_out / m, ca, cb)
+            steps += m * n
+        else:
+            left = np.full(n, dt_out)
+            active = left > 0
+            while active.any():
+                hs = np.minimum(step, left)
+                ca5, cb5, err = _dp45_step(p, hs, ca, cb, rtol, atol)
+                factor = np.clip(0.9 * np.maximum(err, 1e-10) ** -0.2, 0.2, 5.0)
+                ok = active & (err <= 1.0)
+                ca = np.where(ok, ca5, ca)
+                cb = np.where(ok, cb5, cb)
+                grow = ok & (hs == step)
+                step = np.where(grow, step * factor, np.where(active & ~ok, hs * factor, step))
+                left = np.where(ok, left - hs, left)
+                left[left < 1e-12 * dt_out] = 0.0
+                steps += int(ok.sum())
+                active = left > 0
+        res_CA[:, r] = ca
+        res_CB[:, r] = cb
+    CA[:], CB[:], h[:] = ca, cb, step
+    return steps
+
+
+def _transient_python(method, reactors, CA, CB, h, dt_out, n_out, substeps, rtol, atol, out_CA, out_CB):
+    steps = 0
+    m = max(substeps, 1)
+    for i in range(len(CA)):
+        p = _reactor_params(reactors, i)
+        ca, cb = CA[i], CB[i]
+        step = h[i] if h[i] > 0 else dt_out
+        for r in range(n_out):
+            if method == "rk4":
+                for _ in range(m):
+                    ca, cb = _rk4_step(p, dt_out / m, ca, cb)
+                steps += m
+            else:
+                left = dt_out
+                while left > 0:
+                    hs = min(step, left)
+                    ca5, cb5, err = _dp45_step(p, hs, ca, cb, rtol, atol)
+                    factor = min(max(0.9 * max(err, 1e-10) ** -0.2, 0.2), 5.0)
+                    if err <= 1.0:
+                        ca, cb = ca5, cb5
+                        left -= hs
+                        steps += 1
+                        if hs == step:
+                            step *= factor
+                    else:
+                        step = hs * factor
+                    if left < 1e-12 * dt_out:
+                        left = 0.0
+            out_CA[i * n_out + r] = ca
+            out_CB[i * n_out + r] = cb
+        CA[i], CB[i], h[i] = ca, cb, step
+    return steps
+
+
+def _transient_native(method, reactors, CA, CB, h, dt_out, n_out, substeps, rtol, atol, out_CA, out_CB):
+    lib = load_library()
+    export = "simulate_CSTR_rk4" if method == "rk4" else "simulate_CSTR_adaptive"
+    if not hasattr(lib, export):
+        fallback = _transient_numpy if HAS_NUMPY else _transient_python
+        return fallback(method, reactors, CA, CB, h, dt_out, n_out, substeps, rtol, atol, out_CA, out_CB)
+    ptrs = [_double_ptr(v) for v in reactors]
+    if method == "rk4":
+        lib.simulate_CSTR_rk4(len(CA), *ptrs, _double_ptr(CA), _double_ptr(CB), dt_out, n_out,
+                              substeps, _double_ptr(out_CA), _double_ptr(out_CB))
+        return len(CA) * n_out * max(substeps, 1)
+    return lib.simulate_CSTR_adaptive(len(CA), *ptrs, _double_ptr(CA), _double_ptr(CB), _double_ptr(h),
+                                      dt_out, n_out, rtol, atol, _double_ptr(out_CA), _double_ptr(out_CB))
+
+
+def _native_available() -> bool:
+    """Whether a native build with the batched kernels could be loaded."""
+    try:
+        load_library()
+    except (OSError, ValueError):
+        return False
+    return _SELECTION["batched"]
+
+
+class Engine(NamedTuple):
+    name: str
+    grid: Callable[..., None]
+    outer: Callable[..., None]
+    batch: Callable[..., None]
+    transient: Callable[..., int]
+    available: Callable[[], bool]
+
+
+# fastest first; select_engine() takes the first available one
+ENGINES: Dict[str, Engine] = {
+    "native": Engine("native", _grid_native, _outer_native, _batch_native, _transient_native,
+                     _native_available),
+    "numpy": Engine("numpy", _grid_numpy, _outer_numpy, _batch_numpy, _transient_numpy, lambda: HAS_NUMPY),
+    "python": Engine("python", _grid_python, _outer_python, _batch_python, _transient_python, lambda: True),
+}
+
+
+def available_engines() -> List[str]:
+    return [name for name, eng in ENGINES.items() if eng.available()]
+
+
+def select_engine(name: Optional[str] = None) -> Engine:
+    """Return the engine called ``name`` or the fastest available one."""
+    if name is None:
+        for eng in ENGINES.values():
+            if eng.available():
+                return eng
+        raise RuntimeError("no compute engine available")
+
+    eng = ENGINES.get(name)
+    if eng is None:
+        raise ValueError(f"unknown engine {name!r}; expected one of {list(ENGINES)}")
+    if not eng.available():
+        raise RuntimeError(f"engine {name!r} is not available")
+    return eng
+
+
+def compute_CB_batch(
+    Q: Sequence[float], CA_in: Sequence[float],
+    k1: float, k2: float, Vr: float,
+    out: Any = None,
+    engine: Optional[str] = None,
+) -> Any:
+    """Compute CB for paired Q/CA_in arrays in a single engine call.
+
+    ``Q`` and ``CA_in`` are sequences of equal length; anything but a
+    contiguous float64 buffer (``array.array('d')`` or a NumPy array) is
+    copied once.
+    Results are written to ``out`` (allocated if omitted), which is returned.
+    """
+    if len(Q) != len(CA_in):
+        raise ValueError("Q and CA_in must have the same length")
+    n = len(Q)
+    if out is None:
+        out = _new_buffer(n)
+    if n:
+        select_engine(engine).batch(_as_doubles(Q), _as_doubles(CA_in), k1, k2, Vr, out)
+    return out
+
+
+def compute_CB_grid(
+    k1: float, k2: float, Vr: float,
+    Q_min: float, dQ: float, n_Q: int,
+    CAin_min: float, dCAin: float, n_CA: int,
+    out: Any = None,
+    engine: Optional[str] = None,
+) -> Any:
+    """Compute CB on an n_Q x n_CA grid in a single engine call.
+
+    Grid values are ``Q_min + i*dQ`` and ``CAin_min + j*dCAin``; the result
+    is row-major by Q, i.e. ``out[i * n_CA + j]``.
+    """
+    if out is None:
+        out = _new_buffer(n_Q * n_CA)
+    if n_Q and n_CA:
+        select_engine(engine).grid(k1, k2, Vr, Q_min, dQ, n_Q, CAin_min, dCAin, n_CA, out)
+    return out
+
+
+def compute_CB_outer(
+    Q: Sequence[float], CA_in: Sequence[float],
+    k1: float, k2: float, Vr: float,
+    out: Any = None,
+    engine: Optional[str] = None,
+) -> Any:
+    """Compute CB on the grid spanned by explicit ``Q`` and ``CA_in`` axes.
+
+    The result is row-major by Q like compute_CB_grid; use this when the
+    axes are not a single uniform range (grid bands, merged grids).
+    """
+    n = len(Q) * len(CA_in)
+    if out is None:
+        out = _new_buffer(n)
+    if n:
+        with instrument.span("sweep"):
+            select_engine(engine).outer(_as_doubles(Q), _as_doubles(CA_in), k1, k2, Vr, out)
+        instrument.count("points", n)
+    return out
+
+
+def check_engines(rtol: float = 1e-12) -> Dict[str, float]:
+    """Cross-check all available engines against the pure-Python one.
+
+    Returns the maximum relative deviation per engine and raises
+    RuntimeError if any of them exceeds ``rtol``. With NumPy, integer and
+    strided arrays are checked too.
+    """
+    args = (0.1, 0.2, 10.0, 0.5, 0.37, 40, 0.1, 0.05, 25)
+    n = 40 * 25
+    reference = compute_CB_grid(*args, engine="python")
+    q = array("d", (0.5 + (i // 25) * 0.37 for i in range(n)))
+    ca = array("d", (0.1 + (i % 25) * 0.05 for i in range(n)))
+    cases = [
+        (lambda e: compute_CB_grid(*args, engine=e), reference),
+        (lambda e: compute_CB_outer(q[::25], ca[:25], 0.1, 0.2, 10.0, engine=e), reference),
+        (lambda e: compute_CB_batch(q, ca, 0.1, 0.2, 10.0, engine=e), reference),
+    ]
+    if HAS_NUMPY:
+        ints = np.arange(1, 41)
+        strided = np.frombuffer(q, dtype=np.float64)[::25]
+        cases += [
+            (lambda e: compute_CB_batch(ints, ints[::-1], 0.1, 0.2, 10.0, engine=e),
+             compute_CB_batch([float(i) for i in ints], [float(i) for i in ints[::-1]], 0.1, 0.2, 10.0,
+                              engine="python")),
+            (lambda e: compute_CB_outer(strided, ca[:25], 0.1, 0.2, 10.0, engine=e), reference),
+        ]
+
+    deviations: Dict[str, float] = {}
+    for name in available_engines():
+        worst = 0.0
+        for run, expected in cases:
+            for ref, val in zip(expected, run(name)):
+                worst = max(worst, float(abs(val - ref) / max(abs(ref), 1e-300)))
+        deviations[name] = worst
+        if worst > rtol:
+            raise RuntimeError(f"engine {name!r} deviates by {worst:.3g} (rtol={rtol:g})")
+    return deviations
+
+
+PARAM_NAMES = ("k1", "k2", "Vr", "Q_min", "Q_max", "dQ", "CAin_min", "CAin_max", "dCAin")
+
+
+def _axis(lo: float, step: float, n: int, start: int = 0) -> Any:
+    """Grid values ``lo + i*step`` for i in [start, start + n), no accumulation."""
+    if HAS_NUMPY:
+        return lo + np.arange(start, start + n, dtype=np.float64) * step
+    return array("d", (lo + i * step for i in range(start, start + n)))
+
+
+class SweepResult:
+    """Columnar CB grid, row-major by Q (``CB[i * n_CA + j]``).
+
+    ``Q``, ``CA_in`` and ``CB`` are contiguous float64 columns (NumPy arrays
+    when available, ``array('d')`` otherwise); ``q_axis``/``ca_axis`` hold
+    the n_Q and n_CA distinct grid values. Iterating or indexing yields
+    ``{"Q", "CA_in", "CB"}`` dicts, as the old list-of-dicts result did.
+    """
+
+    def __init__(self, params: Dict[str, float], q_axis: Any, ca_axis: Any, cb: Any,
+                 engine: str = "", row_offset: int = 0) -> None:
+        self.params = dict(params)
+        # index of q_axis[0] in the full sweep when this is a band of it
+        self.row_offset = row_offset
+        self.q_axis = q_axis
+        self.ca_axis = ca_axis
+        self.n_Q = len(q_axis)
+        self.n_CA = len(ca_axis)
+        if len(cb) != self.n_Q * self.n_CA:
+            raise ValueError("CB column does not match grid shape")
+        self.CB = cb
+        self.engine = engine
+        self._Q: Any = None
+        self._CA_in: Any = None
+
+    # the Q and CA_in columns are materialized on first use only
+    @property
+    def Q(self) -> Any:
+        if self._Q is None:
+            if HAS_NUMPY:
+                self._Q = np.repeat(np.asarray(self.q_axis, dtype=np.float64), self.n_CA)
+            else:
+                self._Q = array("d", (q for q in self.q_axis for _ in range(self.n_CA)))
+        return self._Q
+
+    @property
+    def CA_in(self) -> Any:
+        if self._CA_in is None:
+            if HAS_NUMPY:
+                self._CA_in = np.tile(np.asarray(self.ca_axis, dtype=np.float64), self.n_Q)
+            else:
+                self._CA_in = array("d", (ca for _ in range(self.n_Q) for ca in self.ca_axis))
+        return self._CA_in
+
+    @classmethod
+    def from_params(cls, params: Dict[str, float], cb: Any, engine: str = "") -> "SweepResult":
+        """Rebuild a full-grid result from its nine parameters and CB column."""
+        p = params
+        q_axis = _axis(p["Q_min"], p["dQ"], grid_count(p["Q_min"], p["Q_max"], p["dQ"]))
+        ca_axis = _axis(p["CAin_min"], p["dCAin"], grid_count(p["CAin_min"], p["CAin_max"], p["dCAin"]))
+        return cls(p, q_axis, ca_axis, cb, engine)
+
+    def cb_bytes(self) -> bytes:
+        """CB column as native-endian float64 bytes."""
+        return memoryview(self.CB).tobytes()
+
+    @property
+    def shape(self) -> tuple:
+        return (self.n_Q, self.n_CA)
+
+    def __len__(self) -> int:
+        return self.n_Q * self.n_CA
+
+    def __getitem__(self, idx: int) -> Dict[str, float]:
+        n = len(self)
+        if idx < 0:
+            idx += n
+        if not 0 <= idx < n:
+            raise IndexError("sweep result index out of range")
+        i, j = divmod(idx, self.n_CA)
+        return {"Q": float(self.q_axis[i]), "CA_in": float(self.ca_axis[j]), "CB": float(self.CB[idx])}
+
+    def __iter__(self):
+        for q, ca, cb in zip(self.Q, self.CA_in, self.CB):
+            yield {"Q": float(q), "CA_in": float(ca), "CB": float(cb)}
+
+    def nearest_index(self, Q: float, CA_in: float) -> int:
+        """Flat index of the grid point closest to (Q, CA_in)."""
+        if not len(self):
+            raise IndexError("empty sweep result")
+        i = round((Q - self.q_axis[0]) / self.params["dQ"])
+        j = round((CA_in - self.ca_axis[0]) / self.params["dCAin"])
+        i = min(max(i, 0), self.n_Q - 1)
+        j = min(max(j, 0), self.n_CA - 1)
+        return i * self.n_CA + j
+
+    def bands(self, chunk_points: Optional[int] = None) -> Iterator["SweepResult"]:
+        """Split into bands of whole Q rows, at most ``chunk_points`` points each.
+
+        Bands share memory with this result when NumPy is available.
+        """
+        rows = max(1, (chunk_points or DEFAULT_CHUNK_POINTS) // max(self.n_CA, 1))
+        n = self.n_CA
+        for a in range(0, self.n_Q, rows):
+            b = min(a + rows, self.n_Q)
+            yield SweepResult(self.params, self.q_axis[a:b], self.ca_axis, self.CB[a * n:b * n],
+                              self.engine, self.row_offset + a)
+
+    def row(self, i: int) -> Any:
+        """CB over CA_in at Q = q_axis[i] (a view when NumPy is available)."""
+        return self.CB[i * self.n_CA:(i + 1) * self.n_CA]
+
+    def column(self, j: int) -> Any:
+        """CB over Q at CA_in = ca_axis[j] (a strided view with NumPy)."""
+        return self.CB[j::self.n_CA]
+
+
+def _check_steps(dQ: float, dCAin: float) -> None:
+    if dQ <= 0 or dCAin <= 0:
+        raise ValueError("dQ and dCAin must be positive")
+
+
 def sweep_CB(
     k1: float, k2: float, Vr: float,
     Q_min: float, Q_max: float, dQ: float,
     CAin_min: float, CAin_max: float, dCAin: float,
-) -> List[Dict[str, float]]:
-    """Compute CB for a grid of Q and CA_in values."""
-    if dQ <= 0 or dCAin <= 0:
-        raise ValueError("dQ and dCAin must be positive")
+    engine: Optional[str] = None,
+    workers: Optional[int] = 1,
+    chunk_points: Optional[int] = None,
+    executor: str = "thread",
+) -> SweepResult:
+    """Compute CB for a grid of Q and CA_in values.
+
+    ``engine`` names an entry of ENGINES; by default the fastest available
+    one is used. With ``workers`` other than 1 the grid is split into Q
+    bands and computed by run_sweeps; the result is identical to the serial
+    one.
+    """
+    _check_steps(dQ, dCAin)
+    if workers != 1:
+        params = dict(zip(PARAM_NAMES, (k1, k2, Vr, Q_min, Q_max, dQ, CAin_min, CAin_max, dCAin)))
+        return run_sweeps([params], workers, chunk_points, engine, executor)[0]
+
+    eng = select_engine(engine)
+    q_axis = _axis(Q_min, dQ, grid_count(Q_min, Q_max, dQ))
+    ca_axis = _axis(CAin_min, dCAin, grid_count(CAin_min, CAin_max, dCAin))
+    cb = compute_CB_outer(q_axis, ca_axis, k1, k2, Vr, engine=eng.name)
+
+    params = dict(zip(PARAM_NAMES, (k1, k2, Vr, Q_min, Q_max, dQ, CAin_min, CAin_max, dCAin)))
+    return SweepResult(params, q_axis, ca_axis, cb, eng.name)
+
+
+def _aligned_offset(new_lo: float, old_lo: float, new_step: float, old_step: float) -> Optional[int]:
+    """Index shift between two uniform axes, or None if they do not align."""
+    if abs(new_step - old_step) > 1e-12 * max(abs(new_step), abs(old_step)):
+        return None
+    off = (new_lo - old_lo) / new_step
+    k = round(off)
+    # relative to the offset: a fixed 1e-6 step accepted slightly shifted grids
+    if abs(off - k) > 1e-9 * max(1.0, abs(off)):
+        return None
+    return int(k)
+
+
+def _reuse_overlap(previous: SweepResult, params: Dict[str, float]) -> Optional[tuple]:
+    """(off_q, off_ca, r0, r1, c0, c1) for reusing ``previous`` under ``params``.
+
+    Offsets map new grid indices to old ones; rows [r0, r1) and columns
+    [c0, c1) of the new grid are covered by the old one. None if nothing
+    can be reused.
+    """
+    if previous.engine not in ENGINES:
+        return None  # Monte Carlo statistics, differences of runs: not CB values
+    old, p = previous.params, params
+    if (p["k1"], p["k2"], p["Vr"]) != (old["k1"], old["k2"], old["Vr"]):
+        return None
+    off_q = _aligned_offset(p["Q_min"], old["Q_min"], p["dQ"], old["dQ"])
+    off_ca = _aligned_offset(p["CAin_min"], old["CAin_min"], p["dCAin"], old["dCAin"])
+    if off_q is None or off_ca is None:
+        return None
+    n_Q = grid_count(p["Q_min"], p["Q_max"], p["dQ"])
+    n_CA = grid_count(p["CAin_min"], p["CAin_max"], p["dCAin"])
+    r0, r1 = max(0, -off_q), min(n_Q, previous.n_Q - off_q)
+    c0, c1 = max(0, -off_ca), min(n_CA, previous.n_CA - off_ca)
+    if r0 >= r1 or c0 >= c1:
+        return None
+    return off_q, off_ca, r0, r1, c0, c1
+
+
+def can_reuse(previous: Optional[SweepResult], params: Dict[str, float]) -> bool:
+    """Whether incremental_sweep_CB would reuse any points of ``previous``."""
+    return previous is not None and _reuse_overlap(previous, params) is not None
+
+
+PREVIEW_POINTS = 10_000
+
+
+def refinement_levels(params: Dict[str, float], max_points: int = PREVIEW_POINTS) -> List[Dict[str, float]]:
+    """Coarse-to-fine parameter sets ending with ``params`` itself.
+
+    The first set takes every s-th point of each axis (s a power of two)
+    so that it has at most about ``max_points`` points; each next set
+    halves the strides. Every coarse grid is a subset of the finer ones.
+    """
+    _check_steps(params["dQ"], params["dCAin"])
+    n_Q = grid_count(params["Q_min"], params["Q_max"], params["dQ"])
+    n_CA = grid_count(params["CAin_min"], params["CAin_max"], params["dCAin"])
+    sq = sc = 1
+    while -(-n_Q // sq) * -(-n_CA // sc) > max_points:
+        # coarsen the axis that still has more points
+        if -(-n_Q // sq) >= -(-n_CA // sc):
+            sq *= 2
+        else:
+            sc *= 2
+    levels = []
+    while sq > 1 or sc > 1:
+        levels.append({**params, "dQ": params["dQ"] * sq, "dCAin": params["dCAin"] * sc})
+        sq, sc = max(sq // 2, 1), max(sc // 2, 1)
+    levels.append(dict(params))
+    return levels
+
+
+def incremental_sweep_CB(
+    previous: SweepResult,
+    k1: float, k2: float, Vr: float,
+    Q_min: float, Q_max: float, dQ: float,
+    CAin_min: float, CAin_max: float, dCAin: float,
+    engine: Optional[str] = None,
+    chunk_points: Optional[int] = None,
+    progress: Optional[Callable[[int, int], None]] = None,
+    cancel: Any = None,
+) -> SweepResult:
+    """sweep_CB that reuses the grid points already present in ``previous``.
+
+    When k1, k2 and Vr are unchanged and both axes keep their step and stay
+    aligned with the previous grid, only the new points (extra Q rows and
+    CA_in columns) are computed and the rest is copied by index. Anything
+    else falls back to a full sweep.
+
+    The grid is filled in bands of whole Q rows (about ``chunk_points``
+    points each); ``progress`` and ``cancel`` behave as in SweepStream.collect.
+    """
+    _check_steps(dQ, dCAin)
+    params = dict(zip(PARAM_NAMES, (k1, k2, Vr, Q_min, Q_max, dQ, CAin_min, CAin_max, dCAin)))
+    chunk_points = chunk_points or DEFAULT_CHUNK_POINTS
+    overlap = _reuse_overlap(previous, params)
+    if overlap is None:
+        if progress is None and cancel is None:
+            return sweep_CB(k1, k2, Vr, Q_min, Q_max, dQ, CAin_min, CAin_max, dCAin, engine=engine)
+        return SweepStream(params, chunk_points, engine).collect(progress, cancel)
+    off_q, off_ca, r0, r1, c0, c1 = overlap
+
+    eng = select_engine(engine)
+    n_Q = grid_count(Q_min, Q_max, dQ)
+    n_CA = grid_count(CAin_min, CAin_max, dCAin)
+    q_axis = _axis(Q_min, dQ, n_Q)
+    ca_axis = _axis(CAin_min, dCAin, n_CA)
+
+    out = _new_buffer(n_Q * n_CA)
+    old_cb, old_n_CA = previous.CB, previous.n_CA
+
+    def fill(rows: tuple, cols: tuple) -> None:
+        (a, b), (c, d) = rows, cols
+        if a >= b or c >= d:
+            return
+        piece = compute_CB_outer(q_axis[a:b], ca_axis[c:d], k1, k2, Vr, engine=eng.name)
+        if HAS_NUMPY:
+            out.reshape(n_Q, n_CA)[a:b, c:d] = np.asarray(piece).reshape(b - a, d - c)
+            return
+        w = d - c
+        for i in range(a, b):
+            out[i * n_CA + c:i * n_CA + d] = piece[(i - a) * w:(i - a + 1) * w]
+
+    def copy(a: int, b: int) -> None:
+        if HAS_NUMPY:
+            src = np.asarray(old_cb).reshape(previous.n_Q, old_n_CA)
+            out.reshape(n_Q, n_CA)[a:b, c0:c1] = src[a + off_q:b + off_q, c0 + off_ca:c1 + off_ca]
+            return
+        for i in range(a, b):
+            src = (i + off_q) * old_n_CA + off_ca
+            out[i * n_CA + c0:i * n_CA + c1] = old_cb[src + c0:src + c1]
+
+    band = max(1, chunk_points // max(n_CA, 1))
+    n_blocks = -(-n_Q // band)
+    for block in range(n_blocks):
+        if cancel is not None and cancel.is_set():
+            raise SweepCancelled()
+        a, b = block * band, min(n_Q, (block + 1) * band)
+        # rows [s, t) of this band are covered by the previous grid
+        s, t = max(a, r0), min(b, r1)
+        if s >= t:
+            fill((a, b), (0, n_CA))
+        else:
+            fill((a, s), (0, n_CA))
+            fill((t, b), (0, n_CA))
+            fill((s, t), (0, c0))
+            fill((s, t), (c1, n_CA))
+            copy(s, t)
+        if progress is not None:
+            progress(block + 1, n_blocks)
+    instrument.count("points_reused", (r1 - r0) * (c1 - c0))
+
+    return SweepResult(params, q_axis, ca_axis, out, eng.name)
+
+
+def diff_results(base: SweepResult, other: SweepResult) -> SweepResult:
+    """CB of ``other`` minus CB of ``base`` on the grid points both contain.
+
+    The grids must have the same steps and aligned nodes (ranges may
+    differ); raises ValueError otherwise. No point is recomputed.
+    """
+    pa, pb = base.params, other.params
+    off_q = _aligned_offset(pb["Q_min"], pa["Q_min"], pb["dQ"], pa["dQ"])
+    off_ca = _aligned_offset(pb["CAin_min"], pa["CAin_min"], pb["dCAin"], pa["dCAin"])
+    if off_q is None or off_ca is None:
+        raise ValueError("grids do not align: the steps differ or the nodes are shifted")
+    r0, r1 = max(0, -off_q), min(other.n_Q, base.n_Q - off_q)
+    c0, c1 = max(0, -off_ca), min(other.n_CA, base.n_CA - off_ca)
+    if r0 >= r1 or c0 >= c1:
+        raise ValueError("the grids have no points in common")
+
+    if HAS_NUMPY:
+        b = np.asarray(other.CB).reshape(other.n_Q, other.n_CA)[r0:r1, c0:c1]
+        a = np.asarray(base.CB).reshape(base.n_Q, base.n_CA)[r0 + off_q:r1 + off_q, c0 + off_ca:c1 + off_ca]
+        cb = (b - a).ravel()
+    else:
+        cb = array("d")
+        for i in range(r0, r1):
+            row_a = (i + off_q) * base.n_CA + off_ca
+            row_b = i * other.n_CA
+            cb.extend(other.CB[row_b + j] - base.CB[row_a + j] for j in range(c0, c1))
+    q_axis, ca_axis = other.q_axis[r0:r1], other.ca_axis[c0:c1]
+    params = {**pb, "Q_min": float(q_axis[0]), "Q_max": float(q_axis[-1]),
+              "CAin_min": float(ca_axis[0]), "CAin_max": float(ca_axis[-1])}
+    return SweepResult(params, q_axis, ca_axis, cb, "diff")
+
+
+DEFAULT_CHUNK_POINTS = 1 << 20
+
+
+class SweepCancelled(Exception):
+    """Raised by SweepStream.collect when its cancel event is set."""
+
+
+class SweepStream:
+    """Lazily computed sweep, yielded as SweepResult bands of whole Q rows.
+
+    Sizes are known before anything is computed: ``n_Q``, ``n_CA``,
+    ``n_points``, ``rows_per_block`` and ``n_blocks``. Each band holds at
+    most ``chunk_points`` points (but always at least one Q row), has its
+    ``row_offset`` set, and matches the corresponding rows of sweep_CB
+    exactly.
+    """
+
+    def __init__(self, params: Dict[str, float], chunk_points: int = DEFAULT_CHUNK_POINTS,
+                 engine: Optional[str] = None) -> None:
+        _check_steps(params["dQ"], params["dCAin"])
+        if chunk_points <= 0:
+            raise ValueError("chunk_points must be positive")
+        self.params = {k: params[k] for k in PARAM_NAMES}
+        self.engine = select_engine(engine).name
+
+        p = self.params
+        self.n_Q = grid_count(p["Q_min"], p["Q_max"], p["dQ"])
+        self.n_CA = grid_count(p["CAin_min"], p["CAin_max"], p["dCAin"])
+        self.n_points = self.n_Q * self.n_CA
+        self.rows_per_block = max(1, chunk_points // max(self.n_CA, 1))
+        self.n_blocks = -(-self.n_Q // self.rows_per_block) if self.n_CA else 0
+
+    def __len__(self) -> int:
+        return self.n_blocks
+
+    def band_bounds(self, b: int) -> tuple:
+        """(first Q row, number of rows) of band ``b``."""
+        if not 0 <= b < self.n_blocks:
+            raise IndexError("sweep block index out of range")
+        start = b * self.rows_per_block
+        return start, min(self.rows_per_block, self.n_Q - start)
+
+    def block(self, b: int) -> SweepResult:
+        """Compute band ``b`` (0 <= b < n_blocks)."""
+        p = self.params
+        start, rows = self.band_bounds(b)
+        q_axis = _axis(p["Q_min"], p["dQ"], rows, start)
+        ca_axis = _axis(p["CAin_min"], p["dCAin"], self.n_CA)
+        cb = compute_CB_outer(q_axis, ca_axis, p["k1"], p["k2"], p["Vr"], engine=self.engine)
+        return SweepResult(p, q_axis, ca_axis, cb, self.engine, row_offset=start)
+
+    def __iter__(self) -> Iterator[SweepResult]:
+        for b in range(self.n_blocks):
+            yield self.block(b)
+
+    def collect(self, progress: Optional[Callable[[int, int], None]] = None,
+                cancel: Any = None) -> SweepResult:
+        """Compute all bands into one SweepResult.
+
+        ``progress(done, n_blocks)`` is called after every band. ``cancel``
+        is a threading.Event (or anything with ``is_set()``); when it is set
+        SweepCancelled is raised before the next band.
+        """
+        out = _new_buffer(self.n_points)
+        view = memoryview(out)
+        for b in range(self.n_blocks):
+            if cancel is not None and cancel.is_set():
+                raise SweepCancelled()
+            start, rows = self.band_bounds(b)
+            _fill_band(self.params, self.engine, start, rows,
+                       view[start * self.n_CA:(start + rows) * self.n_CA])
+            if progress is not None:
+                progress(b + 1, self.n_blocks)
+        return SweepResult.from_params(self.params, out, self.engine)
+
+
+def iter_sweep_CB(
+    k1: float, k2: float, Vr: float,
+    Q_min: float, Q_max: float, dQ: float,
+    CAin_min: float, CAin_max: float, dCAin: float,
+    chunk_points: int = DEFAULT_CHUNK_POINTS,
+    engine: Optional[str] = None,
+) -> SweepStream:
+    """Streaming counterpart of sweep_CB: peak memory is bounded by chunk_points."""
+    params = dict(zip(PARAM_NAMES, (k1, k2, Vr, Q_min, Q_max, dQ, CAin_min, CAin_max, dCAin)))
+    return SweepStream(params, chunk_points, engine)
+
+
+# ---------- parallel execution ----------
+
+def _band_axes(params: Dict[str, float], start: int, rows: int) -> tuple:
+    p = params
+    n_CA = grid_count(p["CAin_min"], p["CAin_max"], p["dCAin"])
+    return _axis(p["Q_min"], p["dQ"], rows, start), _axis(p["CAin_min"], p["dCAin"], n_CA)
+
+
+def _fill_band(params: Dict[str, float], engine: str, start: int, rows: int, out: Any) -> None:
+    q_axis, ca_axis = _band_axes(params, start, rows)
+    compute_CB_outer(q_axis, ca_axis, params["k1"], params["k2"], params["Vr"], out=out, engine=engine)
+
+
+def _band_bytes(params: Dict[str, float], engine: str, start: int, rows: int) -> bytes:
+    q_axis, ca_axis = _band_axes(params, start, rows)
+    cb = compute_CB_outer(q_axis, ca_axis, params["k1"], params["k2"], params["Vr"], engine=engine)
+    return memoryview(cb).tobytes()
+
+
+def run_sweeps(
+    param_sets: Sequence[Dict[str, float]],
+    workers: Optional[int] = None,
+    chunk_points: Optional[int] = None,
+    engine: Optional[str] = None,
+    executor: str = "thread",
+) -> List[SweepResult]:
+    """Compute several sweeps concurrently, returning results in input order.
+
+    Every sweep is split into Q bands of at most ``chunk_points`` points and
+    all bands of all sweeps share one pool of ``workers`` (default: CPU
+    count). ``executor="thread"`` suits the native and NumPy engines, which
+    release the GIL; ``"process"`` also scales the pure-Python engine.
+    Each band is computed exactly as in serial mode, so results do not
+    depend on the worker count or chunk size.
+    """
+    if executor == "thread":
+        pool_cls = ThreadPoolExecutor
+    elif executor == "process":
+        pool_cls = ProcessPoolExecutor
+    else:
+        raise ValueError("executor must be 'thread' or 'process'")
+    if chunk_points is None:
+        # several bands per worker keep the pool busy until the end
+        chunk_points = max(1 << 14, DEFAULT_CHUNK_POINTS // 8)
+
+    streams = [SweepStream(p, chunk_points, engine) for p in param_sets]
+    outs = [_new_buffer(s.n_points) for s in streams]
+
+    with pool_cls(max_workers=workers) as pool:
+        pending = []
+        for s, out in zip(streams, outs):
+            view = memoryview(out)
+            for b in range(s.n_blocks):
+                start, rows = s.band_bounds(b)
+                band = view[start * s.n_CA:(start + rows) * s.n_CA]
+                if executor == "thread":
+                    fut = pool.submit(_fill_band, s.params, s.engine, start, rows, band)
+                else:
+                    fut = pool.submit(_band_bytes, s.params, s.engine, start, rows)
+                pending.append((band, fut))
+
+        for band, fut in pending:
+            data = fut.result()
+            if data is not None:
+                band[:] = memoryview(data).cast("d")
+
+    return [SweepResult.from_params(s.params, out, s.engine) for s, out in zip(streams, outs)]
+
+
+# ---------- N-dimensional sweeps ----------
+
+INPUT_NAMES = ("k1", "k2", "Vr", "Q", "CA_in")
+
+
+def axis_range(lo: float, hi: float, step: float) -> Any:
+    """Axis values lo, lo + step, ... up to hi, as used by sweep_CB."""
+    return _axis(lo, step, grid_count(lo, hi, step))
+
+
+class NDSweep:
+    """CB over the outer product of axes for any subset of the five inputs.
+
+    ``axes`` maps the swept inputs, in INPUT_NAMES order, to their values
+    and ``fixed`` holds the rest. ``CB`` is row-major over ``axes``, so
+    with Q and CA_in swept each (k1, k2, Vr) combination owns one
+    contiguous Q x CA_in block.
+    """
+
+    def __init__(self, axes: Dict[str, Any], fixed: Dict[str, float], cb: Any, engine: str = "") -> None:
+        self.axes = axes
+        self.fixed = fixed
+        self.shape = tuple(len(a) for a in axes.values())
+        self.CB = cb
+        self.engine = engine
+
+    @property
+    def names(self) -> tuple:
+        return tuple(self.axes)
+
+    def __len__(self) -> int:
+        return len(self.CB)
+
+    def __getitem__(self, idx: int) -> Dict[str, float]:
+        if idx < 0:
+            idx += len(self)
+        if not 0 <= idx < len(self):
+            raise IndexError("sweep result index out of range")
+        point = dict(self.fixed)
+        rest = idx
+        for name, size in reversed(list(zip(self.axes, self.shape))):
+            rest, k = divmod(rest, size)
+            point[name] = float(self.axes[name][k])
+        point["CB"] = float(self.CB[idx])
+        return {name: point[name] for name in (*INPUT_NAMES, "CB")}
+
+    def array(self) -> Any:
+        """CB as an N-dimensional NumPy view (requires NumPy)."""
+        if not HAS_NUMPY:
+            raise RuntimeError("NumPy is required for NDSweep.array()")
+        return np.asarray(self.CB).reshape(self.shape)
+
+
+def sweep_nd(inputs: Dict[str, Any], engine: Optional[str] = None) -> NDSweep:
+    """Compute CB over any subset of k1, k2, Vr, Q and CA_in.
+
+    ``inputs`` gives every name of INPUT_NAMES either a number (held fixed)
+    or a sequence of values (swept; see axis_range). The Q x CA_in plane
+    of each (k1, k2, Vr) combination is one compute_CB_outer call.
+    """
+    unknown = set(inputs) - set(INPUT_NAMES)
+    missing = set(INPUT_NAMES) - set(inputs)
+    if unknown or missing:
+        raise ValueError(f"inputs must be exactly {', '.join(INPUT_NAMES)}")
+
+    axes: Dict[str, Any] = {}
+    fixed: Dict[str, float] = {}
+    for name in INPUT_NAMES:
+        value = inputs[name]
+        if isinstance(value, (int, float)):
+            fixed[name] = float(value)
+        else:
+            axes[name] = _as_doubles(value)
+
+    def values(name: str) -> Any:
+        return axes[name] if name in axes else _as_doubles([fixed[name]])
+
+    eng = select_engine(engine)
+    q, ca = values("Q"), values("CA_in")
+    block = len(q) * len(ca)
+    kinetic = [values(name) for name in ("k1", "k2", "Vr")]
+    out = _new_buffer(block * math.prod(len(k) for k in kinetic))
+    view = memoryview(out)
+    if block:
+        for b, (k1, k2, Vr) in enumerate(itertools.product(*kinetic)):
+            compute_CB_outer(q, ca, k1, k2, Vr, out=view[b * block:(b + 1) * block], engine=eng.name)
+    return NDSweep(axes, fixed, out, eng.name)
+
+
+# ---------- optimum and adaptive refinement ----------
+
+class Optimum(NamedTuple):
+    Q: float
+    CB: float
+    method: str        # "closed_form" or "bracket"
+    evaluations: int   # model evaluations spent (0 for the closed form)
+
+
+def _cb_value(Q: float, CA_in: float, k1: float, k2: float, Vr: float) -> float:
+    return (2.0 * k1 * Vr * Q * CA_in) / ((Q + k1 * Vr) * (Q + k2 * Vr))
+
+
+_INV_PHI = (math.sqrt(5.0) - 1.0) / 2.0
+
+
+def _bracket_max(f: Callable[[float], float], lo: float, hi: float, tol: float,
+                 n_scan: int = 64) -> tuple:
+    """Maximize f on [lo, hi]: coarse scan to bracket the best point, then golden section."""
+    xs = [lo + (hi - lo) * i / (n_scan - 1) for i in range(n_scan)]
+    ys = [f(x) for x in xs]
+    best = max(range(n_scan), key=ys.__getitem__)
+    a, b = xs[max(best - 1, 0)], xs[min(best + 1, n_scan - 1)]
+    evaluations = n_scan
+
+    c, d = b - _INV_PHI * (b - a), a + _INV_PHI * (b - a)
+    fc, fd = f(c), f(d)
+    evaluations += 2
+    while b - a > tol * max(1.0, abs(a) + abs(b)):
+        if fc >= fd:
+            b, d, fd = d, c, fc
+            c = b - _INV_PHI * (b - a)
+            fc = f(c)
+        else:
+            a, c, fc = c, d, fd
+            d = a + _INV_PHI * (b - a)
+            fd = f(d)
+        evaluations += 1
+
+    x = (a + b) / 2
+    candidates = [(f(x), x), (ys[best], xs[best])]
+    return max(candidates) + (evaluations + 1,)
+
+
+def optimum_Q(
+    k1: float, k2: float, Vr: float, CA_in: float,
+    Q_min: Optional[float] = None, Q_max: Optional[float] = None,
+    tol: float = 1e-12,
+) -> Optimum:
+    """Flow rate Q maximizing CB for fixed k1, k2, Vr and CA_in, without a sweep.
+
+    For positive k1, k2, Vr and CA_in, CB(Q) rises and then falls with a
+    single maximum at Q* = Vr * sqrt(k1 * k2); limited to [Q_min, Q_max]
+    the answer is Q* clamped to the interval. Other parameter values are
+    handled by a bracketed 1-D search, which needs both bounds.
+    """
+    if k1 > 0 and k2 > 0 and Vr > 0 and CA_in > 0:
+        q = Vr * math.sqrt(k1 * k2)
+        if Q_min is not None:
+            q = max(q, Q_min)
+        if Q_max is not None:
+            q = min(q, Q_max)
+        return Optimum(q, _cb_value(q, CA_in, k1, k2, Vr), "closed_form", 0)
+
+    if Q_min is None or Q_max is None or Q_max < Q_min:
+        raise ValueError("Q_min and Q_max are required for these parameters")
+
+    def f(q: float) -> float:
+        try:
+            return _cb_value(q, CA_in, k1, k2, Vr)
+        except ZeroDivisionError:
+            return -math.inf
+
+    cb, q, evaluations = _bracket_max(f, Q_min, Q_max, tol)
+    return Optimum(q, cb, "bracket", evaluations)
+
+
+class AdaptiveSweep(NamedTuple):
+    Q: Any             # sorted, non-uniform Q nodes
+    CB: Any            # CB at each node for the given CA_in
+    CA_in: float
+    evaluations: int
+
+
+def adaptive_sweep_CB(
+    k1: float, k2: float, Vr: float,
+    Q_min: float, Q_max: float, CA_in: float,
+    rtol: float = 1e-4,
+    max_jump: float = 0.05,
+    initial_points: int = 17,
+    max_depth: int = 16,
+    engine: Optional[str] = None,
+) -> AdaptiveSweep:
+    """CB(Q) on a grid refined only where the curve needs it.
+
+    Starts from ``initial_points`` uniform nodes and halves an interval
+    while its midpoint differs from the linear interpolation of the ends
+    by more than ``rtol`` (curvature) or CB changes across it by more than
+    ``max_jump`` (gradient), both relative to the largest |CB| seen, for at
+    most ``max_depth`` levels. CB is linear in CA_in, so one profile serves
+    every CA_in up to a factor; only Q is refined.
+    """
+    if Q_max <= Q_min:
+        raise ValueError("Q_max must be greater than Q_min")
+    if initial_points < 2:
+        raise ValueError("initial_points must be at least 2")
+    eng = select_engine(engine).name
+
+    def evaluate(qs: List[float]) -> List[float]:
+        return list(compute_CB_batch(qs, [CA_in] * len(qs), k1, k2, Vr, engine=eng))
+
+    qs = [Q_min + (Q_max - Q_min) * i / (initial_points - 1) for i in range(initial_points)]
+    cbs = evaluate(qs)
+    points = list(zip(qs, cbs))
+    intervals = list(zip(qs, cbs, qs[1:], cbs[1:]))
+    scale = max(abs(c) for c in cbs) or 1.0
+    evaluations = len(qs)
+
+    for _ in range(max_depth):
+        if not intervals:
+            break
+        mids = [(q0 + q1) / 2 for q0, _, q1, _ in intervals]
+        values = evaluate(mids)
+        evaluations += len(mids)
+        scale = max(scale, max(abs(c) for c in values))
+        refine = []
+        for (q0, c0, q1, c1), qm, cm in zip(intervals, mids, values):
+            points.append((qm, cm))
+            curvature = abs(cm - (c0 + c1) / 2)
+            jump = max(abs(cm - c0), abs(c1 - cm))
+            if curvature > rtol * scale or jump > max_jump * scale:
+                refine.append((q0, c0, qm, cm))
+                refine.append((qm, cm, q1, c1))
+        intervals = refine
+
+    points.sort()
+    return AdaptiveSweep(
+        _as_doubles([q for q, _ in points]), _as_doubles([c for _, c in points]), CA_in, evaluations,
+    )
+
+
+# ---------- transient simulation ----------
+
+REACTOR_INPUTS = ("Q", "CA_in", "k1", "k2", "Vr")
+
+
+def steady_state(Q: float, CA_in: float, k1: float, k2: float, Vr: float) -> tuple:
+    """(CA, CB) of the steady state; a starting point for disturbance runs."""
+    ca = Q * CA_in / (Q + k1 * Vr)
+    return ca, 2.0 * k1 * Vr * ca / (Q + k2 * Vr)
+
+
+def _broadcast(value: Any, n: int) -> Any:
+    if isinstance(value, (int, float)):
+        return _as_doubles([float(value)] * n)
+    if len(value) != n:
+        raise ValueError("all reactor inputs must have the same length")
+    return _as_doubles(value)
+
+
+class TransientResult:
+    """CA(t) and CB(t) of n reactors, row-major by reactor (``CB[i * n_t + r]``)."""
+
+    def __init__(self, t: Any, CA: Any, CB: Any, n: int, method: str, engine: str, steps: int) -> None:
+        self.t = t
+        self.n = n
+        self.n_t = len(t)
+        self.CA = CA
+        self.CB = CB
+        self.method = method
+        self.engine = engine
+        self.steps = steps
+
+    def __len__(self) -> int:
+        return self.n
+
+    def trajectory(self, i: int) -> tuple:
+        """(CA, CB) over t for reactor i (views when NumPy is available)."""
+        a, b = i * self.n_t, (i + 1) * self.n_t
+        return self.CA[a:b], self.CB[a:b]
+
+
+class TransientStream:
+    """Time integration of many reactors, produced in blocks of output samples.
+
+    ``reactors`` maps each of REACTOR_INPUTS to a number or a sequence (one
+    value per reactor). Iterating yields a TransientResult per block of at
+    most ``chunk_points`` samples (all reactors x block times), continuing
+    from the state reached by the previous block; every iteration starts
+    again from ``CA0``/``CB0`` (default: empty reactor, i.e. start-up).
+    ``method`` is ``"rk4"`` (``substeps`` fixed steps per output interval)
+    or ``"adaptive"`` (Dormand-Prince 5(4) with ``rtol``/``atol``).
+    """
+
+    def __init__(self, reactors: Dict[str, Any], t_end: float, dt_out: float,
+                 method: str = "rk4", substeps: int = 10, rtol: float = 1e-6, atol: float = 1e-9,
+                 CA0: Any = 0.0, CB0: Any = 0.0,
+                 chunk_points: int = DEFAULT_CHUNK_POINTS, engine: Optional[str] = None) -> None:
+        if method not in ("rk4", "adaptive"):
+            raise ValueError("method must be 'rk4' or 'adaptive'")
+        if dt_out <= 0 or t_end < 0:
+            raise ValueError("dt_out must be positive and t_end non-negative")
+        if set(reactors) != set(REACTOR_INPUTS):
+            raise ValueError(f"reactors must give exactly {', '.join(REACTOR_INPUTS)}")
+        sizes = {len(v) for v in reactors.values() if not isinstance(v, (int, float))}
+        if len(sizes) > 1:
+            raise ValueError("all reactor inputs must have the same length")
+        self.n = sizes.pop() if sizes else 1
+        self.reactors = tuple(_broadcast(reactors[k], self.n) for k in REACTOR_INPUTS)
+        self.CA0 = _broadcast(CA0, self.n)
+        self.CB0 = _broadcast(CB0, self.n)
+        self.dt_out = dt_out
+        self.n_out = int(round(t_end / dt_out))
+        self.method = method
+        self.substeps = max(int(substeps), 1)
+        self.rtol = rtol
+        self.atol = atol
+        self.engine = select_engine(engine).name
+        self.samples_per_block = max(1, chunk_points // max(self.n, 1))
+        self.n_blocks = -(-self.n_out // self.samples_per_block)
+
+    def __iter__(self) -> Iterator[TransientResult]:
+        eng = select_engine(self.engine)
+        ca, cb = _new_buffer(self.n), _new_buffer(self.n)
+        ca[:], cb[:] = self.CA0, self.CB0
+        h = _new_buffer(self.n)
+        for b in range(self.n_blocks):
+            r0 = b * self.samples_per_block
+            m = min(self.samples_per_block, self.n_out - r0)
+            out_ca, out_cb = _new_buffer(self.n * m), _new_buffer(self.n * m)
+            with instrument.span("transient"):
+                steps = eng.transient(self.method, self.reactors, ca, cb, h, self.dt_out, m,
+                                      self.substeps, self.rtol, self.atol, out_ca, out_cb)
+            instrument.count("transient_steps", steps)
+            t = _axis(self.dt_out, self.dt_out, m, r0)
+            yield TransientResult(t, out_ca, out_cb, self.n, self.method, self.engine, steps)
+
+    def collect(self, progress: Optional[Callable[[int, int], None]] = None,
+                cancel: Any = None) -> TransientResult:
+        """Whole run as one TransientResult, t from 0 (the initial state) to t_end.
 
-    results: List[Dict[str, float]] = []
-    eps = 1e-9
+        ``progress`` and ``cancel`` behave as in SweepStream.collect.
+        """
+        n, n_t = self.n, self.n_out + 1
+        CA, CB = _new_buffer(n * n_t), _new_buffer(n * n_t)
+        for i in range(n):
+            CA[i * n_t], CB[i * n_t] = self.CA0[i], self.CB0[i]
+        steps = 0
+        r0 = 1
+        for b, block in enumerate(self):
+            if cancel is not None and cancel.is_set():
+                raise SweepCancelled()
+            m = block.n_t
+            if HAS_NUMPY:
+                CA.reshape(n, n_t)[:, r0:r0 + m] = np.asarray(block.CA).reshape(n, m)
+                CB.reshape(n, n_t)[:, r0:r0 + m] = np.asarray(block.CB).reshape(n, m)
+            else:
+                for i in range(n):
+                    CA[i * n_t + r0:i * n_t + r0 + m] = block.CA[i * m:(i + 1) * m]
+                    CB[i * n_t + r0:i * n_t + r0 + m] = block.CB[i * m:(i + 1) * m]
+            r0 += m
+            steps += block.steps
+            if progress is not None:
+                progress(b + 1, self.n_blocks)
+        return TransientResult(_axis(0.0, self.dt_out, n_t), CA, CB, n, self.method, self.engine, steps)
 
-    q = Q_min
-    while q <= Q_max + eps:
-        ca = CAin_min
-        while ca <= CAin_max + eps:
-            results.append({"Q": q, "CA_in": ca, "CB": compute_CB(q, ca, k1, k2, Vr)})
-            ca += dCAin
-        q += dQ
 
-    return results
\ No newline at end of file
+def simulate_CSTR(reactors: Dict[str, Any], t_end: float, dt_out: float, **kwargs) -> TransientResult:
+    """Integrate CA(t), CB(t) of one or many reactors; see TransientStream for options."""
+    return TransientStream(reactors, t_end, dt_out, **kwargs).collect()
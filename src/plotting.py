@@ -0,0 +1,281 @@
+from __future__ import annotations
+
+import math
+import tkinter as tk
+from typing import Any, NamedTuple, Optional
+
+# matplotlib is imported by ResultPlot itself, so that the helpers below
+# (used from the calculation worker) stay cheap to import
+from model_core import HAS_NUMPY, SweepResult
+
+if HAS_NUMPY:
+    import numpy as np
+
+
+def minmax_decimate(x: Any, y: Any, width: int) -> tuple:
+    """Reduce a curve to at most ~2*width points, keeping each bucket's extremes.
+
+    The points are split into ``width`` buckets (one per pixel column) and
+    only the min and max of every bucket are kept, in their original order,
+    so the drawn envelope matches the full curve.
+    """
+    n = len(y)
+    width = max(int(width), 1)
+    if n <= 2 * width:
+        return x, y
+    per = n // width
+    m = per * width
+
+    if HAS_NUMPY:
+        x = np.asarray(x)
+        y = np.asarray(y)
+        base = np.arange(width) * per
+        buckets = y[:m].reshape(width, per)
+        idx = np.concatenate([base + buckets.argmin(axis=1), base + buckets.argmax(axis=1), np.arange(m, n)])
+        idx.sort()
+        return x[idx], y[idx]
+
+    idx = []
+    for b in range(0, m, per):
+        seg = range(b, b + per)
+        lo = min(seg, key=y.__getitem__)
+        hi = max(seg, key=y.__getitem__)
+        idx.extend(sorted({lo, hi}))
+    idx.extend(range(m, n))
+    return [x[i] for i in idx], [y[i] for i in idx]
+
+
+class PlotData(NamedTuple):
+    result: SweepResult
+    image: Any              # CB over (Q rows, CA_in columns), strided to screen size
+    extent: tuple           # (CA_in min, CA_in max, Q min, Q max)
+    cb_min: float
+    cb_max: float
+
+
+def prepare_plot(result: SweepResult, max_rows: int = 600, max_cols: int = 600) -> Optional[PlotData]:
+    """Everything the plot needs that is proportional to the grid size.
+
+    Safe to call from a worker thread: it does not touch matplotlib.
+    """
+    n_Q, n_CA = result.shape
+    if not n_Q or not n_CA:
+        return None
+    sq = max(1, math.ceil(n_Q / max_rows))
+    sc = max(1, math.ceil(n_CA / max_cols))
+    cb = result.CB
+    if HAS_NUMPY:
+        grid = np.asarray(cb).reshape(n_Q, n_CA)
+        image = grid[::sq, ::sc]
+        cb_min, cb_max = float(grid.min()), float(grid.max())
+    else:
+        image = [list(cb[i * n_CA:(i + 1) * n_CA:sc]) for i in range(0, n_Q, sq)]
+        cb_min, cb_max = min(cb), max(cb)
+    extent = (result.ca_axis[0], result.ca_axis[-1], result.q_axis[0], result.q_axis[-1])
+    return PlotData(result, image, tuple(float(v) for v in extent), cb_min, cb_max)
+
+
+def _padded(lo: float, hi: float) -> tuple:
+    if hi > lo:
+        return lo, hi
+    pad = abs(lo) * 0.05 or 1.0
+    return lo - pad, hi + pad
+
+
+class ResultPlot:
+    """CB(Q) slice plus a CB(Q, CA_in) heatmap with a CA_in slice slider.
+
+    Artists are created once and updated in place. The slice curve, the
+    heatmap marker and the label are animated, so moving the slider only
+    restores the cached background and blits them; axes limits are set per
+    result from the global CB range, which keeps every slice in view.
+    set_bands overlays Monte Carlo percentile bands and the ensemble mean
+    on the slice; set_overlay adds the same slice of another result (a
+    stored run) as a dotted line.
+    """
+
+    def __init__(self, master: tk.Misc) -> None:
+        from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
+        from matplotlib.figure import Figure
+
+        self.fig = Figure(figsize=(6, 3))
+        self.ax_line = self.fig.add_subplot(121)
+        self.ax_map = self.fig.add_subplot(122)
+        self.ax_line.set_xlabel("Q, л/мин")
+        self.ax_line.set_ylabel("CB, моль/л")
+        self.ax_map.set_xlabel("CA_in, моль/л")
+        self.ax_map.set_ylabel("Q, л/мин")
+
+        (self.line,) = self.ax_line.plot([], [], animated=True)
+        (self.band_mean,) = self.ax_line.plot([], [], "--", lw=1, animated=True, visible=False)
+        (self.overlay_line,) = self.ax_line.plot([], [], ":", lw=1.5, color="k", animated=True, visible=False)
+        self.band_fill = None
+        self.label = self.ax_line.text(0.02, 0.95, "", transform=self.ax_line.transAxes,
+                                       va="top", animated=True)
+        self.marker = self.ax_map.axvline(0.0, color="w", lw=1, animated=True, visible=False)
+        self.image = None
+        self.fig.tight_layout()
+
+        self.canvas = FigureCanvasTkAgg(self.fig, master=master)
+        self.canvas.get_tk_widget().pack(fill="x", pady=(10, 0))
+        self.canvas.mpl_connect("draw_event", self._on_draw)
+        self.slider = tk.Scale(master, orient="horizontal", from_=0, to=0, showvalue=False,
+                               command=self._on_slider)
+        self.slider.pack(fill="x")
+
+        self.background = None
+        self.data: Optional[PlotData] = None
+        self.bands: Any = None
+        self.band_percentiles = (5.0, 95.0)
+        self.overlay: Optional[SweepResult] = None
+        self.overlay_name = ""
+        self.index = 0
+
+    def set_data(self, data: PlotData) -> None:
+        # stay on the CA_in slice shown before (e.g. while a grid is refined)
+        index = 0
+        if self.data is not None:
+            ca = float(self.data.result.ca_axis[self.index])
+            index = data.result.nearest_index(float(data.result.q_axis[0]), ca) % data.result.n_CA
+        self.data = data
+        self.bands = None
+        self.overlay = None
+        if self.image is None:
+            self.image = self.ax_map.imshow(data.image, origin="lower", aspect="auto",
+                                            interpolation="nearest", extent=data.extent)
+            self.fig.colorbar(self.image, ax=self.ax_map)
+        else:
+            self.image.set_data(data.image)
+            self.image.set_extent(data.extent)
+        self.image.set_clim(*_padded(data.cb_min, data.cb_max))
+        self.ax_map.set_xlim(*_padded(data.extent[0], data.extent[1]))
+        self.ax_map.set_ylim(*_padded(data.extent[2], data.extent[3]))
+        self.ax_line.set_xlim(*_padded(data.extent[2], data.extent[3]))
+        self.ax_line.set_ylim(*_padded(min(data.cb_min, 0.0), data.cb_max * 1.05))
+
+        self.index = index
+        self.slider.config(to=data.result.n_CA - 1)
+        self.slider.set(index)
+        self._update_slice(full=True)
+
+    def set_bands(self, bands: Any, p_lo: float = 5.0, p_hi: float = 95.0) -> None:
+        """Overlay an UncertaintyResult computed on the current result's grid."""
+        res = self.data.result if self.data is not None else None
+        if res is None or len(bands.q_axis) != res.n_Q or len(bands.ca_axis) != res.n_CA:
+            raise ValueError("bands do not match the plotted grid")
+        self.bands = bands
+        self.band_percentiles = (p_lo, p_hi)
+        lo = min(float(bands.percentile(p_lo).CB.min()), self.data.cb_min, 0.0)
+        hi = max(float(bands.percentile(p_hi).CB.max()), self.data.cb_max)
+        self.ax_line.set_ylim(*_padded(lo, hi * 1.05))
+        self._update_slice(full=True)
+
+    def set_overlay(self, result: SweepResult, name: str = "") -> None:
+        """Draw CB(Q) of ``result`` at the CA_in nearest to the current slice."""
+        if self.data is None or not len(result):
+            raise ValueError("nothing to overlay on")
+        self.overlay = result
+        self.overlay_name = name
+        cb = result.CB
+        lo, hi = (float(np.min(cb)), float(np.max(cb))) if HAS_NUMPY else (min(cb), max(cb))
+        lo = min(lo, self.data.cb_min, 0.0)
+        hi = max(hi, self.data.cb_max)
+        self.ax_line.set_ylim(*_padded(lo, hi * 1.05))
+        self.ax_line.set_xlim(*_padded(min(self.data.extent[2], float(result.q_axis[0])),
+                                       max(self.data.extent[3], float(result.q_axis[-1]))))
+        self._update_slice(full=True)
+
+    def _on_slider(self, value: str) -> None:
+        j = int(float(value))
+        if self.data is not None and j != self.index:
+            self.index = j
+            self._update_slice()
+
+    def _update_slice(self, full: bool = False) -> None:
+        res = self.data.result
+        ca = float(res.ca_axis[self.index])
+        width = int(self.ax_line.bbox.width) or 600
+        xs, ys = minmax_decimate(res.q_axis, res.column(self.index), width)
+        self.line.set_data(xs, ys)
+        label = f"CA_in={ca:g}"
+        if self.overlay is not None:
+            other = self.overlay
+            j = other.nearest_index(float(other.q_axis[0]), ca) % other.n_CA
+            self.overlay_line.set_data(*minmax_decimate(other.q_axis, other.column(j), width))
+            label += f"\n··· {self.overlay_name}, CA_in={float(other.ca_axis[j]):g}"
+        self.overlay_line.set_visible(self.overlay is not None)
+        self.label.set_text(label)
+        self.marker.set_xdata([ca, ca])
+        self.marker.set_visible(True)
+        self._update_band(width)
+
+        if full or self.background is None:
+            self.canvas.draw()
+        else:
+            self.canvas.restore_region(self.background)
+            self._draw_animated()
+            self.canvas.blit(self.fig.bbox)
+
+    def _update_band(self, width: int) -> None:
+        if self.band_fill is not None:
+            self.band_fill.remove()
+            self.band_fill = None
+        if self.bands is None:
+            self.band_mean.set_visible(False)
+            return
+        mean, lower, upper = self.bands.column_band(self.index, *self.band_percentiles)
+        q = self.bands.q_axis
+        step = max(1, len(q) // (2 * width))
+        q, mean, lower, upper = q[::step], mean[::step], lower[::step], upper[::step]
+        self.band_fill = self.ax_line.fill_between(q, lower, upper, alpha=0.3, lw=0, animated=True)
+        self.band_mean.set_data(q, mean)
+        self.band_mean.set_visible(True)
+
+    def _on_draw(self, event) -> None:
+        # full redraws (new result, resize) refresh the blit background
+        self.background = self.canvas.copy_from_bbox(self.fig.bbox)
+        self._draw_animated()
+
+    def _draw_animated(self) -> None:
+        artists = [self.line, self.label, self.marker, self.band_mean, self.overlay_line]
+        if self.band_fill is not None:
+            artists.insert(0, self.band_fill)
+        for artist in artists:
+            self.fig.draw_artist(artist)
+
+
+class TransientPlot:
+    """Window with CA(t) and CB(t) of a TransientResult, one line per reactor.
+
+    ``labels`` name the reactors in the legend; ``steady`` (CB per reactor)
+    is drawn as dashed lines the trajectories should settle to.
+    """
+
+    def __init__(self, master: tk.Misc, result: Any, labels: Any, steady: Any = None,
+                 title: str = "Переходный процесс") -> None:
+        from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
+        from matplotlib.figure import Figure
+
+        self.window = tk.Toplevel(master)
+        self.window.title(title)
+        self.fig = Figure(figsize=(7, 3.5))
+        ax_ca = self.fig.add_subplot(121)
+        ax_cb = self.fig.add_subplot(122)
+        ax_ca.set_xlabel("t, мин")
+        ax_ca.set_ylabel("CA, моль/л")
+        ax_cb.set_xlabel("t, мин")
+        ax_cb.set_ylabel("CB, моль/л")
+
+        width = 800
+        for i, label in enumerate(labels):
+            ca, cb = result.trajectory(i)
+            (line,) = ax_cb.plot(*minmax_decimate(result.t, cb, width), label=label)
+            ax_ca.plot(*minmax_decimate(result.t, ca, width), color=line.get_color())
+            if steady is not None:
+                ax_cb.axhline(steady[i], color=line.get_color(), ls="--", lw=0.8)
+        ax_cb.legend(fontsize="small")
+        self.fig.tight_layout()
+
+        self.canvas = FigureCanvasTkAgg(self.fig, master=self.window)
+        self.canvas.get_tk_widget().pack(fill="both", expand=True)
+        self.canvas.draw()
@@ -1,5 +1,230 @@
+#include <math.h>
+#include <stddef.h>
+
+#ifdef _OPENMP
+#include <omp.h>
+#endif
+
+#if defined(_WIN32)
 #define EXPORT __declspec(dllexport)
+#else
+#define EXPORT __attribute__((visibility("default")))
+#endif
 
-EXPORT double compute_CB(double Q, double CA_in, double k1, double k2, double Vr) {
+/* Build variant name, set by build_native.py (e.g. -DREACTOR_VARIANT=avx2_openmp). */
+#ifndef REACTOR_VARIANT
+#define REACTOR_VARIANT "default"
+#endif
+
+/* Outer loops run on all cores in OpenMP builds once there is enough work
+   to pay for the threads; elsewhere the pragma expands to nothing. Every
+   element is computed by the same expression in any variant, and builds
+   use -ffp-contract=off, so results do not depend on the variant. */
+#define PRAGMA(x) _Pragma(#x)
+#ifdef _OPENMP
+#define PARALLEL_FOR(work) PRAGMA(omp parallel for schedule(static) if ((work) >= 65536))
+#define PARALLEL_FOR_SUM(work, var) \
+    PRAGMA(omp parallel for schedule(dynamic, 16) reduction(+ : var) if ((work) >= 256))
+#else
+#define PARALLEL_FOR(work)
+#define PARALLEL_FOR_SUM(work, var)
+#endif
+
+EXPORT const char *reactor_model_variant(void) {
+    return REACTOR_VARIANT;
+}
+
+/* Threads an OpenMP build will use (OMP_NUM_THREADS), 1 otherwise. */
+EXPORT int reactor_model_threads(void) {
+#ifdef _OPENMP
+    return omp_get_max_threads();
+#else
+    return 1;
+#endif
+}
+
+static double cb_point(double Q, double CA_in, double k1, double k2, double Vr) {
     return (2.0 * k1 * Vr * Q * CA_in) / ((Q + k1 * Vr) * (Q + k2 * Vr));
-}
\ No newline at end of file
+}
+
+EXPORT double compute_CB(double Q, double CA_in, double k1, double k2, double Vr) {
+    return cb_point(Q, CA_in, k1, k2, Vr);
+}
+
+/* CB for arbitrary (Q[i], CA_in[i]) pairs, written to out[0..n). */
+EXPORT void compute_CB_batch(const double *Q, const double *CA_in, size_t n,
+                             double k1, double k2, double Vr, double *out) {
+    PARALLEL_FOR(n)
+    for (size_t i = 0; i < n; i++) {
+        out[i] = cb_point(Q[i], CA_in[i], k1, k2, Vr);
+    }
+}
+
+/* CB over the grid Q_min + i*dQ, CAin_min + j*dCAin, row-major by Q:
+   out[i * n_CA + j]. */
+EXPORT void compute_CB_grid(double Q_min, double dQ, size_t n_Q,
+                            double CAin_min, double dCAin, size_t n_CA,
+                            double k1, double k2, double Vr, double *out) {
+    PARALLEL_FOR(n_Q * n_CA)
+    for (size_t i = 0; i < n_Q; i++) {
+        double Q = Q_min + (double)i * dQ;
+        /* CB is linear in CA_in, so one rational term per row is enough */
+        double a = (2.0 * k1 * Vr * Q) / ((Q + k1 * Vr) * (Q + k2 * Vr));
+        double *row = out + i * n_CA;
+        for (size_t j = 0; j < n_CA; j++) {
+            row[j] = a * (CAin_min + (double)j * dCAin);
+        }
+    }
+}
+
+/* CB over the outer product of explicit axes Q[0..n_Q) x CA_in[0..n_CA),
+   row-major by Q like compute_CB_grid. */
+EXPORT void compute_CB_outer(const double *Q, size_t n_Q,
+                             const double *CA_in, size_t n_CA,
+                             double k1, double k2, double Vr, double *out) {
+    PARALLEL_FOR(n_Q * n_CA)
+    for (size_t i = 0; i < n_Q; i++) {
+        double q = Q[i];
+        double a = (2.0 * k1 * Vr * q) / ((q + k1 * Vr) * (q + k2 * Vr));
+        double *row = out + i * n_CA;
+        for (size_t j = 0; j < n_CA; j++) {
+            row[j] = a * CA_in[j];
+        }
+    }
+}
+
+/* ---------- transient CSTR: A -> 2B (k1), B -> C (k2) ----------
+
+   dCA/dt = Q/Vr * (CA_in - CA) - k1*CA
+   dCB/dt = -Q/Vr * CB + 2*k1*CA - k2*CB
+
+   whose steady state is compute_CB. Reactor i has parameters Q[i],
+   CA_in[i], k1[i], k2[i], Vr[i]; CA[i], CB[i] hold its state on entry and
+   are advanced in place, so a long run can be integrated in chunks.
+   Outputs are row-major by reactor: out[i * n_out + r] is the state at
+   (r + 1) * dt_out after the call started. */
+
+typedef struct {
+    double d, ca_in, k1, k2;   /* d = Q / Vr */
+} cstr_t;
+
+static void cstr_rhs(const cstr_t *p, double ca, double cb, double *dca, double *dcb) {
+    *dca = p->d * (p->ca_in - ca) - p->k1 * ca;
+    *dcb = -p->d * cb + 2.0 * p->k1 * ca - p->k2 * cb;
+}
+
+static cstr_t cstr_at(const double *Q, const double *CA_in, const double *k1,
+                      const double *k2, const double *Vr, size_t i) {
+    cstr_t p = {Q[i] / Vr[i], CA_in[i], k1[i], k2[i]};
+    return p;
+}
+
+static void rk4_step(const cstr_t *p, double h, double *ca, double *cb) {
+    double a1, b1, a2, b2, a3, b3, a4, b4;
+    cstr_rhs(p, *ca, *cb, &a1, &b1);
+    cstr_rhs(p, *ca + 0.5 * h * a1, *cb + 0.5 * h * b1, &a2, &b2);
+    cstr_rhs(p, *ca + 0.5 * h * a2, *cb + 0.5 * h * b2, &a3, &b3);
+    cstr_rhs(p, *ca + h * a3, *cb + h * b3, &a4, &b4);
+    *ca += h / 6.0 * (a1 + 2.0 * a2 + 2.0 * a3 + a4);
+    *cb += h / 6.0 * (b1 + 2.0 * b2 + 2.0 * b3 + b4);
+}
+
+/* Fixed-step RK4 with `substeps` steps per output interval. */
+EXPORT void simulate_CSTR_rk4(size_t n, const double *Q, const double *CA_in,
+                              const double *k1, const double *k2, const double *Vr,
+                              double *CA, double *CB, double dt_out, size_t n_out,
+                              size_t substeps, double *out_CA, double *out_CB) {
+    size_t m = substeps ? substeps : 1;
+    double h = dt_out / (double)m;
+    PARALLEL_FOR(n * n_out * m * 64)
+    for (size_t i = 0; i < n; i++) {
+        cstr_t p = cstr_at(Q, CA_in, k1, k2, Vr, i);
+        double ca = CA[i], cb = CB[i];
+        for (size_t r = 0; r < n_out; r++) {
+            for (size_t s = 0; s < m; s++) {
+                rk4_step(&p, h, &ca, &cb);
+            }
+            out_CA[i * n_out + r] = ca;
+            out_CB[i * n_out + r] = cb;
+        }
+        CA[i] = ca;
+        CB[i] = cb;
+    }
+}
+
+/* One Dormand-Prince 5(4) step; returns the scaled error norm (<= 1 accepts). */
+static double dp45_step(const cstr_t *p, double h, double ca, double cb,
+                        double rtol, double atol, double *ca5, double *cb5) {
+    double a[7], b[7];
+    cstr_rhs(p, ca, cb, &a[0], &b[0]);
+    cstr_rhs(p, ca + h * (a[0] / 5.0), cb + h * (b[0] / 5.0), &a[1], &b[1]);
+    cstr_rhs(p, ca + h * (3.0 / 40.0 * a[0] + 9.0 / 40.0 * a[1]),
+             cb + h * (3.0 / 40.0 * b[0] + 9.0 / 40.0 * b[1]), &a[2], &b[2]);
+    cstr_rhs(p, ca + h * (44.0 / 45.0 * a[0] - 56.0 / 15.0 * a[1] + 32.0 / 9.0 * a[2]),
+             cb + h * (44.0 / 45.0 * b[0] - 56.0 / 15.0 * b[1] + 32.0 / 9.0 * b[2]), &a[3], &b[3]);
+    cstr_rhs(p, ca + h * (19372.0 / 6561.0 * a[0] - 25360.0 / 2187.0 * a[1]
+                          + 64448.0 / 6561.0 * a[2] - 212.0 / 729.0 * a[3]),
+             cb + h * (19372.0 / 6561.0 * b[0] - 25360.0 / 2187.0 * b[1]
+                       + 64448.0 / 6561.0 * b[2] - 212.0 / 729.0 * b[3]), &a[4], &b[4]);
+    cstr_rhs(p, ca + h * (9017.0 / 3168.0 * a[0] - 355.0 / 33.0 * a[1] + 46732.0 / 5247.0 * a[2]
+                          + 49.0 / 176.0 * a[3] - 5103.0 / 18656.0 * a[4]),
+             cb + h * (9017.0 / 3168.0 * b[0] - 355.0 / 33.0 * b[1] + 46732.0 / 5247.0 * b[2]
+                       + 49.0 / 176.0 * b[3] - 5103.0 / 18656.0 * b[4]), &a[5], &b[5]);
+    *ca5 = ca + h * (35.0 / 384.0 * a[0] + 500.0 / 1113.0 * a[2] + 125.0 / 192.0 * a[3]
+                     - 2187.0 / 6784.0 * a[4] + 11.0 / 84.0 * a[5]);
+    *cb5 = cb + h * (35.0 / 384.0 * b[0] + 500.0 / 1113.0 * b[2] + 125.0 / 192.0 * b[3]
+                     - 2187.0 / 6784.0 * b[4] + 11.0 / 84.0 * b[5]);
+    cstr_rhs(p, *ca5, *cb5, &a[6], &b[6]);
+
+    /* difference between the 5th and embedded 4th order solutions */
+    double ea = h * (71.0 / 57600.0 * a[0] - 71.0 / 16695.0 * a[2] + 71.0 / 1920.0 * a[3]
+                     - 17253.0 / 339200.0 * a[4] + 22.0 / 525.0 * a[5] - 1.0 / 40.0 * a[6]);
+    double eb = h * (71.0 / 57600.0 * b[0] - 71.0 / 16695.0 * b[2] + 71.0 / 1920.0 * b[3]
+                     - 17253.0 / 339200.0 * b[4] + 22.0 / 525.0 * b[5] - 1.0 / 40.0 * b[6]);
+    double sa = atol + rtol * fmax(fabs(ca), fabs(*ca5));
+    double sb = atol + rtol * fmax(fabs(cb), fabs(*cb5));
+    return sqrt(0.5 * ((ea / sa) * (ea / sa) + (eb / sb) * (eb / sb)));
+}
+
+/* Adaptive Dormand-Prince 5(4) between output times. h[i] carries the
+   step size between calls (<= 0 picks dt_out). Returns accepted steps. */
+EXPORT size_t simulate_CSTR_adaptive(size_t n, const double *Q, const double *CA_in,
+                                     const double *k1, const double *k2, const double *Vr,
+                                     double *CA, double *CB, double *h, double dt_out,
+                                     size_t n_out, double rtol, double atol,
+                                     double *out_CA, double *out_CB) {
+    size_t steps = 0;
+    PARALLEL_FOR_SUM(n, steps)
+    for (size_t i = 0; i < n; i++) {
+        cstr_t p = cstr_at(Q, CA_in, k1, k2, Vr, i);
+        double ca = CA[i], cb = CB[i];
+        double step = h[i] > 0.0 ? h[i] : dt_out;
+        for (size_t r = 0; r < n_out; r++) {
+            double left = dt_out;
+            while (left > 0.0) {
+                double hs = step < left ? step : left;
+                double ca5, cb5;
+                double err = dp45_step(&p, hs, ca, cb, rtol, atol, &ca5, &cb5);
+                double factor = err > 0.0 ? 0.9 * pow(err, -0.2) : 5.0;
+                factor = factor < 0.2 ? 0.2 : (factor > 5.0 ? 5.0 : factor);
+                if (err <= 1.0) {
+                    ca = ca5;
+                    cb = cb5;
+                    left -= hs;
+                    steps++;
+                    if (hs == step) step *= factor;
+                    /* a step clipped at the output time keeps the old size */
+                } else {
+                    step = hs * factor;
+                }
+                if (left < 1e-12 * dt_out) left = 0.0;
+            }
+            out_CA[i * n_out + r] = ca;
+            out_CB[i * n_out + r] = cb;
+        }
+        CA[i] = ca;
+        CB[i] = cb;
+        h[i] = step;
+    }
+    return steps;
+}
@@ -0,0 +1,211 @@
+from __future__ import annotations
+
+import csv
+import json
+import mmap
+import struct
+import sys
+import zipfile
+from array import array
+from pathlib import Path
+from typing import Any, Dict, Iterable, Iterator, Tuple, Union
+
+from model_core import HAS_NUMPY, SweepResult, SweepStream
+
+if HAS_NUMPY:
+    import numpy as np
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    HAS_PARQUET = True
+except ImportError:
+    HAS_PARQUET = False
+
+Source = Union[SweepResult, SweepStream]
+
+# float64 in the byte order of this machine, as stored in every binary export
+_F8 = "<f8" if sys.byteorder == "little" else ">f8"
+
+RAW_MAGIC = b"RCTRF64\0"
+EXPORT_CHUNK_POINTS = 1 << 18
+
+
+def _blocks(source: Source) -> Iterator[SweepResult]:
+    if isinstance(source, SweepResult):
+        return source.bands(EXPORT_CHUNK_POINTS)
+    return iter(source)
+
+
+def _n_points(source: Source) -> int:
+    return len(source) if isinstance(source, SweepResult) else source.n_points
+
+
+def _shape(source: Source) -> Tuple[int, int]:
+    return source.shape if isinstance(source, SweepResult) else (source.n_Q, source.n_CA)
+
+
+def _header(params: Dict[str, Any], source: Source) -> Dict[str, Any]:
+    return {"params": params, "shape": list(_shape(source)), "dtype": _F8, "order": "C"}
+
+
+def write_csv_report(path: Any, params: Dict[str, Any], blocks: Iterable[SweepResult]) -> int:
+    """Write the CSV report for ``params`` and return the number of rows.
+
+    ``blocks`` is any iterable of SweepResult: ``result.bands()`` for an
+    in-memory sweep or an iter_sweep_CB() stream, which is consumed band by
+    band. Rows are formatted and written one band at a time.
+    """
+    rows = 0
+    with open(path, "w", newline="", encoding="utf-8-sig") as f:
+        writer = csv.writer(f, delimiter=";")
+        p = params
+
+        writer.writerow(["Отчёт по расчёту реактора (вариант 8)"])
+        writer.writerow([])
+        writer.writerow(["Тип сырья", p.get("raw_type", "")])
+        writer.writerow(["Vr, л", p["Vr"]])
+        writer.writerow(["k1, 1/мин", p["k1"]])
+        writer.writerow(["k2, 1/мин", p["k2"]])
+        writer.writerow(["Q_min, л/мин", p["Q_min"]])
+        writer.writerow(["Q_max, л/мин", p["Q_max"]])
+        writer.writerow(["dQ, л/мин", p["dQ"]])
+        writer.writerow(["CAin_min, моль/л", p["CAin_min"]])
+        writer.writerow(["CAin_max, моль/л", p["CAin_max"]])
+        writer.writerow(["dCAin, моль/л", p["dCAin"]])
+        writer.writerow([])
+        writer.writerow(["Q, л/мин", "CA_in, моль/л", "CB, моль/л"])
+
+        for block in blocks:
+            writer.writerows(zip(
+                map("{:.2f}".format, block.Q.tolist()),
+                map("{:.3f}".format, block.CA_in.tolist()),
+                map("{:.4f}".format, block.CB.tolist()),
+            ))
+            rows += len(block)
+    return rows
+
+
+def _npy_header(shape: Tuple[int, ...]) -> bytes:
+    """NPY format 1.0 header for a C-ordered float64 array."""
+    text = "{'descr': '%s', 'fortran_order': False, 'shape': %r, }" % (_F8, tuple(shape))
+    text += " " * (-(10 + len(text) + 1) % 64) + "\n"
+    return b"\x93NUMPY\x01\x00" + struct.pack("<H", len(text)) + text.encode("latin1")
+
+
+def _rows_bytes(block: SweepResult) -> bytes:
+    """Interleaved (Q, CA_in, CB) rows of a block."""
+    if HAS_NUMPY:
+        return np.column_stack((block.Q, block.CA_in, block.CB)).tobytes()
+    buf = array("d")
+    for row in zip(block.Q, block.CA_in, block.CB):
+        buf.extend(row)
+    return buf.tobytes()
+
+
+def write_npy(path: Any, params: Dict[str, Any], source: Source) -> int:
+    """(n, 3) float64 array of Q, CA_in, CB rows in NumPy .npy format."""
+    n = _n_points(source)
+    with open(path, "wb") as f:
+        f.write(_npy_header((n, 3)))
+        for block in _blocks(source):
+            f.write(_rows_bytes(block))
+    return n
+
+
+def write_npz(path: Any, params: Dict[str, Any], source: Source) -> int:
+    """Uncompressed .npz with q_axis, ca_axis and CB (n_Q x n_CA).
+
+    The JSON header with the parameters is stored as the archive comment.
+    """
+    n_Q, n_CA = _shape(source)
+    q_parts = []
+    ca_axis = None
+    with zipfile.ZipFile(path, "w", zipfile.ZIP_STORED, allowZip64=True) as zf:
+        with zf.open("CB.npy", "w", force_zip64=True) as f:
+            f.write(_npy_header((n_Q, n_CA)))
+            for block in _blocks(source):
+                f.write(memoryview(block.CB).tobytes())
+                q_parts.append(memoryview(block.q_axis).tobytes())
+                ca_axis = block.ca_axis
+        with zf.open("q_axis.npy", "w") as f:
+            f.write(_npy_header((n_Q,)))
+            for part in q_parts:
+                f.write(part)
+        with zf.open("ca_axis.npy", "w") as f:
+            f.write(_npy_header((n_CA,)))
+            if ca_axis is not None:
+                f.write(memoryview(ca_axis).tobytes())
+        zf.comment = json.dumps(_header(params, source), ensure_ascii=False).encode("utf-8")
+    return n_Q * n_CA
+
+
+def write_raw(path: Any, params: Dict[str, Any], source: Source) -> int:
+    """Memory-mappable CB grid with a JSON header.
+
+    Layout: RAW_MAGIC, header length (uint64 LE), UTF-8 JSON header padded
+    so the data starts on a 64-byte boundary, then n_Q x n_CA float64 CB
+    values row-major by Q. Read it back with read_raw.
+    """
+    head = json.dumps(_header(params, source), ensure_ascii=False).encode("utf-8")
+    head += b" " * (-(len(RAW_MAGIC) + 8 + len(head)) % 64)
+    with open(path, "wb") as f:
+        f.write(RAW_MAGIC + struct.pack("<Q", len(head)) + head)
+        for block in _blocks(source):
+            f.write(memoryview(block.CB).tobytes())
+    return _n_points(source)
+
+
+def read_raw(path: Any) -> Tuple[Dict[str, Any], Any]:
+    """(header, CB) of a write_raw file; CB is memory-mapped, not read."""
+    with open(path, "rb") as f:
+        if f.read(len(RAW_MAGIC)) != RAW_MAGIC:
+            raise ValueError("not a reactor raw export")
+        (size,) = struct.unpack("<Q", f.read(8))
+        header = json.loads(f.read(size).decode("utf-8"))
+    offset = len(RAW_MAGIC) + 8 + size
+    n_Q, n_CA = header["shape"]
+    if HAS_NUMPY:
+        cb = np.memmap(path, dtype=header["dtype"], mode="r", offset=offset, shape=(n_Q * n_CA,))
+        return header, cb
+    with open(path, "rb") as f:
+        mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    return header, memoryview(mm)[offset:offset + 8 * n_Q * n_CA].cast("d")
+
+
+def write_parquet(path: Any, params: Dict[str, Any], source: Source) -> int:
+    """Parquet table with Q, CA_in, CB columns, one row group per block."""
+    if not HAS_PARQUET:
+        raise RuntimeError("для экспорта в Parquet нужен пакет pyarrow")
+    schema = pa.schema(
+        [("Q", pa.float64()), ("CA_in", pa.float64()), ("CB", pa.float64())],
+        metadata={"reactor": json.dumps(_header(params, source), ensure_ascii=False)},
+    )
+    with pq.ParquetWriter(str(path), schema) as writer:
+        for block in _blocks(source):
+            writer.write_table(pa.table(
+                [pa.array(np.asarray(block.Q)), pa.array(np.asarray(block.CA_in)), pa.array(np.asarray(block.CB))],
+                schema=schema,
+            ))
+    return _n_points(source)
+
+
+EXPORTERS = {
+    ".npy": write_npy,
+    ".npz": write_npz,
+    ".f64": write_raw,
+    ".parquet": write_parquet,
+}
+
+
+def export_result(path: Any, params: Dict[str, Any], source: Source) -> int:
+    """Export by file extension: .csv, .npy, .npz, .f64 or .parquet.
+
+    ``source`` is a SweepResult or an iter_sweep_CB() stream; data is
+    written block by block. Returns the number of grid points written.
+    """
+    suffix = Path(path).suffix.lower()
+    if suffix in EXPORTERS:
+        return EXPORTERS[suffix](path, params, source)
+    return write_csv_report(path, params, _blocks(source))
@@ -0,0 +1,449 @@
+"""Local JSON-over-HTTP compute service for other tools.
+
+Run from the ``src`` directory::
+
+    python -m service                       # http://127.0.0.1:8765
+    python -m service --port 9000 --workers 4
+    python -m service --unix /tmp/reactor.sock
+
+The native library, the coefficient catalogue and the sweep cache are
+loaded once per process. Endpoints (JSON bodies, JSON answers):
+
+    GET  /health      native variant and engine
+    GET  /raw-types   raw type names
+    GET  /stats       latency percentiles per endpoint, batching counters
+    POST /point       {"raw_type": "...", "Q": 1.5, "CA_in": 2.0}  (or lists)
+    POST /sweep       {"raw_type": "...", "dQ": 0.01, ...}
+    POST /reload      re-read the coefficients from reactor.db
+
+Any of the nine PARAM_NAMES in a body overrides the raw type's value; with
+all of them given (k1, k2, Vr for /point) no raw type is needed.
+
+Point requests that arrive within a short window are coalesced into one
+batched kernel call per (k1, k2, Vr); identical sweeps in flight are
+computed once. Compute jobs share a bounded thread pool and at most
+``max_pending`` requests are accepted at a time, the rest get 503.
+Only loopback addresses are served and nothing leaves the machine.
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import ipaddress
+import json
+import sys
+import time
+from array import array
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from http import HTTPStatus
+from pathlib import Path
+from typing import Any, Callable, Deque, Dict, List, Optional, Tuple
+
+import db
+from batch import load_sweep_params
+from model_core import PARAM_NAMES, compute_CB_batch, grid_count, native_selection, select_engine
+from sweep_cache import cache_key, cached_sweep_CB, default_cache
+
+DEFAULT_PORT = 8765
+MAX_BODY_BYTES = 16 << 20
+MAX_SWEEP_POINTS = 1_000_000
+POINT_PARAMS = ("k1", "k2", "Vr")
+
+
+def _spawn(coro: Any, tasks: set) -> asyncio.Task:
+    """Start ``coro`` as a task kept alive in ``tasks`` until it finishes
+    (the event loop itself only holds weak references to tasks)."""
+    task = asyncio.ensure_future(coro)
+    tasks.add(task)
+    task.add_done_callback(tasks.discard)
+    return task
+
+
+class ServiceError(Exception):
+    """Error answered to the client with the given HTTP status."""
+
+    def __init__(self, status: int, message: str) -> None:
+        super().__init__(message)
+        self.status = status
+
+
+class LatencyStats:
+    """Latencies of the last ``window`` requests per endpoint."""
+
+    def __init__(self, window: int = 10_000) -> None:
+        self.window = window
+        self.samples: Dict[str, Deque[float]] = {}
+        self.counts: Dict[str, int] = {}
+
+    def add(self, route: str, seconds: float) -> None:
+        self.samples.setdefault(route, deque(maxlen=self.window)).append(seconds)
+        self.counts[route] = self.counts.get(route, 0) + 1
+
+    def report(self) -> Dict[str, Dict[str, float]]:
+        """p50/p90/p99/max in milliseconds (nearest rank) and request counts."""
+        out = {}
+        for route, samples in self.samples.items():
+            ms = sorted(s * 1e3 for s in samples)
+
+            def pick(p: int) -> float:
+                return ms[min(len(ms) - 1, max(0, -(-len(ms) * p // 100) - 1))]
+
+            out[route] = {"requests": self.counts[route], "p50_ms": pick(50), "p90_ms": pick(90),
+                          "p99_ms": pick(99), "max_ms": ms[-1]}
+        return out
+
+    def summary(self) -> str:
+        return "\n".join(
+            f"{route}: {r['requests']} запросов, p50 {r['p50_ms']:.2f} мс, p90 {r['p90_ms']:.2f} мс, "
+            f"p99 {r['p99_ms']:.2f} мс, max {r['max_ms']:.2f} мс"
+            for route, r in sorted(self.report().items())
+        ) or "запросов не было"
+
+
+class PointBatcher:
+    """Coalesces point requests into one compute_CB_batch call per (k1, k2, Vr).
+
+    Requests are collected for ``window`` seconds after the first one, or
+    until ``max_points`` points are waiting, then every group is computed
+    by ``run`` (a coroutine running the call on the worker pool).
+    """
+
+    def __init__(self, run: Callable[..., Any], window: float = 0.002, max_points: int = 65536,
+                 engine: Optional[str] = None) -> None:
+        self.run = run
+        self.window = window
+        self.max_points = max_points
+        self.engine = engine
+        self._pending: Dict[tuple, List[tuple]] = {}
+        self._points = 0
+        self._timer: Optional[asyncio.TimerHandle] = None
+        self._tasks: set = set()
+        self.requests = 0
+        self.kernel_calls = 0
+        self.points = 0
+
+    async def compute(self, coeffs: tuple, Q: List[float], CA_in: List[float]) -> List[float]:
+        fut = asyncio.get_running_loop().create_future()
+        self._pending.setdefault(coeffs, []).append((Q, CA_in, fut))
+        self._points += len(Q)
+        self.requests += 1
+        if self._points >= self.max_points:
+            self._flush()
+        elif self._timer is None:
+            self._timer = asyncio.get_running_loop().call_later(self.window, self._flush)
+        return await fut
+
+    def _flush(self) -> None:
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        pending, self._pending, self._points = self._pending, {}, 0
+        for coeffs, items in pending.items():
+            _spawn(self._run_group(coeffs, items), self._tasks)
+
+    async def _run_group(self, coeffs: tuple, items: List[tuple]) -> None:
+        Q, CA_in = array("d"), array("d")
+        for q, ca, _ in items:
+            Q.extend(q)
+            CA_in.extend(ca)
+        self.kernel_calls += 1
+        self.points += len(Q)
+        try:
+            cb = await self.run(compute_CB_batch, Q, CA_in, *coeffs, None, self.engine)
+        except Exception as e:
+            for _, _, fut in items:
+                if not fut.done():
+                    fut.set_exception(e)
+            return
+        start = 0
+        for q, _, fut in items:
+            if not fut.done():
+                fut.set_result(cb[start:start + len(q)].tolist())
+            start += len(q)
+
+    def stats(self) -> Dict[str, Any]:
+        return {"requests": self.requests, "kernel_calls": self.kernel_calls, "points": self.points}
+
+
+class ComputeService:
+    """Request handlers plus the shared state: coefficients, pool, batcher."""
+
+    def __init__(self, workers: int = 4, max_pending: int = 256, engine: Optional[str] = None,
+                 batch_window: float = 0.002, max_sweep_points: int = MAX_SWEEP_POINTS) -> None:
+        self.engine = select_engine(engine).name
+        self.workers = workers
+        self.max_pending = max_pending
+        self.max_sweep_points = max_sweep_points
+        self.pool = ThreadPoolExecutor(workers, thread_name_prefix="reactor-service")
+        self.slots = asyncio.Semaphore(workers)
+        self.batcher = PointBatcher(self._run, batch_window, engine=self.engine)
+        self.latency = LatencyStats()
+        self.in_flight: Dict[str, asyncio.Future] = {}
+        self._tasks: set = set()
+        self.pending = 0
+        self.rejected = 0
+        self.sweep_dedup_hits = 0
+        self.coeffs: Dict[str, Dict[str, float]] = {}
+        self.raw_type_ids: Dict[str, int] = {}
+        self.reload()
+        self.routes = {
+            ("GET", "/health"): self.health,
+            ("GET", "/raw-types"): self.raw_types,
+            ("GET", "/stats"): self.stats,
+            ("POST", "/point"): self.point,
+            ("POST", "/sweep"): self.sweep,
+            ("POST", "/reload"): self.reload_coeffs,
+        }
+
+    async def _run(self, func: Callable[..., Any], *args) -> Any:
+        # at most `workers` jobs hold a pool thread; the rest wait here
+        async with self.slots:
+            return await asyncio.get_running_loop().run_in_executor(self.pool, func, *args)
+
+    def reload(self) -> None:
+        db.invalidate_read_cache()
+        self.raw_type_ids = {rt["name"]: rt["id"] for rt in db.get_raw_types()}
+        self.coeffs = load_sweep_params()
+
+    def _params(self, body: Dict[str, Any], names: Tuple[str, ...]) -> Dict[str, float]:
+        """Raw type's coefficients with the body's overrides, restricted to ``names``."""
+        base: Dict[str, float] = {}
+        name = body.get("raw_type")
+        if name is not None:
+            if name not in self.coeffs:
+                raise ServiceError(HTTPStatus.NOT_FOUND, f"unknown raw type {name!r}")
+            base = self.coeffs[name]
+        params = {}
+        for key in names:
+            value = body.get(key, base.get(key))
+            if value is None:
+                raise ServiceError(HTTPStatus.BAD_REQUEST, f"missing {key} (give raw_type or {key})")
+            try:
+                params[key] = float(value)
+            except (TypeError, ValueError):
+                raise ServiceError(HTTPStatus.BAD_REQUEST, f"{key} must be a number") from None
+        return params
+
+    # ---------- handlers ----------
+    async def health(self, body: Any) -> Dict[str, Any]:
+        native = native_selection()
+        return {"ok": True, "engine": self.engine, "native": native.get("variant")}
+
+    async def raw_types(self, body: Any) -> Dict[str, Any]:
+        return {"raw_types": list(self.coeffs)}
+
+    async def stats(self, body: Any) -> Dict[str, Any]:
+        return {
+            "latency": self.latency.report(),
+            "points": self.batcher.stats(),
+            "sweeps_in_flight": len(self.in_flight),
+            "sweep_dedup_hits": self.sweep_dedup_hits,
+            "sweep_cache": default_cache.stats(),
+            "pending": self.pending,
+            "rejected": self.rejected,
+        }
+
+    async def reload_coeffs(self, body: Any) -> Dict[str, Any]:
+        await self._run(self.reload)
+        return {"raw_types": len(self.coeffs)}
+
+    async def point(self, body: Dict[str, Any]) -> Dict[str, Any]:
+        p = self._params(body, POINT_PARAMS)
+        Q, CA_in = body.get("Q"), body.get("CA_in")
+        scalar = not isinstance(Q, list)
+        Q = [Q] if scalar else Q
+        CA_in = [CA_in] * len(Q) if not isinstance(CA_in, list) else CA_in
+        try:
+            Q, CA_in = [float(v) for v in Q], [float(v) for v in CA_in]
+        except (TypeError, ValueError):
+            raise ServiceError(HTTPStatus.BAD_REQUEST, "Q and CA_in must be numbers or lists of numbers") from None
+        if len(Q) != len(CA_in):
+            raise ServiceError(HTTPStatus.BAD_REQUEST, "Q and CA_in must have the same length")
+        cb = await self.batcher.compute(tuple(p[k] for k in POINT_PARAMS), Q, CA_in)
+        return {"CB": cb[0] if scalar else cb}
+
+    async def sweep(self, body: Dict[str, Any]) -> Dict[str, Any]:
+        p = self._params(body, PARAM_NAMES)
+        if p["dQ"] <= 0 or p["dCAin"] <= 0:
+            raise ServiceError(HTTPStatus.BAD_REQUEST, "dQ and dCAin must be positive")
+        points = grid_count(p["Q_min"], p["Q_max"], p["dQ"]) * grid_count(p["CAin_min"], p["CAin_max"], p["dCAin"])
+        if points > self.max_sweep_points:
+            raise ServiceError(HTTPStatus.REQUEST_ENTITY_TOO_LARGE,
+                               f"{points} points, at most {self.max_sweep_points} per request")
+
+        # identical sweeps in flight share one computation
+        key = cache_key(p)
+        fut = self.in_flight.get(key)
+        if fut is not None:
+            self.sweep_dedup_hits += 1
+        else:
+            raw_id = self.raw_type_ids.get(body.get("raw_type"))
+            fut = _spawn(self._run(self._sweep_json, p, raw_id), self._tasks)
+            self.in_flight[key] = fut
+            fut.add_done_callback(lambda _: self.in_flight.pop(key, None))
+        return await asyncio.shield(fut)
+
+    def _sweep_json(self, params: Dict[str, float], raw_id: Optional[int]) -> Dict[str, Any]:
+        result = cached_sweep_CB(params, raw_id, engine=self.engine)
+        return {
+            "params": result.params,
+            "engine": result.engine,
+            "shape": list(result.shape),
+            "q_axis": list(result.q_axis),
+            "ca_axis": list(result.ca_axis),
+            "CB": result.CB.tolist(),
+        }
+
+    async def handle(self, method: str, path: str, body: Any) -> Tuple[int, Any]:
+        path = path.split("?", 1)[0]
+        route = self.routes.get((method, path))
+        if route is None:
+            return HTTPStatus.NOT_FOUND, {"error": f"no route {method} {path}"}
+        if self.pending >= self.max_pending:
+            # backpressure: refuse rather than queue without bound
+            self.rejected += 1
+            return HTTPStatus.SERVICE_UNAVAILABLE, {"error": "too many requests in flight"}
+        self.pending += 1
+        t0 = time.perf_counter()
+        try:
+            return HTTPStatus.OK, await route(body)
+        except ServiceError as e:
+            return e.status, {"error": str(e)}
+        except ValueError as e:
+            return HTTPStatus.BAD_REQUEST, {"error": str(e)}
+        except Exception as e:
+            return HTTPStatus.INTERNAL_SERVER_ERROR, {"error": str(e)}
+        finally:
+            self.pending -= 1
+            self.latency.add(f"{method} {path}", time.perf_counter() - t0)
+
+    # ---------- HTTP/1.1 ----------
+    async def serve_connection(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        try:
+            while True:
+                request = await self._read_request(reader)
+                if request is None:
+                    break
+                method, path, body, keep_alive = request
+                status, answer = (await self.handle(method, path, body)) if method else (path, body)
+                data = json.dumps(answer, ensure_ascii=False).encode("utf-8")
+                head = (f"HTTP/1.1 {int(status)} {HTTPStatus(status).phrase}\r\n"
+                        "Content-Type: application/json; charset=utf-8\r\n"
+                        f"Content-Length: {len(data)}\r\n"
+                        f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n")
+                if status == HTTPStatus.SERVICE_UNAVAILABLE:
+                    head += "Retry-After: 1\r\n"
+                writer.write(head.encode("ascii") + b"\r\n" + data)
+                await writer.drain()
+                if not keep_alive:
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+
+    @staticmethod
+    async def _read_request(reader: asyncio.StreamReader) -> Optional[tuple]:
+        """(method, path, body, keep_alive); a malformed request gives
+        ("", status, error, False) so the error is answered and the
+        connection closed."""
+        line = await reader.readline()
+        if not line.strip():
+            return None
+        try:
+            method, path, version = line.decode("latin-1").split()
+        except ValueError:
+            return "", HTTPStatus.BAD_REQUEST, {"error": "malformed request line"}, False
+        headers = {}
+        while True:
+            line = await reader.readline()
+            if line in (b"\r\n", b"\n", b""):
+                break
+            name, _, value = line.decode("latin-1").partition(":")
+            headers[name.strip().lower()] = value.strip()
+        keep_alive = headers.get("connection", "").lower() != "close" and version == "HTTP/1.1"
+        try:
+            length = int(headers.get("content-length") or 0)
+        except ValueError:
+            length = -1
+        if length < 0:
+            return "", HTTPStatus.BAD_REQUEST, {"error": "invalid Content-Length"}, False
+        if length > MAX_BODY_BYTES:
+            return "", HTTPStatus.REQUEST_ENTITY_TOO_LARGE, {"error": "request body too large"}, False
+        body: Any = {}
+        if length:
+            try:
+                body = json.loads(await reader.readexactly(length))
+            except (UnicodeDecodeError, json.JSONDecodeError):
+                return "", HTTPStatus.BAD_REQUEST, {"error": "body is not valid JSON"}, False
+        if not isinstance(body, dict):
+            return "", HTTPStatus.BAD_REQUEST, {"error": "body must be a JSON object"}, False
+        return method.upper(), path, body, keep_alive
+
+
+def _check_loopback(host: str) -> None:
+    if host == "localhost":
+        return
+    try:
+        if ipaddress.ip_address(host).is_loopback:
+            return
+    except ValueError:
+        pass
+    raise SystemExit(f"сервис работает только на localhost, а не на {host}")
+
+
+async def serve(service: ComputeService, host: str = "127.0.0.1", port: int = DEFAULT_PORT,
+                unix: Optional[str] = None) -> None:
+    if unix:
+        server = await asyncio.start_unix_server(service.serve_connection, unix)
+        where = unix
+    else:
+        _check_loopback(host)
+        server = await asyncio.start_server(service.serve_connection, host, port)
+        where = f"http://{host}:{port}"
+    native = native_selection()
+    print(f"сервис: {where}, движок {service.engine}, native: {native.get('variant') or 'нет'}", file=sys.stderr)
+    try:
+        async with server:
+            await server.serve_forever()
+    finally:
+        if unix:
+            Path(unix).unlink(missing_ok=True)
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    ap = argparse.ArgumentParser(prog="python -m service", description="Локальный сервис расчёта CB (JSON по HTTP)")
+    ap.add_argument("--host", default="127.0.0.1", help="адрес (только loopback, по умолчанию 127.0.0.1)")
+    ap.add_argument("--port", type=int, default=DEFAULT_PORT)
+    ap.add_argument("--unix", help="слушать Unix-сокет вместо TCP")
+    ap.add_argument("--db", help="путь к reactor.db")
+    ap.add_argument("--engine", help="движок расчёта: native, numpy, python")
+    ap.add_argument("--workers", type=int, default=4, help="потоков расчёта (по умолчанию 4)")
+    ap.add_argument("--max-pending", type=int, default=256, help="запросов одновременно, сверх — 503")
+    ap.add_argument("--batch-window-ms", type=float, default=2.0, help="окно объединения точечных запросов")
+    ap.add_argument("--max-sweep-points", type=int, default=MAX_SWEEP_POINTS)
+    args = ap.parse_args(argv)
+
+    if args.db:
+        db.DB_PATH = Path(args.db)
+    db.init_db()
+
+    async def run() -> None:
+        service = ComputeService(args.workers, args.max_pending, args.engine,
+                                 args.batch_window_ms / 1e3, args.max_sweep_points)
+        try:
+            await serve(service, args.host, args.port, args.unix)
+        finally:
+            service.pool.shutdown(wait=False)
+            print(service.latency.summary(), file=sys.stderr)
+
+    try:
+        asyncio.run(run())
+    except KeyboardInterrupt:
+        pass
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,166 @@
+from __future__ import annotations
+
+import hashlib
+import json
+import sqlite3
+import threading
+import zlib
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Optional, Tuple
+
+import db
+import instrument
+from model_core import (
+    DEFAULT_CHUNK_POINTS, MODEL_VERSION, PARAM_NAMES, SweepResult, SweepStream, buffer_from_bytes,
+    can_reuse, incremental_sweep_CB, sweep_CB,
+)
+
+
+def cache_key(params: Dict[str, float]) -> str:
+    """Canonical hash of the nine sweep parameters and the model version."""
+    canon = json.dumps(
+        {"v": MODEL_VERSION, "p": [repr(float(params[k])) for k in PARAM_NAMES]},
+        separators=(",", ":"),
+    )
+    return hashlib.sha256(canon.encode("ascii")).hexdigest()
+
+
+class SweepCache:
+    """Two-tier cache of sweep results: in-process LRU plus SQLite blobs.
+
+    Both tiers are bounded by size in bytes of the CB column. Entries are
+    tagged with the raw type they were computed for and dropped when that
+    raw type's coefficients change (see db.update_coeffs).
+    """
+
+    def __init__(self, max_memory_bytes: int = 256 << 20, max_disk_bytes: int = 1 << 30,
+                 use_disk: bool = True, max_disk_entry_bytes: int = 64 << 20) -> None:
+        self.max_memory_bytes = max_memory_bytes
+        self.max_disk_bytes = max_disk_bytes
+        # compressing huge grids costs more than recomputing them
+        self.max_disk_entry_bytes = max_disk_entry_bytes
+        self.use_disk = use_disk
+        self._lock = threading.Lock()
+        self._lru: "OrderedDict[str, Tuple[Optional[int], SweepResult]]" = OrderedDict()
+        self._memory_bytes = 0
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        db.add_coeffs_listener(self.invalidate_raw_type)
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                "memory_hits": self.memory_hits,
+                "disk_hits": self.disk_hits,
+                "misses": self.misses,
+                "entries": len(self._lru),
+                "memory_bytes": self._memory_bytes,
+            }
+
+    def _remember(self, key: str, raw_type_id: Optional[int], result: SweepResult) -> None:
+        size = len(result) * 8
+        if size > self.max_memory_bytes:
+            return
+        with self._lock:
+            old = self._lru.pop(key, None)
+            if old is not None:
+                self._memory_bytes -= len(old[1]) * 8
+            self._lru[key] = (raw_type_id, result)
+            self._memory_bytes += size
+            while self._memory_bytes > self.max_memory_bytes:
+                _, (_, evicted) = self._lru.popitem(last=False)
+                self._memory_bytes -= len(evicted) * 8
+
+    def get(self, params: Dict[str, float], raw_type_id: Optional[int] = None) -> Optional[SweepResult]:
+        with instrument.span("cache"):
+            return self._get(params, raw_type_id)
+
+    def _get(self, params: Dict[str, float], raw_type_id: Optional[int]) -> Optional[SweepResult]:
+        key = cache_key(params)
+        with self._lock:
+            entry = self._lru.get(key)
+            if entry is not None:
+                self._lru.move_to_end(key)
+                self.memory_hits += 1
+                instrument.count("cache_hits")
+                return entry[1]
+
+        if self.use_disk:
+            try:
+                row = db.get_cached_sweep(key)
+            except sqlite3.Error:
+                row = None
+            if row is not None:
+                cb = buffer_from_bytes(zlib.decompress(row["data"]))
+                result = SweepResult.from_params({k: params[k] for k in PARAM_NAMES}, cb, row["engine"])
+                self._remember(key, raw_type_id, result)
+                with self._lock:
+                    self.disk_hits += 1
+                instrument.count("cache_disk_hits")
+                return result
+
+        with self._lock:
+            self.misses += 1
+        instrument.count("cache_misses")
+        return None
+
+    def put(self, result: SweepResult, raw_type_id: Optional[int] = None) -> None:
+        key = cache_key(result.params)
+        self._remember(key, raw_type_id, result)
+        if self.use_disk and len(result) * 8 <= min(self.max_disk_bytes, self.max_disk_entry_bytes):
+            with instrument.span("cache"):
+                data = zlib.compress(result.cb_bytes(), 1)
+                try:
+                    db.put_cached_sweep(key, raw_type_id, result.engine, data, self.max_disk_bytes)
+                except sqlite3.Error:
+                    pass
+
+    def invalidate_raw_type(self, raw_type_id: int) -> None:
+        with self._lock:
+            for key in [k for k, (rid, _) in self._lru.items() if rid == raw_type_id]:
+                _, result = self._lru.pop(key)
+                self._memory_bytes -= len(result) * 8
+
+    def clear(self) -> None:
+        with self._lock:
+            self._lru.clear()
+            self._memory_bytes = 0
+        if self.use_disk:
+            db.clear_sweep_cache()
+
+
+default_cache = SweepCache()
+
+
+def cached_sweep_CB(
+    params: Dict[str, float],
+    raw_type_id: Optional[int] = None,
+    cache: Optional[SweepCache] = None,
+    previous: Optional[SweepResult] = None,
+    progress: Optional[Callable[[int, int], None]] = None,
+    cancel: Any = None,
+    **sweep_kwargs,
+) -> SweepResult:
+    """sweep_CB over ``params`` (the nine PARAM_NAMES), served from cache if possible.
+
+    On a miss with ``previous`` given, the points it shares with the new
+    grid are reused (see incremental_sweep_CB). With ``progress`` or
+    ``cancel`` the sweep runs band by band, reporting after each band, and
+    may raise SweepCancelled.
+    """
+    cache = default_cache if cache is None else cache
+    result = cache.get(params, raw_type_id)
+    if result is None:
+        args = [params[k] for k in PARAM_NAMES]
+        engine = sweep_kwargs.get("engine")
+        chunk_points = sweep_kwargs.get("chunk_points") or DEFAULT_CHUNK_POINTS
+        if can_reuse(previous, params):
+            result = incremental_sweep_CB(previous, *args, engine=engine, chunk_points=chunk_points,
+                                          progress=progress, cancel=cancel)
+        elif progress is not None or cancel is not None:
+            result = SweepStream(params, chunk_points, engine).collect(progress, cancel)
+        else:
+            result = sweep_CB(*args, **sweep_kwargs)
+        cache.put(result, raw_type_id)
+    return result
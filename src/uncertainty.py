@@ -0,0 +1,222 @@
+"""Monte Carlo uncertainty of CB under scatter of the kinetic coefficients.
+
+k1, k2 (and optionally Vr) are drawn around their nominal values and the
+ensemble is evaluated in vectorized batches. Every batch is folded into
+running sums and per-Q histograms, so memory does not grow with the
+number of samples; on long Q axes the histograms are kept at up to
+HIST_NODES evenly spaced Q values only. CB is linear in CA_in, so only the profile
+a(Q) = CB(Q, CA_in=1) is sampled and the bands of every (Q, CA_in) point
+follow from it exactly by scaling.
+
+Requires NumPy.
+"""
+from __future__ import annotations
+
+import math
+from statistics import NormalDist
+from typing import Any, Callable, Dict, Optional
+
+from model_core import (
+    DEFAULT_CHUNK_POINTS, HAS_NUMPY, SweepCancelled, SweepResult, axis_range,
+)
+
+if HAS_NUMPY:
+    import numpy as np
+
+DISTRIBUTIONS = ("lognormal", "normal")
+
+# samples drawn (and discarded) to fix the histogram range
+PILOT_SAMPLES = 4096
+# Q values with their own histogram; percentiles in between are interpolated
+HIST_NODES = 4096
+
+
+def _draw(rng: Any, nominal: float, rel_sd: float, size: int, distribution: str) -> Any:
+    """Samples around ``nominal`` with relative spread ``rel_sd``."""
+    if rel_sd <= 0:
+        return np.full(size, nominal)
+    if distribution == "lognormal":
+        # median at the nominal value, never negative
+        return nominal * rng.lognormal(0.0, rel_sd, size)
+    # normal, truncated to positive values by redrawing
+    x = rng.normal(nominal, rel_sd * abs(nominal), size)
+    bad = x <= 0
+    while bad.any():
+        x[bad] = rng.normal(nominal, rel_sd * abs(nominal), int(bad.sum()))
+        bad = x <= 0
+    return x
+
+
+def _profile(q: Any, k1: Any, k2: Any, Vr: Any) -> Any:
+    """a(Q) = CB(Q, CA_in=1) for each sample (rows) and Q (columns)."""
+    k1v = (k1 * Vr)[:, None]
+    k2v = (k2 * Vr)[:, None]
+    return (2.0 * k1v * q) / ((q + k1v) * (q + k2v))
+
+
+class UncertaintyResult:
+    """Reduced ensemble: moments and histograms of a(Q), scaled to CB on demand."""
+
+    def __init__(self, params: Dict[str, float], q_axis: Any, ca_axis: Any, n_samples: int,
+                 shift: Any, s1: Any, s2: Any, a_min: Any, a_max: Any,
+                 nodes: Any, counts: Any, lo: Any, width: Any) -> None:
+        self.params = dict(params)
+        self.q_axis = q_axis
+        self.ca_axis = ca_axis
+        self.n_samples = n_samples
+        self.mean_profile = shift + s1 / n_samples
+        var = np.maximum(s2 / n_samples - (s1 / n_samples) ** 2, 0.0)
+        self.std_profile = np.sqrt(var * n_samples / max(n_samples - 1, 1))
+        self.a_min = a_min
+        self.a_max = a_max
+        self._nodes = nodes  # indices into q_axis that have a histogram
+        self._counts = counts
+        self._cum = counts.cumsum(axis=1)
+        self._lo = lo
+        self._width = width
+
+    def profile_percentile(self, p: float) -> Any:
+        """p-th percentile of a(Q), interpolated within histogram bins
+        (and linearly in Q between histogram nodes)."""
+        rank = p / 100.0 * self.n_samples
+        n_bins = self._counts.shape[1] - 2
+        a_min, a_max = self.a_min[self._nodes], self.a_max[self._nodes]
+        j = np.minimum((self._cum < rank).sum(axis=1), n_bins + 1)
+        rows = np.arange(len(j))
+        before = np.where(j > 0, self._cum[rows, np.maximum(j - 1, 0)], 0)
+        inside = self._counts[rows, j]
+        frac = np.where(inside > 0, (rank - before) / np.maximum(inside, 1), 0.5)
+        value = self._lo + (j - 1 + frac) * self._width
+        value = np.where(j == 0, a_min, value)
+        value = np.where(j == n_bins + 1, a_max, value)
+        if len(self._nodes) < len(self.q_axis):
+            value = np.interp(self.q_axis, self.q_axis[self._nodes], value)
+        return np.clip(value, self.a_min, self.a_max)
+
+    def _result(self, cb: Any, tag: str) -> SweepResult:
+        return SweepResult(self.params, self.q_axis, self.ca_axis, cb.ravel(), f"monte_carlo:{tag}")
+
+    def mean(self) -> SweepResult:
+        return self._result(np.multiply.outer(self.mean_profile, self.ca_axis), "mean")
+
+    def percentile(self, p: float) -> SweepResult:
+        """p-th percentile of CB at every grid point."""
+        return self._result(self._percentile_grid(p), f"p{p:g}")
+
+    def _percentile_grid(self, p: float, columns: Any = None) -> Any:
+        ca = self.ca_axis if columns is None else self.ca_axis[columns]
+        # CB = a * CA_in: for negative CA_in the order of samples flips
+        upper = np.multiply.outer(self.profile_percentile(p), ca)
+        lower = np.multiply.outer(self.profile_percentile(100.0 - p), ca)
+        return np.where(ca >= 0, upper, lower)
+
+    def confidence(self, level: float = 0.95) -> tuple:
+        """Confidence interval of the mean CB at every point, as two SweepResults."""
+        z = NormalDist().inv_cdf((1.0 + level) / 2.0)
+        half = z * self.std_profile / math.sqrt(self.n_samples)
+        lo = np.multiply.outer(self.mean_profile - half, self.ca_axis)
+        hi = np.multiply.outer(self.mean_profile + half, self.ca_axis)
+        return self._result(np.minimum(lo, hi), "ci_lo"), self._result(np.maximum(lo, hi), "ci_hi")
+
+    def column_band(self, j: int, p_lo: float = 5.0, p_hi: float = 95.0) -> tuple:
+        """(mean, lower, upper) CB over Q at CA_in = ca_axis[j]."""
+        ca = float(self.ca_axis[j])
+        lower = self._percentile_grid(p_lo, [j])[:, 0]
+        upper = self._percentile_grid(p_hi, [j])[:, 0]
+        return self.mean_profile * ca, lower, upper
+
+
+def monte_carlo_CB(
+    params: Dict[str, float],
+    n_samples: int = 100_000,
+    k1_rel_sd: float = 0.1,
+    k2_rel_sd: float = 0.1,
+    Vr_rel_sd: float = 0.0,
+    distribution: str = "lognormal",
+    seed: Optional[int] = None,
+    bins: int = 1024,
+    chunk_points: int = DEFAULT_CHUNK_POINTS,
+    progress: Optional[Callable[[int, int], None]] = None,
+    cancel: Any = None,
+) -> UncertaintyResult:
+    """Monte Carlo ensemble of CB over the grid of ``params`` (the nine PARAM_NAMES).
+
+    k1, k2 and Vr are drawn with the given relative standard deviations
+    (``lognormal``: median at the nominal value; ``normal``: truncated at
+    zero). Each batch holds about ``chunk_points`` evaluations. Percentiles
+    come from ``bins`` histogram bins per Q (at most HIST_NODES of them)
+    whose range is set by PILOT_SAMPLES extra draws; values outside it fall
+    into edge bins clamped to the exact minimum and maximum.
+    ``progress(done, n_samples)`` and ``cancel`` behave as in
+    SweepStream.collect.
+    """
+    if not HAS_NUMPY:
+        raise RuntimeError("Monte Carlo requires NumPy")
+    if distribution not in DISTRIBUTIONS:
+        raise ValueError(f"distribution must be one of {', '.join(DISTRIBUTIONS)}")
+    if n_samples < 1:
+        raise ValueError("n_samples must be positive")
+
+    p = params
+    q = np.asarray(axis_range(p["Q_min"], p["Q_max"], p["dQ"]), dtype=np.float64)
+    ca = np.asarray(axis_range(p["CAin_min"], p["CAin_max"], p["dCAin"]), dtype=np.float64)
+    n_Q = len(q)
+    if not n_Q:
+        raise ValueError("empty Q range")
+
+    rng = np.random.default_rng(seed)
+    nodes = np.unique(np.linspace(0, n_Q - 1, min(n_Q, HIST_NODES)).round().astype(np.int64))
+    n_nodes = len(nodes)
+
+    def draw(size: int) -> Any:
+        return (_draw(rng, p["k1"], k1_rel_sd, size, distribution),
+                _draw(rng, p["k2"], k2_rel_sd, size, distribution),
+                _draw(rng, p["Vr"], Vr_rel_sd, size, distribution))
+
+    # the pilot fixes the histogram range, with a margin; a single first
+    # batch can be a handful of samples on a long Q axis
+    p_min = np.full(n_nodes, np.inf)
+    p_max = np.full(n_nodes, -np.inf)
+    pilot_batch = max(1, chunk_points // n_nodes)
+    for start in range(0, PILOT_SAMPLES, pilot_batch):
+        a = _profile(q[nodes], *draw(min(pilot_batch, PILOT_SAMPLES - start)))
+        np.minimum(p_min, a.min(axis=0), out=p_min)
+        np.maximum(p_max, a.max(axis=0), out=p_max)
+    span = p_max - p_min
+    pad = np.where(span > 0, span * 0.25, np.maximum(np.abs(p_min) * 1e-9, 1e-300))
+    lo = p_min - pad
+    width = (span + 2 * pad) / bins
+
+    batch = max(1, chunk_points // n_Q)
+    offsets = np.arange(n_nodes) * (bins + 2)
+    counts = np.zeros(n_nodes * (bins + 2), dtype=np.int64)
+    shift = a_min = a_max = None
+    s1 = np.zeros(n_Q)
+    s2 = np.zeros(n_Q)
+
+    done = 0
+    while done < n_samples:
+        if cancel is not None and cancel.is_set():
+            raise SweepCancelled()
+        size = min(batch, n_samples - done)
+        a = _profile(q, *draw(size))
+        if shift is None:
+            # running sums are taken around the first batch's mean
+            shift = a.mean(axis=0)
+            a_min, a_max = a.min(axis=0), a.max(axis=0)
+        else:
+            np.minimum(a_min, a.min(axis=0), out=a_min)
+            np.maximum(a_max, a.max(axis=0), out=a_max)
+
+        d = a - shift
+        s1 += d.sum(axis=0)
+        s2 += (d * d).sum(axis=0)
+        idx = np.clip(np.floor((a[:, nodes] - lo) / width) + 1, 0, bins + 1).astype(np.int64)
+        counts += np.bincount((idx + offsets).ravel(), minlength=counts.size)
+
+        done += size
+        if progress is not None:
+            progress(done, n_samples)
+
+    return UncertaintyResult(p, q, ca, n_samples, shift, s1, s2, a_min, a_max,
+                             nodes, counts.reshape(n_nodes, bins + 2), lo, width)
@@ -0,0 +1,18 @@
+import sys
+from pathlib import Path
+
+import pytest
+
+# the application modules live flat in src/ and import each other by name
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "src"))
+
+import db  # noqa: E402
+
+
+@pytest.fixture
+def fresh_db(tmp_path, monkeypatch):
+    """An initialised database in tmp_path; DB_PATH is restored afterwards."""
+    monkeypatch.setattr(db, "DB_PATH", tmp_path / "reactor.db")
+    db.init_db()
+    yield db.DB_PATH
+    db.close_connection()
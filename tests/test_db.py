@@ -0,0 +1,76 @@
+import sqlite3
+
+import db
+
+
+def test_read_cache_follows_db_path(tmp_path, fresh_db, monkeypatch):
+    monkeypatch.setattr(db, "DB_PATH", tmp_path / "other.db")
+    db.init_db()
+    db.close_connection()
+    with sqlite3.connect(db.DB_PATH) as conn:
+        conn.execute("INSERT INTO raw_types (name) VALUES ('Только во второй базе')")
+    conn.close()
+
+    monkeypatch.setattr(db, "DB_PATH", fresh_db)
+    first = {r["name"] for r in db.get_raw_types()}
+    raw_id = db.get_raw_types()[0]["id"]
+    k1 = db.get_coeffs(raw_id)["k1"]
+
+    monkeypatch.setattr(db, "DB_PATH", tmp_path / "other.db")
+    names = {r["name"] for r in db.get_raw_types()}
+    assert names == first | {"Только во второй базе"}
+    assert db.get_coeffs(raw_id)["k1"] == k1
+
+
+def test_update_coeffs_invalidates_cache(fresh_db):
+    raw_id = db.get_raw_types()[0]["id"]
+    coeffs = dict(db.get_coeffs(raw_id))
+    coeffs["k1"] = 0.777
+    db.update_coeffs(raw_id, coeffs)
+    assert db.get_coeffs(raw_id)["k1"] == 0.777
+
+
+def test_migration_from_v1_keeps_catalogue(fresh_db):
+    db.close_connection()
+    with sqlite3.connect(fresh_db) as conn:
+        conn.execute("DROP TABLE run_data")
+        conn.execute("DROP TABLE runs")
+        # v1 databases may hold several coefficient rows per raw type
+        conn.execute("DROP INDEX idx_kinetic_coeffs_raw_type")
+        conn.execute("INSERT INTO kinetic_coeffs (raw_type_id, k1, k2, Vr, Q_min, Q_max, dQ, CAin_min, CAin_max,"
+                     " dCAin) SELECT raw_type_id, 9, 9, 9, 1, 2, 1, 1, 2, 1 FROM kinetic_coeffs")
+        conn.execute("PRAGMA user_version = 1")
+    conn.close()
+    db.invalidate_read_cache()
+
+    db.init_db()
+    with db.get_connection() as conn:
+        assert conn.execute("PRAGMA user_version").fetchone()[0] == db.SCHEMA_VERSION
+        tables = {r[0] for r in conn.execute("SELECT name FROM sqlite_master WHERE type='table'")}
+        per_type = conn.execute("SELECT COUNT(*) FROM kinetic_coeffs GROUP BY raw_type_id").fetchall()
+    assert {"runs", "run_data"} <= tables
+    assert all(r[0] == 1 for r in per_type)
+    assert all(db.get_coeffs(rt["id"])["k1"] != 9 for rt in db.get_raw_types())
+    assert db.list_runs() == []
+
+
+def test_import_catalog_reports_bad_records(fresh_db):
+    coeffs = {"k1": 0.3, "k2": 0.1, "Vr": 5, "Q_min": 1, "Q_max": 2, "dQ": 0.5,
+              "CAin_min": 0.1, "CAin_max": 0.2, "dCAin": 0.1}
+    report = db.import_catalog([
+        {"name": "Новое", **coeffs},
+        {"name": "", **coeffs},
+        {"name": "Без шага", **coeffs, "dQ": 0},
+        {"name": "Текст", **coeffs, "k1": "abc"},
+        {"name": "NaN", **coeffs, "k2": "nan"},
+        {"name": "Новое", **coeffs},
+        {"name": "Только название"},
+        {"name": "Запятая", **coeffs, "k1": "0,5"},
+    ])
+    assert report.imported == 3
+    assert [num for num, _ in report.errors] == [2, 3, 4, 5, 6]
+    names = {rt["name"]: rt["id"] for rt in db.get_raw_types()}
+    assert {"Новое", "Только название", "Запятая"} <= set(names)
+    assert "Без шага" not in names
+    assert db.get_coeffs(names["Запятая"])["k1"] == 0.5
+    assert db.get_coeffs(names["Только название"]) is None
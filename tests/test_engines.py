@@ -0,0 +1,61 @@
+import math
+
+import pytest
+
+import model_core
+from model_core import available_engines, compute_CB_batch, compute_CB_grid, compute_CB_outer, sweep_nd
+
+np = pytest.importorskip("numpy")
+
+K = (0.1, 0.2, 10.0)
+
+
+def closed_form(q, ca, k1=K[0], k2=K[1], Vr=K[2]):
+    return 2.0 * k1 * Vr * q * ca / ((q + k1 * Vr) * (q + k2 * Vr))
+
+
+@pytest.mark.parametrize("engine", available_engines())
+def test_batch_integer_input(engine):
+    got = compute_CB_batch(np.arange(1, 4), np.ones(3, dtype=int), *K, engine=engine)
+    assert np.allclose(got, [closed_form(q, 1.0) for q in (1, 2, 3)], rtol=1e-12)
+
+
+@pytest.mark.parametrize("engine", available_engines())
+def test_outer_strided_input(engine):
+    q = np.linspace(1.0, 2.0, 10)
+    ca = np.linspace(0.0, 1.0, 9)[::3]
+    got = np.asarray(compute_CB_outer(q, ca, *K, engine=engine)).reshape(len(q), len(ca))
+    assert np.allclose(got, closed_form(q[:, None], ca[None, :]), rtol=1e-12)
+
+
+@pytest.mark.parametrize("engine", available_engines())
+def test_sweep_nd_integer_axis(engine):
+    r = sweep_nd({"Q": np.arange(1, 4), "CA_in": [1, 2], "k1": K[0], "k2": K[1], "Vr": K[2]}, engine=engine)
+    expected = [closed_form(q, ca) for q in (1, 2, 3) for ca in (1, 2)]
+    assert np.allclose(np.asarray(r.CB), expected, rtol=1e-12)
+
+
+def test_simulate_integer_flow_rate():
+    t = model_core.simulate_CSTR({"Q": np.arange(1, 4), "CA_in": 1.0, "k1": K[0], "k2": K[1], "Vr": K[2]},
+                                 t_end=200.0, dt_out=50.0, engine="numpy")
+    _, cb = t.trajectory(1)
+    assert math.isclose(cb[-1], closed_form(2.0, 1.0), rel_tol=1e-3)
+
+
+def test_stale_native_library_is_not_selected(monkeypatch):
+    class OnlyScalar:
+        def compute_CB(self, *args):
+            return closed_form(*args[:2])
+
+    monkeypatch.setattr(model_core, "_LIB", OnlyScalar())
+    monkeypatch.setitem(model_core._SELECTION, "batched", False)
+    assert "native" not in available_engines()
+    assert model_core.select_engine().name == "numpy"
+    with pytest.raises(RuntimeError):
+        model_core.select_engine("native")
+
+
+def test_check_engines_agree():
+    deviations = model_core.check_engines()
+    assert set(deviations) == set(available_engines())
+    assert max(deviations.values()) <= 1e-12
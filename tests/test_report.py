@@ -0,0 +1,78 @@
+import csv
+import json
+import zipfile
+
+import pytest
+
+from model_core import iter_sweep_CB, sweep_CB
+from report import HAS_PARQUET, export_result, read_raw
+
+np = pytest.importorskip("numpy")
+
+ARGS = (0.1, 0.2, 10.0, 1.0, 4.0, 0.01, 0.1, 0.5, 0.05)
+PARAMS = dict(zip(("k1", "k2", "Vr", "Q_min", "Q_max", "dQ", "CAin_min", "CAin_max", "dCAin"), ARGS))
+HEADER = {"raw_type": "Сырьё A", **PARAMS}
+
+
+@pytest.fixture(params=["result", "stream"])
+def source(request):
+    # a stream with small bands checks that blocks are joined correctly
+    return sweep_CB(*ARGS) if request.param == "result" else iter_sweep_CB(*ARGS, chunk_points=500)
+
+
+@pytest.fixture(scope="module")
+def expected():
+    r = sweep_CB(*ARGS)
+    return np.asarray(r.CB).reshape(r.shape), np.asarray(r.q_axis), np.asarray(r.ca_axis)
+
+
+def test_npy_round_trip(tmp_path, source, expected):
+    cb, q, ca = expected
+    n = export_result(tmp_path / "r.npy", HEADER, source)
+    rows = np.load(tmp_path / "r.npy")
+    assert n == cb.size and rows.shape == (cb.size, 3)
+    assert np.array_equal(rows[:, 0], np.repeat(q, len(ca)))
+    assert np.array_equal(rows[:, 1], np.tile(ca, len(q)))
+    assert np.array_equal(rows[:, 2], cb.ravel())
+
+
+def test_npz_round_trip(tmp_path, source, expected):
+    cb, q, ca = expected
+    export_result(tmp_path / "r.npz", HEADER, source)
+    with np.load(tmp_path / "r.npz") as data:
+        assert np.array_equal(data["CB"], cb)
+        assert np.array_equal(data["q_axis"], q)
+        assert np.array_equal(data["ca_axis"], ca)
+    with zipfile.ZipFile(tmp_path / "r.npz") as zf:
+        header = json.loads(zf.comment.decode("utf-8"))
+    assert header["params"] == HEADER and header["shape"] == list(cb.shape)
+
+
+def test_raw_round_trip(tmp_path, source, expected):
+    cb, _, _ = expected
+    export_result(tmp_path / "r.f64", HEADER, source)
+    header, data = read_raw(tmp_path / "r.f64")
+    assert header["params"] == HEADER and header["shape"] == list(cb.shape)
+    assert np.array_equal(np.asarray(data), cb.ravel())
+    del data
+
+
+def test_csv_report(tmp_path, source, expected):
+    cb, _, _ = expected
+    n = export_result(tmp_path / "r.csv", HEADER, source)
+    with open(tmp_path / "r.csv", encoding="utf-8-sig", newline="") as f:
+        lines = list(csv.reader(f, delimiter=";"))
+    table = lines[lines.index(["Q, л/мин", "CA_in, моль/л", "CB, моль/л"]) + 1:]
+    assert n == len(table) == cb.size
+    assert ["Тип сырья", "Сырьё A"] in lines
+    assert table[-1] == ["4.00", "0.500", f"{cb[-1, -1]:.4f}"]
+
+
+@pytest.mark.skipif(not HAS_PARQUET, reason="pyarrow is not installed")
+def test_parquet_round_trip(tmp_path, source, expected):
+    import pyarrow.parquet as pq
+
+    cb, _, _ = expected
+    export_result(tmp_path / "r.parquet", HEADER, source)
+    table = pq.read_table(tmp_path / "r.parquet")
+    assert np.array_equal(table.column("CB").to_numpy(), cb.ravel())
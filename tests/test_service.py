@@ -0,0 +1,76 @@
+import asyncio
+import json
+
+import pytest
+
+import service
+from service import ComputeService
+
+
+async def _exchange(request: bytes, **service_kwargs):
+    svc = ComputeService(workers=2, **service_kwargs)
+    server = await asyncio.start_server(svc.serve_connection, "127.0.0.1", 0)
+    port = server.sockets[0].getsockname()[1]
+    try:
+        reader, writer = await asyncio.open_connection("127.0.0.1", port)
+        writer.write(request)
+        await writer.drain()
+        raw = await reader.read()
+        writer.close()
+    finally:
+        server.close()
+        await server.wait_closed()
+        svc.pool.shutdown()
+    head, _, body = raw.partition(b"\r\n\r\n")
+    return int(head.split()[1]), json.loads(body)
+
+
+def call(request: bytes, **service_kwargs):
+    return asyncio.run(_exchange(request, **service_kwargs))
+
+
+def post(path: str, body, **service_kwargs):
+    data = body if isinstance(body, bytes) else json.dumps(body).encode()
+    return call(f"POST {path} HTTP/1.1\r\nContent-Length: {len(data)}\r\nConnection: close\r\n\r\n".encode()
+                + data, **service_kwargs)
+
+
+def test_point(fresh_db):
+    status, answer = post("/point", {"raw_type": "Сырьё A", "Q": 2.0, "CA_in": 1.0})
+    assert status == 200
+    assert answer["CB"] == pytest.approx(2 * 0.1 * 10 * 2.0 / ((2.0 + 1.0) * (2.0 + 2.0)))
+
+
+@pytest.mark.parametrize("request_bytes", [
+    b"GARBAGE\r\n\r\n",
+    b"POST /point HTTP/1.1\r\nContent-Length: abc\r\n\r\n",
+    b"POST /point HTTP/1.1\r\nContent-Length: -5\r\n\r\n",
+])
+def test_malformed_requests(fresh_db, request_bytes):
+    status, answer = call(request_bytes)
+    assert status == 400 and "error" in answer
+
+
+@pytest.mark.parametrize("body", [b"{not json", b"[1, 2]"])
+def test_bad_body(fresh_db, body):
+    status, _ = post("/point", body)
+    assert status == 400
+
+
+def test_missing_and_invalid_parameters(fresh_db):
+    assert post("/point", {"Q": 1.0, "CA_in": 1.0})[0] == 400
+    assert post("/point", {"raw_type": "Сырьё A", "Q": "x", "CA_in": 1.0})[0] == 400
+    assert post("/point", {"raw_type": "Сырьё A", "Q": [1, 2], "CA_in": [1]})[0] == 400
+    assert post("/sweep", {"raw_type": "Сырьё A", "dQ": 0})[0] == 400
+    assert post("/point", {"raw_type": "нет такого", "Q": 1.0, "CA_in": 1.0})[0] == 404
+
+
+def test_body_too_large(fresh_db):
+    head = f"POST /point HTTP/1.1\r\nContent-Length: {service.MAX_BODY_BYTES + 1}\r\n\r\n"
+    status, _ = call(head.encode())
+    assert status == 413
+
+
+def test_sweep_too_large(fresh_db):
+    status, answer = post("/sweep", {"raw_type": "Сырьё A", "dQ": 0.001}, max_sweep_points=1000)
+    assert status == 413 and "at most 1000" in answer["error"]
@@ -0,0 +1,81 @@
+import threading
+
+import pytest
+
+from model_core import SweepCancelled, incremental_sweep_CB, sweep_CB
+from sweep_cache import SweepCache, cache_key, cached_sweep_CB
+
+np = pytest.importorskip("numpy")
+
+BASE = {"k1": 0.1, "k2": 0.2, "Vr": 10.0, "Q_min": 1.0, "Q_max": 5.0, "dQ": 0.01,
+        "CAin_min": 0.1, "CAin_max": 1.0, "dCAin": 0.01}
+GROWN = {**BASE, "Q_min": 0.5, "Q_max": 20.0, "CAin_max": 1.5}
+
+
+def args(p):
+    return [p[k] for k in ("k1", "k2", "Vr", "Q_min", "Q_max", "dQ", "CAin_min", "CAin_max", "dCAin")]
+
+
+def test_incremental_matches_full_sweep_band_by_band():
+    previous = sweep_CB(*args(BASE))
+    calls = []
+    got = incremental_sweep_CB(previous, *args(GROWN), chunk_points=5000,
+                               progress=lambda done, total: calls.append((done, total)))
+    full = sweep_CB(*args(GROWN))
+    assert np.allclose(np.asarray(got.CB), np.asarray(full.CB), rtol=1e-12)
+    assert len(calls) > 1 and calls[-1][0] == calls[-1][1]
+
+
+def test_incremental_sweep_can_be_cancelled():
+    previous = sweep_CB(*args(BASE))
+    cancel = threading.Event()
+
+    def progress(done, total):
+        if done == 2:
+            cancel.set()
+
+    with pytest.raises(SweepCancelled):
+        incremental_sweep_CB(previous, *args(GROWN), chunk_points=5000, progress=progress, cancel=cancel)
+
+
+def test_cached_sweep_reuse_path_honours_cancel():
+    cache = SweepCache(use_disk=False)
+    previous = cached_sweep_CB(BASE, cache=cache)
+    cancel = threading.Event()
+    cancel.set()
+    with pytest.raises(SweepCancelled):
+        cached_sweep_CB(GROWN, cache=cache, previous=previous, cancel=cancel)
+
+
+def test_memory_and_disk_hits(fresh_db):
+    cache = SweepCache()
+    first = cached_sweep_CB(BASE, cache=cache)
+    assert cached_sweep_CB(BASE, cache=cache) is first
+    assert cache.stats()["memory_hits"] == 1
+
+    # a new process: empty memory tier, same database
+    cache = SweepCache()
+    again = cached_sweep_CB(BASE, cache=cache)
+    assert cache.stats()["disk_hits"] == 1
+    assert np.array_equal(np.asarray(again.CB), np.asarray(first.CB))
+
+
+def test_coefficient_change_invalidates_both_tiers(fresh_db):
+    import db
+
+    raw_id = db.get_raw_types()[0]["id"]
+    params = {k: float(v) for k, v in dict(db.get_coeffs(raw_id)).items() if k in BASE}
+    cache = SweepCache()
+    cached_sweep_CB(params, raw_id, cache=cache)
+    db.update_coeffs(raw_id, {**params, "k1": params["k1"] * 2})
+    assert cache.stats()["entries"] == 0
+    assert db.get_cached_sweep(cache_key(params)) is None
+
+
+def test_memory_tier_is_bounded():
+    small = {**BASE, "Q_max": 1.5}  # 51 x 91 points
+    cache = SweepCache(max_memory_bytes=len(sweep_CB(*args(small))) * 8 * 2, use_disk=False)
+    for q_max in (1.5, 1.51, 1.52):
+        cached_sweep_CB({**small, "Q_max": q_max}, cache=cache)
+    stats = cache.stats()
+    assert stats["entries"] == 1 and stats["memory_bytes"] <= cache.max_memory_bytes
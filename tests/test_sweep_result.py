@@ -0,0 +1,53 @@
+import pytest
+
+from model_core import SweepResult, buffer_from_bytes, sweep_CB
+
+np = pytest.importorskip("numpy")
+
+PARAMS = (0.1, 0.2, 10.0, 1.0, 3.0, 0.5, 0.1, 0.4, 0.1)  # 5 x 4 grid
+
+
+@pytest.fixture
+def result():
+    return sweep_CB(*PARAMS)
+
+
+def test_shape_and_indexing(result):
+    assert result.shape == (5, 4) and len(result) == 20
+    point = result[6]
+    assert point["Q"] == pytest.approx(1.5) and point["CA_in"] == pytest.approx(0.3)
+    assert point["CB"] == pytest.approx(float(result.CB[6]))
+    assert result[-1] == result[19]
+    with pytest.raises(IndexError):
+        result[20]
+    assert list(result) == [result[i] for i in range(len(result))]
+
+
+def test_row_and_column(result):
+    grid = np.asarray(result.CB).reshape(result.shape)
+    assert np.array_equal(result.row(2), grid[2])
+    assert np.array_equal(result.column(3), grid[:, 3])
+
+
+def test_bands_cover_the_grid(result):
+    bands = list(result.bands(chunk_points=8))  # two Q rows per band
+    assert [b.row_offset for b in bands] == [0, 2, 4]
+    assert np.array_equal(np.concatenate([np.asarray(b.CB) for b in bands]), np.asarray(result.CB))
+    assert bands[1][0] == result[2 * result.n_CA]
+
+
+def test_nearest_index_is_clamped(result):
+    assert result.nearest_index(1.6, 0.21) == 1 * 4 + 1
+    assert result.nearest_index(-10.0, -10.0) == 0
+    assert result.nearest_index(99.0, 99.0) == len(result) - 1
+
+
+def test_from_params_round_trip(result):
+    copy = SweepResult.from_params(result.params, buffer_from_bytes(result.cb_bytes()), result.engine)
+    assert copy.shape == result.shape
+    assert list(copy) == list(result)
+
+
+def test_cb_must_match_the_grid(result):
+    with pytest.raises(ValueError):
+        SweepResult(result.params, result.q_axis, result.ca_axis, result.CB[:-1])